@@ -0,0 +1,651 @@
+import argparse
+import csv
+import json
+import logging
+import re
+import sys
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import as_completed
+from pathlib import Path
+
+from KicadModTree import Model
+
+import requests
+
+from helper import net
+from helper.component import LCComponent, fetch_part_detail
+from helper.component import fetch_update_times
+from helper.footprint import FootprintManager
+from helper.footprint.footprint_handlers import MERGE_TRACKS, SIMPLIFY_TOLERANCE
+from helper.footprint.model3d import WRL_MODE, WRL_MODES
+from helper.provenance import Provenance, SYMBOLS, FOOTPRINTS, MODELS
+from helper.provenance import is_stale, make_record
+from helper.schematic import SchematicManager
+from helper.schematic import ShardedSchematicManager, SHARD_KEYS
+
+
+logger = logging.getLogger("KICONV")
+
+LCID_RE = re.compile(r"^C\d+$", re.I)
+LCID_KEYS = ('lcsc', 'LCSC', 'lcid', 'LCSC Part', 'LCSC Part #')
+
+FETCH_WORKERS = 8
+
+
+def read_bom(path):
+    """
+    Read LCSC part numbers from a BOM.
+
+    JSON BOMs are a list of part numbers or of objects with a `lcsc` like
+    key, for CSV every cell that looks like a part number is taken. The
+    order is kept and duplicates are dropped.
+    """
+    path = Path(path)
+    lcids = []
+
+    if path.suffix.lower() == ".json":
+        for item in json.loads(path.read_text(encoding='utf-8')):
+            if isinstance(item, dict):
+                item = next(
+                    (item[k] for k in LCID_KEYS if item.get(k)), ""
+                )
+            lcids.append(str(item).strip())
+    else:
+        with path.open('r', encoding='utf-8-sig', newline='') as fp:
+            for row in csv.reader(fp):
+                lcids.extend(cell.strip() for cell in row)
+
+    return list(dict.fromkeys(
+        lcid.upper() for lcid in lcids if LCID_RE.match(lcid)
+    ))
+
+
+def parse_timeout(text):
+    # "CONNECT,READ" or one value for both, in seconds
+    try:
+        timeout = tuple(float(value) for value in text.split(","))
+    except ValueError:
+        timeout = ()
+    if len(timeout) == 1:
+        timeout *= 2
+    if len(timeout) != 2 or min(timeout) <= 0:
+        raise argparse.ArgumentTypeError(
+            f"expected CONNECT,READ seconds, got {text!r}"
+        )
+
+    return timeout
+
+
+def fetch_part(lcid, use_cache=True, part_detail=True):
+    # (raw_data, lc_data), lc_data holds the LCSC category of the symbol
+    component = LCComponent(lcid)
+    if not component.load_componnt(use_cache):
+        return None
+
+    lc_data = None
+    if part_detail:
+        try:
+            lc_data = fetch_part_detail(lcid)
+        except (requests.RequestException, KeyError):
+            logger.warning("Batch: no LCSC detail for %s.", lcid)
+
+    return component.raw_data, lc_data
+
+
+def convert_part(
+    lcid,
+    raw_data,
+    lc_data=None,
+    symbol=True,
+    footprint=True,
+    scale=10,
+    wrl_mode=WRL_MODE,
+    merge_tracks=MERGE_TRACKS,
+    simplify_tolerance=SIMPLIFY_TOLERANCE
+):
+    # runs in a worker process, the result is pickled back to the parent.
+    component = LCComponent(lcid, lc_data)
+    component.set_raw_data(raw_data)
+
+    result = {
+        'lcid': lcid,
+        'symbol_name': component.symbol_name,
+        'footprint_name': component.footprint_name,
+        'model3d_name': component.model3d_name,
+        'symbol_data': None,
+        'footprint_data': None,
+        'provenance': {
+            SYMBOLS: component.symbol_provenance(),
+            FOOTPRINTS: component.footprint_provenance(),
+            MODELS: component.model3d_provenance(
+                component.get_model3d_ref(wrl_mode)
+            ),
+        },
+    }
+
+    if symbol:
+        result['symbol_data'] = component.gen_symbol_data(
+            result['symbol_name'], result['footprint_name'], scale
+        )
+
+    if footprint:
+        result['footprint_data'] = component.gen_footprint_data(
+            result['footprint_name'],
+            wrl_mode,
+            merge_tracks=merge_tracks,
+            simplify_tolerance=simplify_tolerance
+        )
+
+    return result
+
+
+class BatchExporter:
+
+    def __init__(
+        self,
+        lib_root,
+        lib_name='lcsc',
+        update=False,
+        symbol=True,
+        footprint=True,
+        model3d=True,
+        scale=10,
+        wrl_mode=WRL_MODE,
+        merge_tracks=MERGE_TRACKS,
+        simplify_tolerance=SIMPLIFY_TOLERANCE,
+        shard=None
+    ):
+        self.update = update
+        self.symbol = symbol
+        self.footprint = footprint
+        self.model3d = model3d
+        self.scale = scale
+        self.wrl_mode = wrl_mode
+        self.merge_tracks = merge_tracks
+        self.simplify_tolerance = simplify_tolerance
+
+        if shard:
+            self.schematic_manager = ShardedSchematicManager(
+                lib_root, lib_name, SHARD_KEYS[shard]
+            )
+        else:
+            self.schematic_manager = SchematicManager(lib_root, lib_name)
+        self.schematic_manager.build_schematic_db()
+        self.footprint_manager = FootprintManager(lib_root, lib_name)
+        self.provenance = Provenance(lib_root, lib_name)
+        # symbols are written together at the end of the run
+        self.pending_symbols = {}
+        self.pending_symbol_lcids = {}
+        self.pending_symbol_records = {}
+        # model key -> future of the prefetched WRLModel
+        self.model_futures = {}
+        # package key -> lcid converting its footprint in this run, the
+        # other parts of the package wait in case that conversion fails
+        self.footprint_owners = {}
+        self.footprint_waiters = {}
+
+    def export_symbol(self, lcid, name, data, record=None):
+        if data is None:
+            return
+
+        if not self.update and (
+                name in self.pending_symbols
+                or self.schematic_manager.get_schematic(name)):
+            logger.info("Batch: symbol %s exists, skip.", name)
+            return
+
+        self.pending_symbols[name] = data
+        self.pending_symbol_lcids[name] = lcid
+        self.pending_symbol_records[name] = record
+
+    def discard_symbol(self, lcid):
+        # the part failed, none of it goes to the library
+        for name, owner in list(self.pending_symbol_lcids.items()):
+            if owner == lcid:
+                del self.pending_symbols[name]
+                del self.pending_symbol_lcids[name]
+                del self.pending_symbol_records[name]
+
+    def commit_symbols(self):
+        if not self.pending_symbols:
+            return []
+
+        failed = []
+        try:
+            self.schematic_manager.add_schematics(
+                self.pending_symbols, update=True
+            )
+        except Exception:
+            logger.exception("Batch: unable to write the symbols.")
+            failed = list(dict.fromkeys(self.pending_symbol_lcids.values()))
+        else:
+            for name, record in self.pending_symbol_records.items():
+                self.provenance.record(SYMBOLS, name, record)
+
+        self.pending_symbols = {}
+        self.pending_symbol_lcids = {}
+        self.pending_symbol_records = {}
+
+        return failed
+
+    def claim_footprint(self, lcid, raw_data):
+        # parts sharing a package convert its footprint once
+        if not self.footprint:
+            return False
+
+        component = LCComponent(lcid)
+        component.set_raw_data(raw_data)
+        footprint_name = component.footprint_name
+        if not self.update and self.footprint_manager.check_footprint(
+                footprint_name):
+            return False
+
+        key = component.footprint_key(
+            footprint_name,
+            self.wrl_mode,
+            merge_tracks=self.merge_tracks,
+            simplify_tolerance=self.simplify_tolerance
+        )
+        if key is None:
+            return True
+        if key in self.footprint_owners:
+            logger.info(
+                "Batch: footprint %s converted by another part.", footprint_name
+            )
+            self.footprint_waiters.setdefault(key, []).append((lcid, raw_data))
+            return False
+
+        self.footprint_owners[key] = lcid
+        return True
+
+    def release_footprint(self, lcid):
+        # the part converting a shared footprint failed to convert, the next
+        # part of the package converts it instead
+        for key, owner in self.footprint_owners.items():
+            if owner == lcid:
+                break
+        else:
+            return None
+
+        waiters = self.footprint_waiters.get(key)
+        if not waiters:
+            del self.footprint_owners[key]
+            return None
+
+        lcid, raw_data = waiters.pop(0)
+        self.footprint_owners[key] = lcid
+        logger.info("Batch: convert the footprint again with %s.", lcid)
+        return lcid, raw_data
+
+    def footprint_sharers(self, lcid):
+        for key, owner in self.footprint_owners.items():
+            if owner == lcid:
+                return [
+                    waiter for waiter, _ in self.footprint_waiters.get(key, [])
+                ]
+
+        return []
+
+    def need_3d_model(self, footprint_name, model3d_name):
+        if not self.footprint or not self.model3d:
+            return False
+        if self.update:
+            return True
+
+        return not (
+            self.footprint_manager.check_footprint(footprint_name)
+            or self.footprint_manager.check_3d_model(model3d_name)
+        )
+
+    def prefetch_3d_model(self, pool, lcid, raw_data):
+        # the model downloads while the worker processes build the symbol
+        # and footprint, parts sharing a model fetch it once.
+        component = LCComponent(lcid)
+        component.set_raw_data(raw_data)
+        if not self.need_3d_model(
+                component.footprint_name, component.model3d_name):
+            return
+
+        model_ref = component.get_model3d_ref(self.wrl_mode)
+        if model_ref is None or model_ref.key in self.model_futures:
+            return
+
+        self.model_futures[model_ref.key] = pool.submit(
+            model_ref.fetch, self.footprint_manager.model_store
+        )
+
+    def get_3d_model(self, model_ref):
+        future = self.model_futures.pop(model_ref.key, None)
+        if future is None:
+            # not prefetched, or already added to the store by another part
+            return model_ref.fetch(self.footprint_manager.model_store)
+
+        return future.result()
+
+    def discard_3d_models(self):
+        for future in self.model_futures.values():
+            try:
+                future.result().discard()
+            except Exception:
+                pass
+        self.model_futures = {}
+
+    def export_footprint(self, name, model3d_name, data, records=None):
+        records = records or {}
+        if data is None:
+            return
+
+        if self.footprint_manager.check_footprint(name) and not self.update:
+            logger.info("Batch: footprint %s exists, skip.", name)
+            return
+
+        model_ref = data.c_3d_model
+        if model_ref and self.model3d:
+            if self.update or not self.footprint_manager.check_3d_model(
+                    model3d_name):
+                self.footprint_manager.add_3d_model(
+                    model3d_name, self.get_3d_model(model_ref), True
+                )
+                self.provenance.record(
+                    MODELS, model3d_name, records.get(MODELS)
+                )
+            data.append(
+                Model(
+                    filename=self.footprint_manager.get_3d_model_ref_path(
+                        model3d_name),
+                    rotate=data.c_3d_model_rotation
+                )
+            )
+
+        self.footprint_manager.add_footprint(name, data, update=True)
+        record = records.get(FOOTPRINTS)
+        self.provenance.record(FOOTPRINTS, name, record)
+        if record is None:
+            return
+
+        # the parts sharing the package use this footprint too
+        for lcid in self.footprint_sharers(record['lcid']):
+            self.provenance.record(
+                FOOTPRINTS,
+                name,
+                make_record(lcid, record['uuid'], record['update_time'])
+            )
+
+    def export(self, result):
+        records = result['provenance']
+        if self.symbol:
+            self.export_symbol(
+                result['lcid'],
+                result['symbol_name'],
+                result['symbol_data'],
+                records[SYMBOLS]
+            )
+        if self.footprint:
+            self.export_footprint(
+                result['footprint_name'],
+                result['model3d_name'],
+                result['footprint_data'],
+                records
+            )
+
+    def submit_part(self, pool, lcid, raw_data, lc_data, symbol, footprint):
+        return pool.submit(
+            convert_part,
+            lcid,
+            raw_data,
+            lc_data,
+            symbol,
+            footprint,
+            self.scale,
+            self.wrl_mode,
+            self.merge_tracks,
+            self.simplify_tolerance
+        )
+
+    def run(
+        self, lcids, jobs=None, fetch_workers=FETCH_WORKERS, use_cache=True
+    ):
+        failed = []
+        done = 0
+
+        with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+                ProcessPoolExecutor(max_workers=jobs) as convert_pool:
+            # the symbols only need the LCSC detail for their category
+            fetches = {
+                fetch_pool.submit(
+                    fetch_part, lcid, use_cache, self.symbol
+                ): lcid
+                for lcid in lcids
+            }
+
+            # conversion starts as soon as a part is downloaded
+            conversions = {}
+            for future in as_completed(fetches):
+                lcid = fetches[future]
+                try:
+                    part = future.result()
+                except Exception:
+                    logger.exception("Batch: unable to fetch %s.", lcid)
+                    part = None
+
+                if part is None:
+                    failed.append(lcid)
+                    continue
+
+                raw_data, lc_data = part
+                self.prefetch_3d_model(fetch_pool, lcid, raw_data)
+
+                conversions[self.submit_part(
+                    convert_pool,
+                    lcid,
+                    raw_data,
+                    lc_data,
+                    self.symbol,
+                    self.claim_footprint(lcid, raw_data)
+                )] = lcid
+
+            # library writes stay in this process, one part at a time
+            retry = False
+            while conversions:
+                retries = {}
+                for future in as_completed(conversions):
+                    lcid = conversions[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception("Batch: unable to convert %s.", lcid)
+                        failed.append(lcid)
+                        self.discard_symbol(lcid)
+
+                        part = self.release_footprint(lcid)
+                        if part is not None:
+                            # only the footprint, its symbol is exported
+                            retries[self.submit_part(
+                                convert_pool, *part, None, False, True
+                            )] = part[0]
+                        continue
+
+                    try:
+                        self.export(result)
+                    except Exception:
+                        # a library write failing again for the next part
+                        # of the package would not help
+                        logger.exception("Batch: unable to export %s.", lcid)
+                        failed.append(lcid)
+                        self.discard_symbol(lcid)
+                        sharers = self.footprint_sharers(lcid)
+                        if sharers:
+                            logger.warning(
+                                "Batch: no footprint for %s.",
+                                ", ".join(sharers)
+                            )
+                        continue
+
+                    if retry:
+                        logger.info("Batch: footprint of %s done.", lcid)
+                        continue
+
+                    done += 1
+                    logger.info(
+                        "Batch: [%s/%s] %s done.", done, len(lcids), lcid
+                    )
+
+                conversions = retries
+                retry = True
+
+            self.discard_3d_models()
+
+        failed.extend(self.commit_symbols())
+        self.provenance.save()
+
+        return failed
+
+
+def check_part(lcid, records):
+    upstream = fetch_update_times(lcid)
+    if upstream is None:
+        return False
+
+    for kind, name, record in records:
+        if is_stale(kind, record, upstream):
+            logger.info("Batch: %s %s of %s changed upstream.", kind, name, lcid)
+            return True
+
+    return False
+
+
+def find_stale_parts(provenance, lcids=None, fetch_workers=FETCH_WORKERS):
+    """
+    LCSC ids of the library parts whose symbol or footprint has a newer
+    updateTime on EasyEDA than the one they were converted from.
+    """
+    parts = provenance.parts()
+    if lcids is not None:
+        parts = {lcid: parts[lcid] for lcid in lcids if lcid in parts}
+
+    stale = set()
+    with ThreadPoolExecutor(max_workers=fetch_workers) as pool:
+        checks = {
+            pool.submit(check_part, lcid, records): lcid
+            for lcid, records in parts.items()
+        }
+        for future in as_completed(checks):
+            lcid = checks[future]
+            try:
+                if future.result():
+                    stale.add(lcid)
+            except Exception:
+                logger.exception("Batch: unable to check %s.", lcid)
+
+    logger.info(
+        "Batch: %s of %s parts changed upstream.", len(stale), len(parts)
+    )
+    # keep the library order
+    return [lcid for lcid in parts if lcid in stale]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert every LCSC part of a BOM to a KiCad library."
+    )
+    parser.add_argument('bom', nargs='?', default=None,
+                        help="BOM file, CSV or JSON")
+    parser.add_argument('-o', '--lib-root', required=True,
+                        help="library root directory")
+    parser.add_argument('-n', '--lib-name', default='lcsc',
+                        help="library name (default: lcsc)")
+    parser.add_argument('-u', '--update', action='store_true',
+                        help="update symbols and footprints already in library")
+    parser.add_argument('--refresh', action='store_true',
+                        help="convert again the library parts changed on "
+                             "EasyEDA, only the BOM parts when a BOM is given")
+    parser.add_argument('--no-symbol', action='store_true')
+    parser.add_argument('--no-footprint', action='store_true')
+    parser.add_argument('--no-3d', action='store_true')
+    parser.add_argument('--scale', type=int, default=10,
+                        help="symbol scale (default: 10)")
+    parser.add_argument('--wrl-mode', choices=WRL_MODES, default=WRL_MODE,
+                        help="3D model colors, one shape per material or "
+                             "one shape with a color per face "
+                             f"(default: {WRL_MODE})")
+    parser.add_argument('--merge-tracks', action='store_true',
+                        help="join collinear track segments, smaller "
+                             "footprints with fewer lines")
+    parser.add_argument('--simplify', type=float, default=SIMPLIFY_TOLERANCE,
+                        metavar='MM',
+                        help="simplify solid regions and custom pads, points "
+                             "closer than MM to the outline are dropped "
+                             "(default: off)")
+    parser.add_argument('--shard', choices=sorted(SHARD_KEYS), default=None,
+                        help="split the symbol library in one file per "
+                             "category or reference prefix")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="conversion processes (default: cpu count)")
+    parser.add_argument('--fetch-workers', type=int, default=FETCH_WORKERS,
+                        help=f"parallel downloads (default: {FETCH_WORKERS})")
+    parser.add_argument('--timeout', type=parse_timeout,
+                        default=net.DEFAULT_TIMEOUT, metavar='CONNECT,READ',
+                        help="HTTP connect and read timeouts in seconds "
+                             "(default: %s,%s)" % net.DEFAULT_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        format='%(asctime)s [%(levelname)s] %(message)s',
+        level=logging.INFO,
+        datefmt='%H:%M:%S'
+    )
+
+    if args.bom is None and not args.refresh:
+        parser.error("a BOM is required unless --refresh is given")
+
+    # one pooled connection per download thread
+    net.configure(
+        timeout=args.timeout,
+        pool_maxsize=max(net.POOL_MAXSIZE, args.fetch_workers)
+    )
+
+    lcids = None
+    if args.bom is not None:
+        lcids = read_bom(args.bom)
+        if not lcids:
+            logger.error("Batch: no LCSC part found in %s.", args.bom)
+            return 1
+
+        logger.info("Batch: %s parts in %s.", len(lcids), args.bom)
+
+    if args.refresh:
+        lcids = find_stale_parts(
+            Provenance(args.lib_root, args.lib_name), lcids, args.fetch_workers
+        )
+        if not lcids:
+            logger.info("Batch: library is up to date.")
+            return 0
+
+    exporter = BatchExporter(
+        args.lib_root,
+        args.lib_name,
+        update=args.update or args.refresh,
+        symbol=not args.no_symbol,
+        footprint=not args.no_footprint,
+        model3d=not args.no_3d,
+        scale=args.scale,
+        wrl_mode=args.wrl_mode,
+        merge_tracks=args.merge_tracks,
+        simplify_tolerance=args.simplify,
+        shard=args.shard
+    )
+    # the cached payloads of refreshed parts are outdated
+    failed = exporter.run(
+        lcids, args.jobs, args.fetch_workers, use_cache=not args.refresh
+    )
+
+    if failed:
+        logger.error("Batch: %s parts failed: %s", len(failed), ", ".join(failed))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
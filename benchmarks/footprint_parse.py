@@ -0,0 +1,131 @@
+"""
+Shape parsing throughput on large synthetic footprints.
+
+    python benchmarks/footprint_parse.py [-n ROUNDS]
+
+Compares the old tokenizer (split and drop empty fields, dict lookup and
+SVGNODE check per line) with helper.shape, then times create_footprint
+plus serialization with the KicadModTree tree and the direct S-expression
+emitter.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.footprint import create_footprint              # noqa: E402
+from helper.footprint.emitter import EMITTERS, serialize_footprint  # noqa: E402
+from helper.footprint.footprint_handlers import FOOTPRINT_HANDLER  # noqa: E402
+from helper.shape import iter_shapes                       # noqa: E402
+
+
+def bga_shapes(rows=30, cols=30, pitch=3.937):
+    shapes = []
+    for r in range(rows):
+        for c in range(cols):
+            x = 4000 + c * pitch
+            y = 3000 + r * pitch
+            shapes.append(
+                f"PAD~ELLIPSE~{x:.3f}~{y:.3f}~1.969~1.969~1~~{chr(65 + r % 26)}{c + 1}"
+                f"~0~~0~gge{r}_{c}~0~~Y~0~~~{x:.3f},{y:.3f}"
+            )
+    w = cols * pitch
+    h = rows * pitch
+    shapes.append(
+        f"TRACK~0.6~3~~3995 2995 {4005 + w:.3f} 2995 {4005 + w:.3f} "
+        f"{3005 + h:.3f} 3995 {3005 + h:.3f} 3995 2995~gge_silk~0"
+    )
+    return shapes
+
+
+def qfn_shapes(pins=128, pitch=1.969):
+    shapes = []
+    side = pins // 4
+    for i in range(pins):
+        k, j = divmod(i, side)
+        offset = (j - side / 2) * pitch
+        x, y, rot = [
+            (3900, 3000 + offset, 0), (4000 + offset, 3100, 90),
+            (4100, 3000 - offset, 180), (4000 - offset, 2900, 270),
+        ][k]
+        shapes.append(
+            f"PAD~RECT~{x:.3f}~{y:.3f}~3.15~0.984~1~~{i + 1}~0~"
+            f"{x - 1.5:.3f} {y - 0.5:.3f} {x + 1.5:.3f} {y - 0.5:.3f} "
+            f"{x + 1.5:.3f} {y + 0.5:.3f} {x - 1.5:.3f} {y + 0.5:.3f}~{rot}~gge{i}~0~~Y~0~~~{x:.3f},{y:.3f}"
+        )
+        shapes.append(
+            f"TRACK~0.6~3~~{x - 2:.3f} {y:.3f} {x + 2:.3f} {y:.3f}~ggt{i}~0"
+        )
+    shapes.append("PAD~RECT~4000~3000~60~60~1~~129~0~3970 2970 4030 2970 4030 3030 3970 3030~0~ggep~0~~Y~0~~~4000,3000")
+    return shapes
+
+
+def legacy_tokenize(shapes, handlers):
+    for line in shapes:
+        args = [i for i in line.split("~") if i]
+        model = args[0]
+        if model not in handlers:
+            continue
+        if model == "SVGNODE":
+            handlers.get("SVGNODE")
+        else:
+            handlers.get(model)
+    return len(shapes)
+
+
+def shape_tokenize(shapes, handlers):
+    get_handler = handlers.get
+    for model, fields in iter_shapes(shapes):
+        if get_handler(model) is None:
+            continue
+    return len(shapes)
+
+
+def convert(name, shapes, emitter):
+    footprint = create_footprint(
+        name, shapes, True, 4000, 3000, emitter=emitter
+    )
+    return serialize_footprint(footprint)
+
+
+def best_of(rounds, func, *args):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--rounds', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+
+    for name, shapes in [("BGA-900", bga_shapes()), ("QFN-128", qfn_shapes())]:
+        legacy = best_of(args.rounds, legacy_tokenize, shapes, FOOTPRINT_HANDLER)
+        current = best_of(args.rounds, shape_tokenize, shapes, FOOTPRINT_HANDLER)
+        print(
+            f"{name}: {len(shapes)} shapes, "
+            f"tokenize {len(shapes) / legacy / 1e3:.0f}k -> "
+            f"{len(shapes) / current / 1e3:.0f}k lines/s "
+            f"({legacy / current:.2f}x)"
+        )
+        for emitter in EMITTERS:
+            build = best_of(
+                max(1, args.rounds // 4), convert, name, shapes, emitter
+            )
+            print(
+                f"  {emitter:>5}: convert + serialize {build * 1e3:.1f} ms "
+                f"({len(shapes) / build / 1e3:.1f}k shapes/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
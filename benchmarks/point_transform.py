@@ -0,0 +1,139 @@
+"""
+Point list conversion on dense silkscreen and custom pad footprints.
+
+    python benchmarks/point_transform.py [-n ROUNDS]
+
+Compares converting point by point (mil2mm per pair, as the handlers did
+before) with the batched mil2mm_points / xy_points, with numpy and with
+the pure python fallback.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.footprint import footprint_handlers as fh      # noqa: E402
+from helper.schematic import schematic_handlers as sh      # noqa: E402
+
+
+def circle_points(cx, cy, radius, count):
+    values = []
+    for i in range(count):
+        angle = 2 * math.pi * i / count
+        values.append(f"{cx + radius * math.cos(angle):.3f}")
+        values.append(f"{cy + radius * math.sin(angle):.3f}")
+    return " ".join(values)
+
+
+def silkscreen_points(tracks=200, count=40):
+    # logo like outlines, many TRACK shapes of many points
+    return [
+        circle_points(4000 + i % 20 * 7, 3000 + i // 20 * 7, 3 + i % 5, count)
+        for i in range(tracks)
+    ]
+
+
+def custom_pad_points(pads=64, count=64):
+    # rounded or thermal custom pads, one polygon each
+    return [
+        circle_points(4000 + i * 2, 3000, 0.8, count) for i in range(pads)
+    ]
+
+
+def short_track_points(tracks=2000):
+    return [
+        f"{4000 + i * 0.1:.3f} 3000 {4000 + i * 0.1:.3f} 3010"
+        for i in range(tracks)
+    ]
+
+
+def per_point_footprint(point_lists, footprint_info):
+    for points in point_lists:
+        values = points.split(" ")
+        [fh.mil2mm(x, y, footprint_info) for x, y in zip(*[iter(values)] * 2)]
+
+
+def batched_footprint(point_lists, footprint_info):
+    for points in point_lists:
+        fh.mil2mm_points(points, footprint_info)
+
+
+def per_point_schematic(point_lists, kicad_schematic):
+    for points in point_lists:
+        values = points.split(" ")
+        for px, py in zip(*[iter(values)] * 2):
+            x = int((float(px) - kicad_schematic.c_x) * kicad_schematic.scale)
+            y = -int((float(py) - kicad_schematic.c_y) * kicad_schematic.scale)
+            f"          (xy {sh.mil2mm(x)} {sh.mil2mm(y)})"
+
+
+def batched_schematic(point_lists, kicad_schematic):
+    for points in point_lists:
+        values = points.split(" ")
+        sh.xy_points(values[0::2], values[1::2], kicad_schematic)
+
+
+def best_of(rounds, func, *args):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def without_numpy(func):
+    def run(*args):
+        saved = fh.np, sh.np
+        fh.np = sh.np = None
+        try:
+            func(*args)
+        finally:
+            fh.np, sh.np = saved
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--rounds', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    origin = SimpleNamespace(c_x=4000, c_y=3000, scale=10)
+    cases = [
+        ("silkscreen", silkscreen_points()),
+        ("custom pads", custom_pad_points()),
+        ("short tracks", short_track_points()),
+    ]
+    runs = [
+        ("footprint", per_point_footprint, batched_footprint),
+        ("schematic", per_point_schematic, batched_schematic),
+    ]
+    if fh.np is None:
+        print("numpy not installed, only the pure python path is timed")
+
+    for name, point_lists in cases:
+        total = sum(len(points.split(" ")) // 2 for points in point_lists)
+        print(f"{name}: {len(point_lists)} lists, {total} points")
+        for kind, per_point, batched in runs:
+            old = best_of(args.rounds, per_point, point_lists, origin)
+            python = best_of(
+                args.rounds, without_numpy(batched), point_lists, origin
+            )
+            line = (
+                f"  {kind:>9}: per point {old * 1e3:.2f} ms, "
+                f"batched python {python * 1e3:.2f} ms ({old / python:.2f}x)"
+            )
+            if fh.np is not None:
+                new = best_of(args.rounds, batched, point_lists, origin)
+                line += f", numpy {new * 1e3:.2f} ms ({old / new:.2f}x)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Solid region and custom pad size with Douglas-Peucker simplification.
+
+    python benchmarks/polygon_simplify.py
+
+Converts a logo like solid region and thermal custom pads of thousands
+of points, as EasyEDA exports them, with several tolerances and reports
+vertices, .kicad_mod size, conversion time and the largest distance of a
+dropped point to the simplified outline.
+"""
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.footprint import create_footprint               # noqa: E402
+from helper.footprint.emitter import serialize_footprint    # noqa: E402
+from helper.footprint.footprint_handlers import mil2mm_points  # noqa: E402
+from helper.footprint.footprint import FootprintInfo        # noqa: E402
+from helper.geometry import simplify_polygon                # noqa: E402
+
+
+def blob(cx, cy, radius, count, seed):
+    # wavy closed outline with sub-mil noise on every vertex
+    rnd = random.Random(seed)
+    points = []
+    for i in range(count):
+        angle = 2 * math.pi * i / count
+        r = radius * (1 + 0.15 * math.sin(5 * angle)) + rnd.uniform(-0.05, 0.05)
+        points.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+    return points
+
+
+def region_shape(points):
+    path = " L ".join(f"{x:.3f} {y:.3f}" for x, y in points)
+    return f"SOLIDREGION~3~~M {path} Z~solid~gge1~~~~0"
+
+
+def custom_pad_shape(points, number):
+    x, y = points[0]
+    outline = " ".join(f"{x:.3f} {y:.3f}" for x, y in points)
+    return (
+        f"PAD~POLYGON~{x:.3f}~{y:.3f}~4~4~1~~{number}~0~{outline}~0~"
+        f"ggp{number}~0~~Y~0~~~{x:.3f},{y:.3f}"
+    )
+
+
+def shapes():
+    return [region_shape(blob(4000, 3000, 150, 4000, 1))] + [
+        custom_pad_shape(blob(3800 + i * 60, 2800, 20, 720, i + 2), i + 1)
+        for i in range(8)
+    ]
+
+
+def segment_distance(p, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    t = 0
+    if length_sq:
+        t = min(max(((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length_sq, 0), 1)
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def max_deviation(points, simplified):
+    ring = simplified + simplified[:1]
+    return max(
+        min(segment_distance(p, a, b) for a, b in zip(ring, ring[1:]))
+        for p in points
+    )
+
+
+def main():
+    logging.disable(logging.WARNING)
+
+    data = shapes()
+    info = FootprintInfo("BLOB", True, 4000, 3000)
+    region = mil2mm_points(
+        " ".join(f"{x:.3f} {y:.3f}" for x, y in blob(4000, 3000, 150, 4000, 1)),
+        info
+    )
+
+    for tolerance in (0, 0.005, 0.01, 0.025):
+        start = time.perf_counter()
+        footprint = create_footprint(
+            "BLOB", data, True, 4000, 3000, simplify_tolerance=tolerance
+        )
+        text = serialize_footprint(footprint, timestamp=0)
+        elapsed = time.perf_counter() - start
+
+        simplified = simplify_polygon(region, tolerance)
+        print(
+            f"tolerance {tolerance:5} mm: {text.count('(xy ')} vertices, "
+            f"{len(text) / 1024:.1f} KiB, {elapsed * 1e3:.1f} ms, "
+            f"region max deviation {max_deviation(region, simplified):.4f} mm"
+        )
+
+
+if __name__ == "__main__":
+    main()
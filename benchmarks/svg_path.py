@@ -0,0 +1,135 @@
+"""
+SVG path parsing in the symbol and footprint handlers.
+
+    python benchmarks/svg_path.py [-n ROUNDS]
+
+Times create_schematic on a 256 pin symbol and create_footprint on an
+arc heavy footprint, with the handlers using svg.path and helper.svgpath.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from contextlib import contextmanager
+
+import svg.path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper import svgpath                                  # noqa: E402
+from helper.footprint import create_footprint               # noqa: E402
+from helper.footprint import footprint_handlers as fh       # noqa: E402
+from helper.schematic import create_schematic               # noqa: E402
+from helper.schematic import schematic_handlers as sh       # noqa: E402
+
+
+def pin_shapes(pins=256, pitch=10):
+    side = pins // 4
+    half = side * pitch / 2
+    shapes = [
+        f"R~{400 - half}~{300 - half}~~~{half * 2}~{half * 2}~#880000~1~0~none~gge1~0~"
+    ]
+    for i in range(pins):
+        k, j = divmod(i, side)
+        offset = j * pitch - half + pitch / 2
+        x, y, rotation, d = [
+            (400 - half - 10, 300 + offset, 180, "h 10"),
+            (400 + offset, 300 + half + 10, 270, "v -10"),
+            (400 + half + 10, 300 - offset, 0, "h -10"),
+            (400 - offset, 300 - half - 10, 90, "v 10"),
+        ][k]
+        shapes.append(
+            f"P~show~0~{i + 1}~{x}~{y}~{rotation}~gge{i + 2}~0^^{x}~{y}^^"
+            f"M {x} {y} {d}~#880000^^1~{x}~{y}~0~P{i + 1}~start~~~#0000FF"
+            f"^^1~{x}~{y}~0~{i + 1}~end~~~#0000FF^^0~{x}~{y}^^0~M {x} {y} L {x} {y}"
+        )
+    shapes.append("PT~M 395 295 L 405 295 L 405 305 Z~#880000~1~0~none~ggept~0")
+    shapes.append("PT~M 395 295 C 397 293 403 293 405 295~#880000~1~0~none~ggepc~0")
+    return shapes
+
+
+def arc_shapes(arcs=400):
+    shapes = []
+    for i in range(arcs):
+        x = 4000 + i % 20 * 5
+        y = 3000 + i // 20 * 5
+        shapes.append(
+            f"ARC~0.6~3~~M {x - 2} {y} A 2 2 0 {i % 2} 1 {x + 2} {y}~~gga{i}~0"
+        )
+    return shapes
+
+
+@contextmanager
+def svg_path_handlers():
+    # the handlers as they were, straight on svg.path
+    names = ("parse_path", "Move", "Line", "Close", "CubicBezier", "Arc")
+    saved = [getattr(sh, name) for name in names]
+    saved_fh = fh.parse_path, fh.svg_ARC
+    for name in names:
+        setattr(sh, name, getattr(svg.path, name))
+    fh.parse_path, fh.svg_ARC = svg.path.parse_path, svg.path.Arc
+    try:
+        yield
+    finally:
+        for name, value in zip(names, saved):
+            setattr(sh, name, value)
+        fh.parse_path, fh.svg_ARC = saved_fh
+
+
+def symbol(shapes):
+    return create_schematic(
+        "C0", "BENCH", shapes, "U?", "QFP", "", x_offset=400, y_offset=300,
+        x_size=700, y_size=700
+    )
+
+
+def footprint(shapes):
+    return create_footprint("ARCS", shapes, True, 4000, 3000)
+
+
+def best_of(rounds, func, *args):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--rounds', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+
+    cases = [
+        ("symbol, 256 pins", symbol, pin_shapes()),
+        ("footprint, 400 arcs", footprint, arc_shapes()),
+    ]
+    for name, convert, shapes in cases:
+        with svg_path_handlers():
+            old_output = convert(shapes)
+            old = best_of(args.rounds, convert, shapes)
+        new_output = convert(shapes)
+        new = best_of(args.rounds, convert, shapes)
+        if not isinstance(old_output, str):
+            old_output = old_output.to_kicad_mod(0)
+            new_output = new_output.to_kicad_mod(0)
+        same = "same output" if old_output == new_output else "OUTPUT DIFFERS"
+        print(
+            f"{name}: svg.path {old * 1e3:.1f} ms, "
+            f"svgpath {new * 1e3:.1f} ms ({old / new:.2f}x), {same}"
+        )
+
+    d = "M 3990 2980 A 10 10 0 0 1 4010 2980"
+    old = best_of(args.rounds, lambda: [svg.path.parse_path(d) for _ in range(1000)])
+    new = best_of(args.rounds, lambda: [svgpath.parse_path(d) for _ in range(1000)])
+    print(f"arc path: {old * 1e3:.2f} -> {new * 1e3:.2f} us/path ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
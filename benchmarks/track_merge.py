@@ -0,0 +1,70 @@
+"""
+Footprint size with and without collinear track merging.
+
+    python benchmarks/track_merge.py
+
+Converts footprints whose outlines are drawn as many short segments, as
+EasyEDA imports often are, and compares line count, .kicad_mod size and
+conversion time.
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.footprint import create_footprint               # noqa: E402
+from helper.footprint.emitter import serialize_footprint    # noqa: E402
+
+
+def segmented_rect(x1, y1, x2, y2, step):
+    # rectangle outline with a point every step
+    points = []
+    for start, end in [((x1, y1), (x2, y1)), ((x2, y1), (x2, y2)),
+                       ((x2, y2), (x1, y2)), ((x1, y2), (x1, y1))]:
+        count = int(max(abs(end[0] - start[0]), abs(end[1] - start[1])) / step)
+        for i in range(count):
+            points.append((
+                start[0] + (end[0] - start[0]) * i / count,
+                start[1] + (end[1] - start[1]) * i / count,
+            ))
+    points.append((x1, y1))
+    return " ".join(f"{x:.3f} {y:.3f}" for x, y in points)
+
+
+def outline_shapes(step=1):
+    return [
+        # silkscreen, courtyard and fab outlines of a large connector
+        f"TRACK~1~3~~{segmented_rect(3900, 2950, 4100, 3050, step)}~gge1~0",
+        f"TRACK~0.5~101~~{segmented_rect(3895, 2945, 4105, 3055, step)}~gge2~0",
+        f"TRACK~0.4~12~~{segmented_rect(3902, 2952, 4098, 3048, step)}~gge3~0",
+        # already minimal, nothing to merge
+        "TRACK~1~3~~3990 2990 4010 2990 4010 3010 3990 3010 3990 2990~gge4~0",
+    ]
+
+
+def convert(shapes, merge_tracks):
+    footprint = create_footprint(
+        "OUTLINE", shapes, True, 4000, 3000, merge_tracks=merge_tracks
+    )
+    return serialize_footprint(footprint, timestamp=0)
+
+
+def main():
+    logging.disable(logging.WARNING)
+
+    shapes = outline_shapes()
+    for merge_tracks in (False, True):
+        start = time.perf_counter()
+        data = convert(shapes, merge_tracks)
+        elapsed = time.perf_counter() - start
+        print(
+            f"merge_tracks={merge_tracks!s:5}: "
+            f"{data.count('(fp_line')} lines, {len(data) / 1024:.1f} KiB, "
+            f"{elapsed * 1e3:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@ import wx
 import wx.dataview
 
 import logging
-import requests
+
+from helper import net
 
 
 logger = logging.getLogger("ADVSEARCH")
@@ -75,7 +76,7 @@ class AdvSearchControl:
             'returnListStyle': 'classifyarr',
             'wd': value
         }
-        r = requests.post(
+        r = net.post(
             "https://easyeda.com/api/components/search",
             data=payload
         )
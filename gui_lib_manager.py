@@ -1,11 +1,13 @@
 import wx
-from helper.footprint import FootprintManager, create_footprint
-from helper.schematic import create_schematic, SchematicManager
+from helper.component import LCComponent, LCUUIDComponent
+from helper.footprint import FootprintManager
+from helper.provenance import Provenance, SYMBOLS, FOOTPRINTS, MODELS
+from helper.schematic import SchematicManager
 from helper.schematic import SchematicExist, SchematicNotFound
 
 import logging
-import requests
 
+from concurrent.futures import ThreadPoolExecutor
 from KicadModTree import Model
 from logging import Handler, Formatter
 from pathlib import Path
@@ -28,199 +30,6 @@ class CMHandler(Handler):
         self.status_write_func(msg)
 
 
-class LCComponent:
-
-    def __init__(self, lcid, lc_data=None):
-        self.lcid = lcid
-        self.lc_data = lc_data
-        self.raw_data = None
-        self.footprint = None
-        self.symbol = None
-
-    @property
-    def model3d_name(self):
-        if self.footprint is None:
-            logger.warning("3DModel Name not avaliable.")
-            return ""
-
-        return self.footprint['dataStr']['head']['c_para'].get('3DModel', "")
-
-    @property
-    def footprint_name(self):
-        if self.footprint is None:
-            logger.warning("Footprint Name not avaliable.")
-            return ""
-
-        # title = self.raw_data.get('title', self.lcid)
-        return self.footprint['title']
-
-    @property
-    def symbol_name(self):
-        if self.symbol is None:
-            logger.warning("Symbol Name not avaliable.")
-            return ""
-
-        return self.symbol['head']['c_para']['name']
-
-    def load_componnt(self):
-        logger.info("下载数据 -> %s", self.lcid)
-
-        req = requests.get(
-            f"https://easyeda.com/api/products/{self.lcid}/components"
-        )
-
-        data = req.json()
-
-        if data['code'] != 0:
-            logger.critical(
-                "Unable to load component %s. Code: %s",
-                self.lcid,
-                data['message']
-            )
-            return False
-
-        self.raw_data = data['result']
-
-        self.symbol = self.raw_data['dataStr']
-        self.footprint = self.raw_data['packageDetail']
-
-        return True
-
-    def calc_symbol_size(self, scale=10):
-        if self.symbol is None:
-            return "Symbol not Avalible."
-
-        box = self.symbol['BBox']
-        bh = box['height'] * scale * 0.00254
-        bw = box['width'] * scale * 0.00254
-        ret = f"{bw:.2f} mm * {bh:.2f} mm"
-
-        return ret
-
-    def gen_footprint_data(self, footprint_name):
-        if self.footprint is None:
-            logger.critical("Cannot Generate Footprint. Data Not Avalible.")
-            return None
-
-        assembly_process = self.raw_data.get('SMT', False)
-        box = self.footprint['dataStr']['BBox']
-        canvas = self.footprint['dataStr']['canvas']
-        canvas = canvas.split("~")
-
-        data = create_footprint(
-            footprint_name,
-            self.footprint['dataStr']['shape'],
-            assembly_process,
-            c_x=float(canvas[16]),
-            c_y=float(canvas[17]),
-            size_x=float(box['width']),
-            size_y=float(box['height'])
-        )
-
-        data.setDescription(f"{footprint_name} footprint")
-        # data.setTags(f"{footprint_name} footprint")
-
-        return data
-
-    def get_datasheet(self):
-        # type: ignore
-        datasheet = self.footprint['dataStr']['head']['c_para']['link']
-        if self.lc_data:
-            datasheet = self.lc_data["attributes"].get('Datasheet', "")
-
-        return datasheet
-
-    def gen_symbol_data(
-        self,
-        symbol_name,
-        footprint_name,
-        scale=10
-    ):
-        if self.symbol is None:
-            logger.critical("Cannot Generate Symbol Data. No Symbol Avalible.")
-            return None
-
-        box = self.symbol['BBox']
-        symmbolic_prefix = self.symbol['head']['c_para']['pre']
-        manufacturer = self.symbol['head']['c_para']['Manufacturer']
-        datasheet_link = self.get_datasheet()
-        category = " - "
-        desc = self.raw_data['description']     # type: ignore
-        if desc == "" and self.lc_data:
-            lc_desc = self.lc_data.get('description', "")
-            if lc_desc:
-                desc = lc_desc
-
-        # get datasheet
-        if self.lc_data is not None:
-            parent_catalog_name = self.lc_data["tags"]["parent_tag"].get(
-                'name', '-')
-            catalog_name = self.lc_data["tags"]["child_tag"].get('name', '-')
-            category = f"{parent_catalog_name} - {catalog_name}"
-
-        canvas = self.symbol['canvas']
-        canvas = canvas.split("~")
-
-        return create_schematic(
-            lcid=self.lcid,
-            schematic_title=symbol_name,
-            schematic_shape=self.symbol['shape'],
-            symmbolic_prefix=symmbolic_prefix,
-            footprint_name=footprint_name,
-            datasheet_link=datasheet_link,
-            # x_offset=box['x'],
-            # y_offset=box['y'],
-            x_offset=canvas[13],
-            y_offset=canvas[14],
-            x_size=box['width'],
-            y_size=box['height'],
-            scale=scale,
-            desc=desc,
-            category=category,
-            manufacturer=manufacturer
-        )
-
-
-class LCUUIDComponent(LCComponent):
-    def __init__(self, part_uuid, source_easyeda=True):
-        self.lcid = part_uuid
-        self.lc_data = None
-        self.raw_data = None
-        self.footprint = None
-        self.symbol = None
-        self.source_easyeda = source_easyeda
-
-    def load_componnt(self):
-        logger.info("下载数据 -> %s", self.lcid)
-
-        url = f"https://easyeda.com/api/components/{self.lcid}"
-
-        if not self.source_easyeda:
-            url = f"https://lceda.cn/api/components/{self.lcid}"
-
-        req = requests.get(url)
-
-        data = req.json()
-
-        if data['code'] != 0:
-            logger.critical(
-                "Unable to load component %s. Code: %s",
-                self.lcid,
-                data['message']
-            )
-            return False
-
-        self.raw_data = data['result']
-
-        if self.raw_data['docType'] == 2:
-            self.symbol = self.raw_data['dataStr']
-            self.footprint = self.raw_data['packageDetail']
-        elif self.raw_data['docType'] == 4:
-            self.footprint = self.raw_data
-
-        return True
-
-
 class LibManagerFrame(wx.Dialog):
     def __init__(self, *args, **kwds):
         # begin wxGlade: LibManager.__init__
@@ -423,6 +232,12 @@ class LibManagerFrame(wx.Dialog):
 
         sizer_2.AddSpacer(10)
 
+        # skip the component cache
+        self.btn_reload = wx.Button(self.panel_1, wx.ID_ANY, "重新下载")
+        sizer_2.Add(self.btn_reload, 0, wx.ALIGN_CENTER_HORIZONTAL, 0)
+
+        sizer_2.AddSpacer(10)
+
         self.btn_gen = wx.Button(self.panel_1, wx.ID_ANY, "导出")
         self.btn_gen.Disable()
         sizer_2.Add(self.btn_gen, 0, wx.ALIGN_CENTER_HORIZONTAL, 0)
@@ -450,9 +265,11 @@ class LibManagerControl:
         self.lib_name = lib_name
         self.footprint_manager = None
         self.schematic_manager = None
+        self.provenance = None
         self.frame = None
         self.component = None
         self.cx_handler = None
+        self.model3d_pool = ThreadPoolExecutor(max_workers=1)
 
     def disable_all_children(self, parent):
         for children in parent.GetChildren():
@@ -501,19 +318,17 @@ class LibManagerControl:
                 wx.YES_NO | wx.CANCEL,
                 self.frame
             )
-            if answer == wx.YES:
-                self.schematic_manager.add_schematic(
-                    symbol_name, symbol_data, update=True
-                )
-
-    def gen_footprint(self, footprint_name, model3d_name):
-        footprint_enabled = self.frame.cb_footprint.GetValue()
-        model3d_enabled = self.frame.cb_3dmodal.GetValue()
+            if answer != wx.YES:
+                return
+            self.schematic_manager.add_schematic(
+                symbol_name, symbol_data, update=True
+            )
 
-        if not footprint_enabled:
-            logger.info("Skip Footprint & 3D Model Generate.")
-            return
+        self.get_provenance().record(
+            SYMBOLS, symbol_name, self.component.symbol_provenance()
+        )
 
+    def get_footprint_manager(self):
         if self.footprint_manager is None:
             logger.info(
                 "Init Footprint Manager. Name: %s, Path: %s.",
@@ -524,6 +339,55 @@ class LibManagerControl:
                 self.lib_name
             )
 
+        return self.footprint_manager
+
+    def get_provenance(self):
+        if self.provenance is None:
+            self.provenance = Provenance(self.lib_root, self.lib_name)
+
+        return self.provenance
+
+    def prefetch_3d_model(self, model3d_name):
+        # download the 3D model while the symbol is generated
+        if not self.frame.cb_footprint.GetValue():
+            return None
+        if not self.frame.cb_3dmodal.GetValue():
+            return None
+
+        model_ref = self.component.get_model3d_ref()
+        if model_ref is None:
+            return None
+
+        footprint_manager = self.get_footprint_manager()
+        if footprint_manager.check_3d_model(model3d_name):
+            # wait for the update confirmation
+            return None
+
+        return self.model3d_pool.submit(
+            model_ref.fetch, footprint_manager.model_store
+        )
+
+    def discard_3d_model(self, model3d_future):
+        if model3d_future is None:
+            return
+
+        def discard(future):
+            if future.exception() is None:
+                future.result().discard()
+
+        model3d_future.add_done_callback(discard)
+
+    def gen_footprint(self, footprint_name, model3d_name, model3d_future=None):
+        footprint_enabled = self.frame.cb_footprint.GetValue()
+        model3d_enabled = self.frame.cb_3dmodal.GetValue()
+
+        if not footprint_enabled:
+            logger.info("Skip Footprint & 3D Model Generate.")
+            self.discard_3d_model(model3d_future)
+            return
+
+        self.get_footprint_manager()
+
         # check footprint exist or not
         t = self.footprint_manager.check_footprint(footprint_name)
         if t:
@@ -535,32 +399,43 @@ class LibManagerControl:
                 self.frame
             )
             if answer != wx.YES:
+                self.discard_3d_model(model3d_future)
                 return
 
         footprint_data = self.component.gen_footprint_data(footprint_name)
 
         # 3d model
+        model3d_ref = footprint_data.c_3d_model    # type: ignore
         if not model3d_enabled:
             logger.info("Skip 3D Model Generate.")
-            # return
-
-        model3d_data = footprint_data.c_3d_model    # type: ignore
-        t = self.footprint_manager.check_3d_model(model3d_name)
-        if t and model3d_data:
-            logger.info("Found 3D Model %s", model3d_name)
-            answer = wx.MessageBox(
-                "3D Model Already Exist.\nDo you want to Update?",
-                "Confirm",
-                wx.YES_NO | wx.CANCEL,
-                self.frame
-            )
-            if answer != wx.YES:
-                model3d_data = None
-
-        if model3d_data:
-            self.footprint_manager.add_3d_model(
-                model3d_name, model3d_data, True
-            )
+            self.discard_3d_model(model3d_future)
+            model3d_ref = None
+
+        if model3d_ref:
+            update = True
+            t = self.footprint_manager.check_3d_model(model3d_name)
+            if t:
+                logger.info("Found 3D Model %s", model3d_name)
+                answer = wx.MessageBox(
+                    "3D Model Already Exist.\nDo you want to Update?",
+                    "Confirm",
+                    wx.YES_NO | wx.CANCEL,
+                    self.frame
+                )
+                update = answer == wx.YES
+
+            if update:
+                model3d_data = model3d_ref
+                if model3d_future is not None:
+                    model3d_data = model3d_future.result()
+                self.footprint_manager.add_3d_model(
+                    model3d_name, model3d_data, True
+                )
+                self.get_provenance().record(
+                    MODELS,
+                    model3d_name,
+                    self.component.model3d_provenance(model3d_ref)
+                )
             model_path = self.footprint_manager.get_3d_model_ref_path(
                 model3d_name)
             footprint_data.append(
@@ -573,6 +448,9 @@ class LibManagerControl:
         self.footprint_manager.add_footprint(
             footprint_name, footprint_data, update=True
         )
+        self.get_provenance().record(
+            FOOTPRINTS, footprint_name, self.component.footprint_provenance()
+        )
 
     def check_lib_path(self):
         # 判断库路径是否为空
@@ -600,14 +478,16 @@ class LibManagerControl:
         footprint_name = self.frame.txt_footprint_name.GetValue()
         model3d_name = self.frame.txt_3dmodel_name.GetValue()
 
+        model3d_future = self.prefetch_3d_model(model3d_name)
         self.gen_symbol(symbol_name, footprint_name)
-        self.gen_footprint(footprint_name, model3d_name)
+        self.gen_footprint(footprint_name, model3d_name, model3d_future)
+        self.get_provenance().save()
         wx.MessageBox(
             "导出成功", 'Info', wx.OK | wx.ICON_INFORMATION
         )
 
-    def do_load_component(self, e):
-        ret = self.component.load_componnt()      # type: ignore
+    def do_load_component(self, e, use_cache=True):
+        ret = self.component.load_componnt(use_cache)      # type: ignore
         if not ret:
             return
 
@@ -646,6 +526,7 @@ class LibManagerControl:
             self.lib_root = new_path
             self.footprint_manager = None
             self.schematic_manager = None
+            self.provenance = None
             self.load_lib_name()
 
     def save_lib_name(self, name):
@@ -663,6 +544,10 @@ class LibManagerControl:
                 self.frame.txt_lib_name.SetValue(ctx)
 
     def log_handler(self, msg):
+        # the 3D model is fetched on model3d_pool, it logs from there
+        if not wx.IsMainThread():
+            wx.CallAfter(self.log_handler, msg)
+            return
         if not self.frame:
             return
 
@@ -679,6 +564,9 @@ class LibManagerControl:
         # Init Binds
         self.frame.btn_gen.Bind(wx.EVT_BUTTON, self.do_component_gen)
         self.frame.btn_load.Bind(wx.EVT_BUTTON, self.do_load_component)
+        self.frame.btn_reload.Bind(
+            wx.EVT_BUTTON, lambda e: self.do_load_component(e, use_cache=False)
+        )
         self.frame.select_symbol_scale.Bind(
             wx.EVT_COMBOBOX, self.calc_symbol_size
         )
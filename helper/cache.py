@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import re
+import time
+
+from pathlib import Path
+
+
+logger = logging.getLogger("KICONV")
+
+
+CACHE_ROOT = Path.home().joinpath(".easyeda2kicad", "cache")
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+# seconds an entry is used before it is checked against EasyEDA again
+CACHE_MAX_AGE = 24 * 60 * 60
+
+KEY_RE = re.compile(r"[^\w.-]+")
+
+
+class ComponentCache:
+    """
+    On-disk cache of raw EasyEDA component payloads.
+
+    Every entry is one JSON file holding the payload, its `updateTime` and
+    when it was last checked upstream. Entries older than `max_age` seconds
+    are not fresh, the caller checks them again. The file mtime is bumped
+    on every hit, so eviction drops the least recently used entries once
+    the directory grows over `max_size` bytes.
+    """
+
+    def __init__(
+        self, root=CACHE_ROOT, max_size=CACHE_MAX_SIZE, max_age=CACHE_MAX_AGE
+    ):
+        self.root = Path(root)
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def entry_path(self, key):
+        return self.root.joinpath(f"{KEY_RE.sub('_', key)}.json")
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with path.open('r', encoding='utf-8') as fp:
+                entry = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Component Cache: broken entry %s, drop it.", key)
+            self.discard(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        logger.debug("Component Cache: hit %s", key)
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('checked', 0) < self.max_age
+
+    def put(self, key, data, update_time=None):
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        path = self.entry_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        entry = {
+            'key': key,
+            'update_time': update_time,
+            'checked': time.time(),
+            'data': data
+        }
+        with tmp_path.open('w', encoding='utf-8') as fp:
+            json.dump(entry, fp, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def discard(self, key):
+        try:
+            self.entry_path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        if total <= self.max_size:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.debug("Component Cache: evict %s", path)
+
+
+component_cache = ComponentCache()
@@ -0,0 +1,413 @@
+import logging
+
+import requests
+
+from . import net
+from .cache import component_cache
+from .footprint import create_footprint
+from .footprint.cache import footprint_cache, footprint_key
+from .footprint.emitter import EMITTER
+from .footprint.footprint_handlers import MERGE_TRACKS, SIMPLIFY_TOLERANCE
+from .footprint.model3d import WRL_MODE, Model3DRef
+from .provenance import FOOTPRINTS, SYMBOLS, is_stale, make_record
+from .schematic import create_schematic
+from .shape import iter_shapes
+
+
+logger = logging.getLogger("KICONV")
+
+
+def fetch_svgs(lcid):
+    # symbol and footprint previews, with their uuid and updateTime
+    req = net.get(f"https://easyeda.com/api/products/{lcid}/svgs")
+
+    data = req.json()
+
+    if data['code'] != 0:
+        logger.warning(
+            "Unable to get SVG from EasyEDA. Code: %s", data['message']
+        )
+        return None
+
+    return data['result']
+
+
+def fetch_update_times(lcid):
+    # {docType: (component_uuid, updateTime)}, without the full component
+    result = fetch_svgs(lcid)
+    if result is None:
+        return None
+
+    return {
+        component['docType']: (
+            component['component_uuid'], component['updateTime']
+        )
+        for component in result
+    }
+
+
+def fetch_part_detail(lcid):
+    # LCSC part detail with its category tags, the lc_data of LCComponent
+    payload = {
+        'pageSize': 50,
+        'page': 1,
+        'returnListStyle': 'classifyarr',
+        'wd': lcid
+    }
+    req = net.post("https://pro.lceda.cn/api/devices/search", data=payload)
+
+    data = req.json()
+
+    if not isinstance(data, dict):
+        return None
+
+    parts = data['result']['lists'].get('lcsc')
+    if not parts:
+        return None
+
+    return parts[0]
+
+
+class LCComponent:
+
+    def __init__(self, lcid, lc_data=None):
+        self.lcid = lcid
+        self.lc_data = lc_data
+        self.raw_data = None
+        self.footprint = None
+        self.symbol = None
+
+    @property
+    def model3d_name(self):
+        if self.footprint is None:
+            logger.warning("3DModel Name not avaliable.")
+            return ""
+
+        return self.footprint['dataStr']['head']['c_para'].get('3DModel', "")
+
+    @property
+    def footprint_name(self):
+        if self.footprint is None:
+            logger.warning("Footprint Name not avaliable.")
+            return ""
+
+        # title = self.raw_data.get('title', self.lcid)
+        return self.footprint['title']
+
+    @property
+    def symbol_name(self):
+        if self.symbol is None:
+            logger.warning("Symbol Name not avaliable.")
+            return ""
+
+        return self.symbol['head']['c_para']['name']
+
+    @property
+    def cache_key(self):
+        return f"products-{self.lcid}"
+
+    def upstream_update_times(self):
+        return fetch_update_times(self.lcid)
+
+    def is_current(self, entry):
+        # entries past the max age are compared with the updateTime upstream
+        if component_cache.is_fresh(entry):
+            return True
+
+        try:
+            upstream = self.upstream_update_times()
+        except requests.RequestException:
+            # offline, the cached payload is still better than nothing
+            logger.warning("无法检查更新, 使用缓存 -> %s", self.lcid)
+            return True
+        if upstream is None:
+            return False
+
+        data = entry['data']
+        package = data.get('packageDetail') or {}
+        records = {
+            SYMBOLS: make_record(
+                self.lcid, data.get('uuid'), data.get('updateTime')
+            ),
+            FOOTPRINTS: make_record(
+                self.lcid, package.get('uuid'), package.get('updateTime')
+            ),
+        }
+        if any(
+            is_stale(kind, record, upstream)
+            for kind, record in records.items()
+        ):
+            return False
+
+        # unchanged, trusted for another max age
+        component_cache.put(self.cache_key, data, entry.get('update_time'))
+        return True
+
+    def fetch_component(self, url, use_cache=True):
+        if use_cache:
+            entry = component_cache.get(self.cache_key)
+            if entry is not None and self.is_current(entry):
+                logger.info("读取缓存 -> %s", self.lcid)
+                return entry['data']
+
+        logger.info("下载数据 -> %s", self.lcid)
+
+        req = net.get(url)
+
+        data = req.json()
+
+        if data['code'] != 0:
+            logger.critical(
+                "Unable to load component %s. Code: %s",
+                self.lcid,
+                data['message']
+            )
+            return None
+
+        result = data['result']
+        component_cache.put(
+            self.cache_key, result, result.get('updateTime')
+        )
+
+        return result
+
+    def load_componnt(self, use_cache=True):
+        raw_data = self.fetch_component(
+            f"https://easyeda.com/api/products/{self.lcid}/components",
+            use_cache
+        )
+        if raw_data is None:
+            return False
+
+        self.set_raw_data(raw_data)
+
+        return True
+
+    def set_raw_data(self, raw_data):
+        self.raw_data = raw_data
+
+        self.symbol = self.raw_data['dataStr']
+        self.footprint = self.raw_data['packageDetail']
+
+    def calc_symbol_size(self, scale=10):
+        if self.symbol is None:
+            return "Symbol not Avalible."
+
+        box = self.symbol['BBox']
+        bh = box['height'] * scale * 0.00254
+        bw = box['width'] * scale * 0.00254
+        ret = f"{bw:.2f} mm * {bh:.2f} mm"
+
+        return ret
+
+    def footprint_key(
+        self,
+        footprint_name,
+        wrl_mode=WRL_MODE,
+        emitter=EMITTER,
+        merge_tracks=MERGE_TRACKS,
+        simplify_tolerance=SIMPLIFY_TOLERANCE
+    ):
+        if self.footprint is None:
+            return None
+
+        return footprint_key(
+            self.footprint.get('uuid'),
+            self.footprint.get('updateTime'),
+            footprint_name,
+            self.raw_data.get('SMT', False),
+            wrl_mode,
+            emitter,
+            merge_tracks,
+            simplify_tolerance
+        )
+
+    def gen_footprint_data(
+        self,
+        footprint_name,
+        wrl_mode=WRL_MODE,
+        emitter=EMITTER,
+        merge_tracks=MERGE_TRACKS,
+        simplify_tolerance=SIMPLIFY_TOLERANCE
+    ):
+        if self.footprint is None:
+            logger.critical("Cannot Generate Footprint. Data Not Avalible.")
+            return None
+
+        # parts sharing a package reuse its footprint
+        key = self.footprint_key(
+            footprint_name, wrl_mode, emitter, merge_tracks,
+            simplify_tolerance
+        )
+        data = footprint_cache.get(key)
+        if data is not None:
+            return data
+
+        assembly_process = self.raw_data.get('SMT', False)
+        box = self.footprint['dataStr']['BBox']
+        canvas = self.footprint['dataStr']['canvas']
+        canvas = canvas.split("~")
+
+        data = create_footprint(
+            footprint_name,
+            self.footprint['dataStr']['shape'],
+            assembly_process,
+            c_x=float(canvas[16]),
+            c_y=float(canvas[17]),
+            size_x=float(box['width']),
+            size_y=float(box['height']),
+            wrl_mode=wrl_mode,
+            emitter=emitter,
+            merge_tracks=merge_tracks,
+            simplify_tolerance=simplify_tolerance,
+            update_time=self.footprint.get('updateTime')
+        )
+
+        data.setDescription(f"{footprint_name} footprint")
+        # data.setTags(f"{footprint_name} footprint")
+        footprint_cache.put(key, data)
+
+        return data
+
+    def get_model3d_ref(self, wrl_mode=WRL_MODE):
+        # same 3D model as gen_footprint_data, without parsing the footprint
+        if self.footprint is None:
+            return None
+
+        model_ref = None
+        for model, fields in iter_shapes(self.footprint['dataStr']['shape']):
+            if model == "SVGNODE":
+                model_ref = Model3DRef.from_svgnode(
+                    fields, wrl_mode, self.footprint.get('updateTime')
+                )
+
+        return model_ref
+
+    def symbol_provenance(self):
+        if self.symbol is None:
+            return None
+
+        return make_record(
+            self.lcid, self.raw_data.get('uuid'), self.raw_data.get('updateTime')
+        )
+
+    def footprint_provenance(self):
+        if self.footprint is None:
+            return None
+
+        return make_record(
+            self.lcid,
+            self.footprint.get('uuid'),
+            self.footprint.get('updateTime')
+        )
+
+    def model3d_provenance(self, model_ref):
+        # the model is converted from the footprint data
+        if self.footprint is None or model_ref is None:
+            return None
+
+        return make_record(
+            self.lcid,
+            model_ref.component_uuid,
+            self.footprint.get('updateTime')
+        )
+
+    def get_datasheet(self):
+        # type: ignore
+        datasheet = self.footprint['dataStr']['head']['c_para']['link']
+        if self.lc_data:
+            datasheet = self.lc_data["attributes"].get('Datasheet', "")
+
+        return datasheet
+
+    def gen_symbol_data(
+        self,
+        symbol_name,
+        footprint_name,
+        scale=10
+    ):
+        if self.symbol is None:
+            logger.critical("Cannot Generate Symbol Data. No Symbol Avalible.")
+            return None
+
+        box = self.symbol['BBox']
+        symmbolic_prefix = self.symbol['head']['c_para']['pre']
+        manufacturer = self.symbol['head']['c_para']['Manufacturer']
+        datasheet_link = self.get_datasheet()
+        category = " - "
+        desc = self.raw_data['description']     # type: ignore
+        if desc == "" and self.lc_data:
+            lc_desc = self.lc_data.get('description', "")
+            if lc_desc:
+                desc = lc_desc
+
+        # get datasheet
+        if self.lc_data is not None:
+            parent_catalog_name = self.lc_data["tags"]["parent_tag"].get(
+                'name', '-')
+            catalog_name = self.lc_data["tags"]["child_tag"].get('name', '-')
+            category = f"{parent_catalog_name} - {catalog_name}"
+
+        canvas = self.symbol['canvas']
+        canvas = canvas.split("~")
+
+        return create_schematic(
+            lcid=self.lcid,
+            schematic_title=symbol_name,
+            schematic_shape=self.symbol['shape'],
+            symmbolic_prefix=symmbolic_prefix,
+            footprint_name=footprint_name,
+            datasheet_link=datasheet_link,
+            # x_offset=box['x'],
+            # y_offset=box['y'],
+            x_offset=canvas[13],
+            y_offset=canvas[14],
+            x_size=box['width'],
+            y_size=box['height'],
+            scale=scale,
+            desc=desc,
+            category=category,
+            manufacturer=manufacturer
+        )
+
+
+class LCUUIDComponent(LCComponent):
+    def __init__(self, part_uuid, source_easyeda=True):
+        self.lcid = part_uuid
+        self.lc_data = None
+        self.raw_data = None
+        self.footprint = None
+        self.symbol = None
+        self.source_easyeda = source_easyeda
+
+    @property
+    def cache_key(self):
+        source = "easyeda" if self.source_easyeda else "lceda"
+        return f"components-{source}-{self.lcid}"
+
+    def upstream_update_times(self):
+        # no cheap check by uuid, old entries are downloaded again
+        return None
+
+    def load_componnt(self, use_cache=True):
+        url = f"https://easyeda.com/api/components/{self.lcid}"
+
+        if not self.source_easyeda:
+            url = f"https://lceda.cn/api/components/{self.lcid}"
+
+        raw_data = self.fetch_component(url, use_cache)
+        if raw_data is None:
+            return False
+
+        self.set_raw_data(raw_data)
+
+        return True
+
+    def set_raw_data(self, raw_data):
+        self.raw_data = raw_data
+
+        if self.raw_data['docType'] == 2:
+            self.symbol = self.raw_data['dataStr']
+            self.footprint = self.raw_data['packageDetail']
+        elif self.raw_data['docType'] == 4:
+            self.footprint = self.raw_data
@@ -1,2 +1,2 @@
 from .footprint import create_footprint
-from .manager import FootprintManager
\ No newline at end of file
+from .manager import FootprintManager, FootprintExist
@@ -0,0 +1,73 @@
+import logging
+import pickle
+import threading
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger("KICONV")
+
+
+FOOTPRINT_CACHE_SIZE = 256
+
+
+def footprint_key(
+    package_uuid,
+    update_time,
+    footprint_name,
+    assembly_process,
+    wrl_mode,
+    emitter,
+    merge_tracks,
+    simplify_tolerance
+):
+    # every input of create_footprint besides the package shapes
+    if not package_uuid:
+        return None
+
+    return (
+        package_uuid, update_time, footprint_name, bool(assembly_process),
+        wrl_mode, emitter, merge_tracks, simplify_tolerance
+    )
+
+
+class FootprintCache:
+    """
+    In-memory LRU of converted footprints.
+
+    Many LCSC parts share one EasyEDA package, its footprint is converted
+    once per process. Footprints are kept pickled, every `get()` returns a
+    new copy the caller is free to change.
+    """
+
+    def __init__(self, max_size=FOOTPRINT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if key is None:
+            return None
+
+        with self._lock:
+            data = self.entries.get(key)
+            if data is None:
+                return None
+            self.entries.move_to_end(key)
+
+        logger.debug("Footprint Cache: hit %s", key[2])
+        return pickle.loads(data)
+
+    def put(self, key, footprint):
+        if key is None or footprint is None:
+            return
+
+        data = pickle.dumps(footprint, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.entries[key] = data
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+footprint_cache = FootprintCache()
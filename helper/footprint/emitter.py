@@ -0,0 +1,337 @@
+from KicadModTree import Footprint, KicadFileHandler
+from KicadModTree import Arc, Circle, Line, Model, Pad, Polygon, RectLine, Text
+from KicadModTree.KicadFileHandler import DEFAULT_LAYER_WIDTH, DEFAULT_WIDTH
+from KicadModTree.util.kicad_util import SexprSerializer
+from KicadModTree.util.kicad_util import formatFloat, formatTimestamp, lispString
+
+from .pad_array import PadArray
+
+
+EMITTER_TREE = "tree"
+EMITTER_SEXPR = "sexpr"
+EMITTERS = (EMITTER_TREE, EMITTER_SEXPR)
+EMITTER = EMITTER_SEXPR
+
+# node groups in the order KicadFileHandler writes them
+NODE_GROUPS = ('Arc', 'Circle', 'Line', 'Pad', 'Polygon', 'Text')
+
+
+# only its per node methods are used
+NODE_SERIALIZER = KicadFileHandler(None)
+
+
+def fmt(value):
+    # same rendering as SexprSerializer.primitive_to_string
+    if type(value) is float:
+        return formatFloat(value)
+    if type(value) is int:
+        return str(value)
+
+    return lispString(value)
+
+
+def layer_width(layer, width):
+    if width is not None:
+        return width
+
+    return DEFAULT_LAYER_WIDTH.get(layer, DEFAULT_WIDTH)
+
+
+class TreeFootprint(Footprint):
+    """
+    KicadModTree footprint, every shape is a node of the render tree.
+    """
+
+    def add_line(self, start, end, width, layer):
+        self.append(Line(start=start, end=end, width=width, layer=layer))
+
+    def add_rect(self, start, end, layer, width=None):
+        self.append(RectLine(start=start, end=end, layer=layer, width=width))
+
+    def add_arc(self, center, start, end, width, layer):
+        self.append(
+            Arc(center=center, start=start, end=end, width=width, layer=layer)
+        )
+
+    def add_circle(self, center, radius, width, layer):
+        self.append(
+            Circle(center=center, radius=radius, width=width, layer=layer)
+        )
+
+    def add_polygon(self, nodes, width, layer):
+        self.append(Polygon(nodes=nodes, width=width, layer=layer))
+
+    def add_pad(
+        self,
+        number,
+        type,
+        shape,
+        at,
+        size,
+        rotation,
+        drill,
+        layers,
+        polygon=None
+    ):
+        primitives = ""
+        if polygon is not None:
+            primitives = [Polygon(nodes=polygon)]
+
+        self.append(
+            Pad(
+                number=number,
+                type=type,
+                shape=shape,
+                at=at,
+                size=size,
+                rotation=rotation,
+                drill=drill,
+                layers=layers,
+                primitives=primitives
+            )
+        )
+
+    def add_text(self, type, text, at, layer):
+        self.append(Text(type=type, text=text, at=at, layer=layer))
+
+    def to_kicad_mod(self, timestamp=None):
+        return KicadFileHandler(self).serialize(timestamp=timestamp)
+
+
+class SexprFootprint:
+    """
+    Footprint written straight to .kicad_mod S-expressions.
+
+    Same interface and output as TreeFootprint without keeping a render
+    tree. Lines are formatted as they are added. Consecutive plain pads of
+    one kind with a constant pitch and counting numbers are kept as a
+    PadArray, what they share is formatted once and their positions and
+    numbers are generated on output. The other shapes are serialized node
+    by node with KicadFileHandler. `append()` takes the nodes added after
+    conversion, like the 3D Model.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.description = None
+        self.tags = None
+        self.c_3d_model = None
+        self.c_3d_model_rotation = None
+        self.groups = {group: [] for group in NODE_GROUPS}
+        self.references = []
+        self.values = []
+        self.models = []
+        # formatted once for all the pads of a row or grid
+        self.pad_kinds = {}
+        self.coords = {}
+
+    def setDescription(self, description):
+        self.description = description
+
+    def setTags(self, tags):
+        self.tags = tags
+
+    def add_node(self, group, node):
+        sexpr = NODE_SERIALIZER._callSerialize(node)
+        # nodes of the module list follow a line break, see SexprSerializer
+        text = SexprSerializer(None).sexpr_to_string(sexpr, " ")
+        group.append(text.replace("\n", "\n "))
+
+    def coord(self, value):
+        text = self.coords.get(value)
+        if text is None:
+            text = self.coords[value] = formatFloat(float(value))
+
+        return text
+
+    def pad_kind(self, type, shape, size, rotation, drill, layers):
+        # "type shape", " rotation" and "(size ...) (drill ...) (layers ...))"
+        sx = float(size[0])
+        sy = float(size[1])
+        if shape == Pad.SHAPE_OVAL and sx == sy:
+            shape = Pad.SHAPE_CIRCLE
+
+        rotation_text = ""
+        if rotation % 360 != 0:
+            rotation_text = f" {fmt(rotation)}"
+
+        tail = [f"(size {formatFloat(sx)} {formatFloat(sy)})"]
+        if type in (Pad.TYPE_THT, Pad.TYPE_NPTH):
+            tail.append(f"(drill {formatFloat(float(drill))})")
+        tail.append(f"(layers {' '.join(lispString(layer) for layer in layers)}))")
+
+        return (
+            f"{lispString(type)} {lispString(shape)}", rotation_text,
+            " ".join(tail)
+        )
+
+    def add_line(self, start, end, width, layer):
+        self.groups['Line'].append(
+            f"(fp_line (start {formatFloat(float(start[0]))} {formatFloat(float(start[1]))})"
+            f" (end {formatFloat(float(end[0]))} {formatFloat(float(end[1]))})"
+            f" (layer {lispString(layer)}) (width {fmt(layer_width(layer, width))}))"
+        )
+
+    def add_rect(self, start, end, layer, width=None):
+        x1, y1 = start
+        x2, y2 = end
+        corners = [(x1, y1), (x1, y2), (x2, y2), (x2, y1), (x1, y1)]
+        for line_start, line_end in zip(corners, corners[1:]):
+            self.add_line(line_start, line_end, width, layer)
+
+    def add_arc(self, center, start, end, width, layer):
+        self.add_node(
+            self.groups['Arc'],
+            Arc(center=center, start=start, end=end, width=width, layer=layer)
+        )
+
+    def add_circle(self, center, radius, width, layer):
+        self.add_node(
+            self.groups['Circle'],
+            Circle(center=center, radius=radius, width=width, layer=layer)
+        )
+
+    def add_polygon(self, nodes, width, layer):
+        self.add_node(
+            self.groups['Polygon'],
+            Polygon(nodes=nodes, width=width, layer=layer)
+        )
+
+    def add_pad(
+        self,
+        number,
+        type,
+        shape,
+        at,
+        size,
+        rotation,
+        drill,
+        layers,
+        polygon=None
+    ):
+        if polygon is not None:
+            # custom pads span several lines
+            self.add_node(
+                self.groups['Pad'],
+                Pad(
+                    number=number,
+                    type=type,
+                    shape=shape,
+                    at=at,
+                    size=size,
+                    rotation=rotation,
+                    drill=drill,
+                    layers=layers,
+                    primitives=[Polygon(nodes=polygon)]
+                )
+            )
+            return
+
+        key = (type, shape, tuple(size), rotation, drill, tuple(layers))
+        kind = self.pad_kinds.get(key)
+        if kind is None:
+            kind = self.pad_kinds[key] = self.pad_kind(
+                type, shape, size, rotation, drill, layers
+            )
+
+        pads = self.groups['Pad']
+        if pads and isinstance(pads[-1], PadArray) and pads[-1].add(
+                kind, number, at):
+            return
+
+        array = PadArray.start(kind, number, at)
+        if array is not None:
+            pads.append(array)
+            return
+
+        pads.append(self.pad_line(kind, number, at))
+
+    def pad_line(self, kind, number, at):
+        head, rotation_text, tail = kind
+
+        return (
+            f"(pad {fmt(number)} {head}"
+            f" (at {self.coord(at[0])} {self.coord(at[1])}{rotation_text}) {tail}"
+        )
+
+    def coord_rows(self, rows):
+        # formatted once for the rows sharing their coordinates
+        values = texts = None
+        for row in rows:
+            if row is not values:
+                values = row
+                texts = [self.coord(value) for value in row]
+            yield texts
+
+    def array_lines(self, array):
+        head, rotation_text, tail = array.kind
+        rows = zip(
+            array.rows,
+            self.coord_rows(array.coordinates(0)),
+            self.coord_rows(array.coordinates(1))
+        )
+        for (prefix, first, count), xs, ys in rows:
+            # quoted or not by its prefix, the digits have no white space
+            left, _, right = fmt(f"{prefix}0").rpartition("0")
+            for c in range(count):
+                yield (
+                    f"(pad {left}{first + c}{right} {head}"
+                    f" (at {xs[c]} {ys[c]}{rotation_text}) {tail}"
+                )
+
+    def pad_lines(self):
+        for pad in self.groups['Pad']:
+            if isinstance(pad, PadArray):
+                yield from self.array_lines(pad)
+            else:
+                yield pad
+
+    def add_text(self, type, text, at, layer):
+        if type == 'reference':
+            group = self.references
+        elif type == 'value':
+            group = self.values
+        else:
+            group = self.groups['Text']
+
+        self.add_node(group, Text(type=type, text=text, at=at, layer=layer))
+
+    def append(self, node):
+        if not isinstance(node, Model):
+            raise TypeError(f"{node.__class__.__name__} can not be added here")
+
+        self.add_node(self.models, node)
+
+    def to_kicad_mod(self, timestamp=None):
+        lines = [
+            f"(module {lispString(self.name)} (layer F.Cu)"
+            f" (tedit {formatTimestamp(timestamp)})"
+        ]
+        if self.description:
+            lines.append(f"(descr {lispString(self.description)})")
+        if self.tags:
+            lines.append(f"(tags {lispString(self.tags)})")
+
+        lines.extend(self.references)
+        lines.extend(self.values)
+        for group in NODE_GROUPS:
+            if group == 'Pad':
+                lines.extend(self.pad_lines())
+            else:
+                lines.extend(self.groups[group])
+        lines.extend(self.models)
+
+        return "\n  ".join(lines) + "\n)"
+
+
+FOOTPRINT_EMITTERS = {
+    EMITTER_TREE: TreeFootprint,
+    EMITTER_SEXPR: SexprFootprint,
+}
+
+
+def serialize_footprint(footprint, timestamp=None):
+    if isinstance(footprint, (TreeFootprint, SexprFootprint)):
+        return footprint.to_kicad_mod(timestamp)
+
+    return KicadFileHandler(footprint).serialize(timestamp=timestamp)
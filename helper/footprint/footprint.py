@@ -2,8 +2,11 @@
 # import json
 import logging
 
-from KicadModTree import Footprint, Text, Translation
-from .footprint_handlers import FOOTPRINT_HANDLER
+from ..shape import iter_shapes
+from .emitter import EMITTER, FOOTPRINT_EMITTERS
+from .footprint_handlers import FOOTPRINT_HANDLER, MERGE_TRACKS
+from .footprint_handlers import SIMPLIFY_TOLERANCE
+from .model3d import WRL_MODE
 
 
 logger = logging.getLogger("KICONV")
@@ -15,7 +18,11 @@ class FootprintInfo():
         footprint_name,
         assembly_process,
         c_x=0,
-        c_y=0
+        c_y=0,
+        wrl_mode=WRL_MODE,
+        merge_tracks=MERGE_TRACKS,
+        simplify_tolerance=SIMPLIFY_TOLERANCE,
+        update_time=None
     ):
         # # I will be using these to calculate the bounding box
         # because the node.calculateBoundingBox() methode does not
@@ -28,6 +35,13 @@ class FootprintInfo():
         self.c_y = c_y
         self._assembly_process = assembly_process
         self.footprint_name = footprint_name
+        self.wrl_mode = wrl_mode
+        self.merge_tracks = merge_tracks
+        self.simplify_tolerance = simplify_tolerance
+        self.update_time = update_time
+        # shared by the pads of rows and grids, see pad_kind()
+        self.pad_kinds = {}
+        self.pad_coords = ({}, {})
 
     def assembly_process(self):
         if self._assembly_process is True:
@@ -42,7 +56,12 @@ def create_footprint(
     c_x=0,
     c_y=0,
     size_x=0,
-    size_y=0
+    size_y=0,
+    wrl_mode=WRL_MODE,
+    emitter=EMITTER,
+    merge_tracks=MERGE_TRACKS,
+    simplify_tolerance=SIMPLIFY_TOLERANCE,
+    update_time=None
 ):
     logger.info("Footprint: creating footprint ...")
 
@@ -52,8 +71,8 @@ def create_footprint(
 
     # footprint_name, datasheet_link, assembly_process = get_footprint_info(component_id)
 
-    # init kicad footprint
-    kicad_mod = Footprint(footprint_name)
+    # init kicad footprint, a KicadModTree tree or written S-expressions
+    kicad_mod = FOOTPRINT_EMITTERS[emitter](footprint_name)
     # assign tmp node to store footprint 3d info.
     kicad_mod.c_3d_model = None     # type: ignore
     kicad_mod.c_3d_model_rotation = None     # type: ignore
@@ -65,60 +84,54 @@ def create_footprint(
         footprint_name=footprint_name,
         assembly_process=assembly_process,
         c_x=c_x,
-        c_y=c_y
+        c_y=c_y,
+        wrl_mode=wrl_mode,
+        merge_tracks=merge_tracks,
+        simplify_tolerance=simplify_tolerance,
+        update_time=update_time
     )
 
     # for each line in data : use the appropriate handler
-    for line in footprint_shape:
-        # split and remove empty string in list
-        args = [i for i in line.split("~") if i]
-        model = args[0]
-        logger.debug("Footprint: args->%s", args)
-        if model not in FOOTPRINT_HANDLER:
+    get_handler = FOOTPRINT_HANDLER.get
+    for model, fields in iter_shapes(footprint_shape):
+        logger.debug("Footprint: %s args->%s", model, fields)
+        build_func = get_handler(model)
+        if build_func is None:
             logger.warning("Footprint: model not in handler->%s", model)
             continue
 
-        if model == "SVGNODE":
-            func = FOOTPRINT_HANDLER.get("SVGNODE")
-            kicad_mod.c_3d_model, kicad_mod.c_3d_model_rotation = func(args[1:], kicad_mod, footprint_info)    # type: ignore
-        else:
-            build_func = FOOTPRINT_HANDLER.get(model)
-            build_func(args[1:], kicad_mod, footprint_info)     # type: ignore
+        build_func(fields, kicad_mod, footprint_info)
+
+    logger.debug("Footprint: %s pad kinds.", len(footprint_info.pad_kinds))
 
     # set general values
-    kicad_mod.append(
-        Text(
-            type='reference',
-            text='REF**',
-            at=[
-                0,
-                size_y / 2 * 0.254 + 2
-            ],
-            layer='F.SilkS'
-        )
+    kicad_mod.add_text(
+        type='reference',
+        text='REF**',
+        at=[
+            0,
+            size_y / 2 * 0.254 + 2
+        ],
+        layer='F.SilkS'
+    )
+    kicad_mod.add_text(
+        type='user',
+        text='REF**',
+        at=[
+            0,
+            size_y / 2 * 0.254 + 4
+        ],
+        layer='F.Fab'
     )
-    kicad_mod.append(
-        Text(
-            type='user',
-            text='REF**',
-            at=[
-                0,
-                size_y / 2 * 0.254 + 4
-            ],
-            layer='F.Fab'
-        )
+    kicad_mod.add_text(
+        type='value',
+        text=footprint_name,
+        at=[
+            0,
+            size_y / 2 * 0.254 + 2
+        ],
+        layer='F.Fab'
     )
-    kicad_mod.append(
-        Text(
-            type='value',
-            text=footprint_name,
-            at=[
-                0,
-                size_y / 2 * 0.254 + 2
-            ],
-            layer='F.Fab'
-            )
-        )
 
     # translate the footprint to be centered around 0,0
     # kicad_mod.insert(Translation(-(footprint_info.min_X + footprint_info.max_X)/2, -(footprint_info.min_Y + footprint_info.max_Y)/2))
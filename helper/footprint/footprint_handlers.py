@@ -1,17 +1,24 @@
-import json
 import math
 import logging
 
 from KicadModTree import *
-from .model3d import get_3Dmodel
-
-from svg.path import parse_path
-from svg.path import Arc as svg_ARC
+from ..geometry import merge_collinear, simplify_polygon
+from ..numeric import VECTORIZE_MIN_POINTS, float_array, np, py_round
+from ..shape import field
+from ..svgpath import parse_path, path_points
+from ..svgpath import Arc as svg_ARC
+from .model3d import Model3DRef
 
 
 logger = logging.getLogger("KICONV")
 
 
+# join the collinear segments of a TRACK in one line
+MERGE_TRACKS = False
+# Douglas-Peucker tolerance of solid regions and custom pads in mm, 0 is off
+SIMPLIFY_TOLERANCE = 0
+
+
 layer_correspondance = {
     "1": "F.Cu",
     "2": "B.Cu",
@@ -38,6 +45,33 @@ def mil2mm(x, y, footprint_info):
     return round(nx, 2), round(ny, 2)
 
 
+def mil2mm_points(points, footprint_info):
+    """
+    mil2mm of every point of a "x1 y1 x2 y2 ..." string, in one pass.
+    """
+    return mil2mm_values(points.split(" "), footprint_info)
+
+
+def mil2mm_values(values, footprint_info):
+    # same for a flat [x1, y1, x2, y2, ...] list
+    count = len(values) // 2
+    c_x = footprint_info.c_x
+    c_y = footprint_info.c_y
+
+    if np is not None and count >= VECTORIZE_MIN_POINTS:
+        coords = float_array(values[:count * 2], count * 2).reshape(-1, 2)
+        coords = (coords - (c_x, c_y)) * 10 * 0.0254
+        return list(map(tuple, py_round(coords, 2).tolist()))
+
+    return [
+        (
+            round((float(x) - c_x) * 10 * 0.0254, 2),
+            round((float(y) - c_y) * 10 * 0.0254, 2)
+        )
+        for x, y in zip(values[0::2], values[1::2])
+    ]
+
+
 def smil2mm(x, y):
     return round(float(x) * 10 * 0.0254, 2), round(float(y) * 10 * 0.0254, 2)
 
@@ -47,56 +81,53 @@ def pmil2mm(x):
 
 
 def h_TRACK(data, kicad_mod, footprint_info):
+    # TRACK~width~layer~net~points~id~locked
     width = pmil2mm(data[0])
 
-    # points = [mil2mm(p) for p in data[2].split(" ")]
-    points = data[2].split(" ")
-    nodes = []
+    try:
+        layer = layer_correspondance[data[1]]
+    except KeyError:
+        logger.exception(
+            "Footprint(h_TRACK): layer correspondance not found."
+        )
+        layer = "F.SilkS"
 
-    for x, y in zip(*[iter(points)] * 2):
-        nodes.append(mil2mm(x, y, footprint_info))
+    nodes = mil2mm_points(data[3], footprint_info)
+    if footprint_info.merge_tracks:
+        nodes = merge_collinear(nodes)
 
-    for i in range(len(nodes) - 1):
+    for start, end in zip(nodes, nodes[1:]):
+        # append line to kicad_mod
+        kicad_mod.add_line(start, end, width, layer)
 
-        start = nodes[i]
-        end = nodes[i + 1]
 
-        try:
-            layer = layer_correspondance[data[1]]
-        except:
-            logger.exception(
-                "Footprint(h_TRACK): layer correspondance not found."
-            )
-            layer = "F.SilkS"
+PAD_SHAPES = {
+    "OVAL": "SHAPE_OVAL",
+    "RECT": "SHAPE_RECT",
+    "ELLIPSE": "SHAPE_CIRCLE",
+    "POLYGON": "SHAPE_CUSTOM",
+}
 
-        # append line to kicad_mod
-        kicad_mod.append(
-            Line(
-                start=start,
-                end=end,
-                width=width,
-                layer=layer
-            )
-        )
 
+def pad_kind(data, footprint_info):
+    """
+    Shape, size, rotation, drill, type and layers of a PAD.
 
-def h_PAD(data, kicad_mod, footprint_info):
-    shape_correspondance = {
-        "OVAL": "SHAPE_OVAL",
-        "RECT": "SHAPE_RECT",
-        "ELLIPSE": "SHAPE_CIRCLE",
-        "POLYGON": "SHAPE_CUSTOM",
-    }
+    The pads of a row or grid share all of them, they are worked out once
+    per distinct pad of the footprint.
+    """
+    key = (data[0], data[3], data[4], data[5], field(data, 8), field(data, 10))
+    kind = footprint_info.pad_kinds.get(key)
+    if kind is not None:
+        return kind
 
     rotation = 0
-    primitives = ""
     pad_shape = "SHAPE_OVAL"
     pad_drill = None
     pad_type = Pad.TYPE_SMT
     pad_layer = Pad.LAYERS_SMT
-    pad_number = data[6]
 
-    hole_size = float(data[7])
+    hole_size = float(field(data, 8, 0))
 
     # back layer
     if data[5] == "2":
@@ -110,54 +141,81 @@ def h_PAD(data, kicad_mod, footprint_info):
         # if pad_drill_h > 0:
         #     pad_drill = (pad_drill_h, pad_drill)
 
-    pad_position = mil2mm(data[1], data[2], footprint_info)
     pad_size = smil2mm(data[3], data[4])
 
-    if data[0] in shape_correspondance:
-        pad_shape = shape_correspondance[data[0]]
+    if data[0] in PAD_SHAPES:
+        pad_shape = PAD_SHAPES[data[0]]
     else:
         logger.error("Footprint(PAD): no correspondance found, using defualt SHAPE_OVAL.")
 
-    if pad_shape == "SHAPE_OVAL":
-        rotation = float(data[9])
-    elif pad_shape == "SHAPE_CUSTOM":
-        nodes = []
-        ori_points = data[8].split(" ")
-        for x, y in zip(*[iter(ori_points)] * 2):
-            nodes.append(mil2mm(x, y, footprint_info))
-        primitives = [Polygon(nodes=nodes)]
-    elif pad_shape == "SHAPE_CIRCLE":
-        pass
-    elif pad_shape == "SHAPE_RECT":
-        rotation = float(data[9])
-
-    kicad_mod.append(
-        Pad(
-            number=pad_number,
-            type=pad_type,
-            shape=getattr(Pad, pad_shape),
-            at=pad_position,
-            size=pad_size,
-            rotation=rotation,
-            drill=pad_drill,
-            layers=pad_layer,
-            primitives=primitives
+    if pad_shape in ("SHAPE_OVAL", "SHAPE_RECT"):
+        rotation = float(field(data, 10, 0))
+
+    kind = (
+        getattr(Pad, pad_shape), pad_size, rotation, pad_drill, pad_type,
+        pad_layer
+    )
+    footprint_info.pad_kinds[key] = kind
+
+    return kind
+
+
+def pad_position(x, y, footprint_info):
+    # mil2mm, pads of a column share x and pads of a row share y
+    x_cache, y_cache = footprint_info.pad_coords
+
+    nx = x_cache.get(x)
+    if nx is None:
+        nx = x_cache[x] = round(
+            (float(x) - footprint_info.c_x) * 10 * 0.0254, 2
+        )
+
+    ny = y_cache.get(y)
+    if ny is None:
+        ny = y_cache[y] = round(
+            (float(y) - footprint_info.c_y) * 10 * 0.0254, 2
         )
+
+    return nx, ny
+
+
+def h_PAD(data, kicad_mod, footprint_info):
+    # PAD~shape~x~y~width~height~layer~net~number~holeR~points~rotation~id~...
+    pad_shape, pad_size, rotation, pad_drill, pad_type, pad_layer = pad_kind(
+        data, footprint_info
+    )
+
+    polygon = None
+    if pad_shape == Pad.SHAPE_CUSTOM:
+        polygon = simplify_polygon(
+            mil2mm_points(data[9], footprint_info),
+            footprint_info.simplify_tolerance
+        )
+
+    kicad_mod.add_pad(
+        number=data[7],
+        type=pad_type,
+        shape=pad_shape,
+        at=pad_position(data[1], data[2], footprint_info),
+        size=pad_size,
+        rotation=rotation,
+        drill=pad_drill,
+        layers=pad_layer,
+        polygon=polygon
     )
 
 
 def h_ARC(data, kicad_mod, footprint_info):
     # append an Arc to the footprint
+    # ARC~width~layer~net~path~helperDots~id~locked
     try:
         # parse the data
-        if data[2][0] == "M":
-            # startX, startY, midX, midY, _, _, _, endX, endY = [val for val in data[2].replace("M", "").replace("A", "").replace(",", " ").split(" ") if val]
-            path = parse_path(data[2])
-        elif data[3][0] == "M":
-            path = parse_path(data[3])
-            # startX, startY, midX, midY, _, _, _, endX, endY = [val for val in data[3].replace("M", "").replace("A", "").replace(",", " ").split(" ") if val]
-        else:
+        if not data[3].startswith("M"):
             logger.warning("Footprint: failed to parse footprint ARC data")
+            return
+
+        # startX, startY, midX, midY, _, _, _, endX, endY = [val for val in data[3].replace("M", "").replace("A", "").replace(",", " ").split(" ") if val]
+        path = parse_path(data[3])
 
         width = pmil2mm(data[0])
         sarc = path[1]
@@ -171,14 +229,12 @@ def h_ARC(data, kicad_mod, footprint_info):
             logger.warning('Footprint(Arc): layer correspondance not found')
             layer = "F.SilkS"
 
-        kicad_mod.append(
-            Arc(
-                center=mil2mm(sarc.center.real, sarc.center.imag, footprint_info),
-                end=mil2mm(sarc.start.real, sarc.start.imag, footprint_info),
-                start=mil2mm(sarc.end.real, sarc.end.imag, footprint_info),
-                width=width,
-                layer=layer
-            )
+        kicad_mod.add_arc(
+            center=mil2mm(sarc.center.real, sarc.center.imag, footprint_info),
+            end=mil2mm(sarc.start.real, sarc.start.imag, footprint_info),
+            start=mil2mm(sarc.end.real, sarc.end.imag, footprint_info),
+            width=width,
+            layer=layer
         )
     except:
         logger.exception("Footprint(Arc): failed to add ARC")
@@ -203,13 +259,11 @@ def h_CIRCLE(data, kicad_mod, footprint_info):
         logger.exception('Footprint(Circle): footprint layer correspondance not found')
         layer = "F.SilkS"
 
-    kicad_mod.append(
-        Circle(
-            center=center,
-            radius=radius,
-            width=width,
-            layer=layer
-        )
+    kicad_mod.add_circle(
+        center=center,
+        radius=radius,
+        width=width,
+        layer=layer
     )
 
 
@@ -230,43 +284,68 @@ def h_RECT(data, kicad_mod, footprint_info):
         logger.exception('Footprint(Circle): footprint layer correspondance not found')
         layer = "F.SilkS"
 
-    kicad_mod.append(
-        RectLine(
-            start=start,
-            end=[start[0] + width, start[1] + height],
-            # width=0.2,
-            layer=layer
-        )
+    kicad_mod.add_rect(
+        start=start,
+        end=[start[0] + width, start[1] + height],
+        # width=0.2,
+        layer=layer
     )
 
 
 def h_SOLIDREGION(data, kicad_mod, footprint_info):
-    pass
+    # SOLIDREGION~layer~net~path~type~id~~~~locked
+    region_type = field(data, 3, "solid")
+    if region_type != "solid":
+        logger.warning("Footprint: SOLIDREGION %s not supported.", region_type)
+        return
+
+    try:
+        layer = layer_correspondance[data[0]]
+    except KeyError:
+        logger.warning('Footprint(SOLIDREGION): layer correspondance not found')
+        return
+
+    try:
+        values = []
+        for point in path_points(data[2]):
+            values.append(point.real)
+            values.append(point.imag)
+        nodes = merge_collinear(mil2mm_values(values, footprint_info))
+        nodes = simplify_polygon(nodes, footprint_info.simplify_tolerance)
+    except:
+        logger.exception("Footprint(SOLIDREGION): failed to parse the region")
+        return
+
+    # KiCad closes the polygon
+    if len(nodes) > 1 and nodes[0] == nodes[-1]:
+        nodes.pop()
+    if len(nodes) < 3:
+        logger.warning("Footprint(SOLIDREGION): region without area skipped.")
+        return
+
+    kicad_mod.add_polygon(nodes=nodes, width=0, layer=layer)
 
 
 def h_SVGNODE(data, kicad_mod, footprint_info):
-    # create 3D model as a WRL file
-    model_data = get_3Dmodel(
-        component_uuid=json.loads(data[0])["attrs"]["uuid"],
-        footprint_info=footprint_info,
-        kicad_mod=kicad_mod,
-        translationZ=json.loads(data[0])["attrs"]["z"],
-        rotation=json.loads(data[0])["attrs"]["c_rotation"]
+    # only record the 3D model, it is downloaded and converted on export
+    model_ref = Model3DRef.from_svgnode(
+        data, footprint_info.wrl_mode, footprint_info.update_time
     )
-    return model_data
+    kicad_mod.c_3d_model = model_ref
+    kicad_mod.c_3d_model_rotation = model_ref.rotate
 
 
 def h_HOLE(data, kicad_mod, footprint_info):
     hole_size = pmil2mm(float(data[2]) * 2)     # R -> Dia
-    kicad_mod.append(
-        Pad(
-            type=Pad.TYPE_NPTH,
-            shape=Pad.SHAPE_CIRCLE,
-            layers=Pad.LAYERS_NPTH,
-            at=mil2mm(data[0], data[1], footprint_info),
-            size=(hole_size, hole_size),
-            drill=hole_size,
-        )
+    kicad_mod.add_pad(
+        number="",
+        type=Pad.TYPE_NPTH,
+        shape=Pad.SHAPE_CIRCLE,
+        at=mil2mm(data[0], data[1], footprint_info),
+        size=(hole_size, hole_size),
+        rotation=0,
+        drill=hole_size,
+        layers=Pad.LAYERS_NPTH
     )
 
 
@@ -1,12 +1,34 @@
 import logging
+import os
+import re
 
 from pathlib import Path
-from KicadModTree import KicadFileHandler
+from ..listing import DirListing
+from ..lock import FileLock
+from .emitter import serialize_footprint
+from .model3d import Model3DRef, WRLModel
+from .store import ModelStore
 
 
 logger = logging.getLogger("KICONV")
 
 
+# the tedit timestamp changes every time a footprint is serialized
+TEDIT_RE = re.compile(r"\(tedit [0-9A-Fa-f]+\)")
+
+
+def same_content(path, text, ignore=None):
+    try:
+        old_text = path.read_text(encoding='utf-8')
+    except (FileNotFoundError, UnicodeDecodeError):
+        return False
+
+    if ignore is not None:
+        return ignore.sub("", old_text, 1) == ignore.sub("", text, 1)
+
+    return old_text == text
+
+
 class FootprintExist(Exception):
     pass
 
@@ -18,40 +40,75 @@ class FootprintManager:
         self.lib_prefix = lib_prefix
         self.lib_path = Path(root_path).joinpath(f"{lib_name}.pretty")
         self.lib_3d_path = Path(root_path).joinpath(f"{lib_name}.3dshapes")
+        # existence checks read these instead of a stat per file
+        self.footprints = DirListing.get(self.lib_path)
+        self.models = DirListing.get(self.lib_3d_path)
 
         self.post_init_check()
+        # held by every process while it writes the footprint library
+        self.lock = FileLock(
+            Path(root_path).joinpath(f".{lib_name}.pretty.lock")
+        )
+        self.model_store = ModelStore(self.lib_3d_path)
 
     def post_init_check(self):
-        if not self.lib_path.exists():
+        if not self.footprints.exists():
             logger.warn("Footprint Manager: Footprint Path not exists, create it.")
             self.lib_path.mkdir()
+            self.footprints.refresh(force=True)
 
-        if not self.lib_3d_path.exists():
+        if not self.models.exists():
             logger.warn("Footprint Manager: 3D Model Path not exists, create it.")
             self.lib_3d_path.mkdir()
+            self.models.refresh(force=True)
 
     def add_footprint(self, name, data, update=False):
         footprint_path = self.lib_path.joinpath(f"{name}.kicad_mod")
-        if self.check_footprint(name) and not update:
-            raise FootprintExist()
-
-        file_handler = KicadFileHandler(data)
-        file_handler.writeFile(str(footprint_path))
-        # file_handler.writeFile(f'{output_dir}/{footprint_lib}/{footprint_name}.kicad_mod')
+        with self.lock:
+            # another process may have added it, only this file is checked
+            if footprint_path.exists():
+                self.footprints.add(footprint_path.name)
+                if not update:
+                    raise FootprintExist()
+
+            text = serialize_footprint(data)
+            if same_content(footprint_path, text, TEDIT_RE):
+                logger.info("Footprint Manager: Footprint %s unchanged, skip.", name)
+                return False
+
+            # readers never see a half written footprint
+            before = self.footprints.stat()
+            tmp_path = footprint_path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open('w', encoding='utf-8', newline='\n') as fp:
+                fp.write(text)
+            os.replace(tmp_path, footprint_path)
+            self.footprints.add(footprint_path.name, before=before)
         logger.info("Footprint Manager: Footprint add to %s", str(footprint_path))
+        return True
 
     def add_3d_model(self, name, data, update=False):
         model_path = self.lib_3d_path.joinpath(f"{name}.wrl")
-        model_path.write_text(data)
+        if isinstance(data, Model3DRef):
+            data = data.fetch(self.model_store)
+
+        if isinstance(data, WRLModel):
+            # saved once in the store, the named file is a hardlink to it
+            model_path = self.model_store.put(data)
+            self.model_store.link(name, model_path)
+        elif same_content(model_path, data):
+            logger.info("Footprint Manager: 3D Model %s unchanged, skip.", name)
+            return
+        else:
+            model_path.write_text(data)
+        self.models.add(f"{name}.wrl")
         logger.info("Footprint Manager: 3D Model add to %s", str(model_path))
 
     def check_footprint(self, name):
-        footprint_path = self.lib_path.joinpath(f"{name}.kicad_mod")
-        return footprint_path.exists()
+        return f"{name}.kicad_mod" in self.footprints
 
     def check_3d_model(self, name):
-        model_path = self.lib_3d_path.joinpath(f"{name}.wrl")
-        return model_path.exists()
+        return f"{name}.wrl" in self.models
 
     def get_3d_model_ref_path(self, name):
-        return f"${{KIPRJMOD}}/{self.lib_prefix}/{self.lib_name}.3dshapes/{name}.wrl"
+        filename = self.model_store.resolve(name) or f"{name}.wrl"
+        return f"${{KIPRJMOD}}/{self.lib_prefix}/{self.lib_name}.3dshapes/{filename}"
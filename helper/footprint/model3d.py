@@ -1,60 +1,32 @@
-import requests
+import codecs
+import json
 import logging
+import operator
 import os
+import re
+import shutil
+import tempfile
 
 from KicadModTree import *
+from .. import net
+from ..numeric import np, py_round
+from ..shape import join_fields
+from .store import model_key
 
 
 logger = logging.getLogger("KICONV")
 
 
-def get_3Dmodel(
-    component_uuid, footprint_info, kicad_mod, translationZ, rotation
-):
-    logger.info("3DModel: creating 3D model ...")
-
-    lines = requests.get(f"https://easyeda.com/analyzer/api/3dmodel/{component_uuid}").content.decode().split("\n")
-
-    vertices = []
-    faces = []
-    color_change = []
-    vertices_counter = 0
-    last_change = 0
-    translationX, translationY, translationZ = 0, 0, float(translationZ)/3.048 # foot to mm 
-
-    for line in lines :
-        if len(line) > 0 and line[0] == "v":
-            _,  x, y, z = line.split(" ")
-            # TODO
-            vertices.append(' '.join([str(round(float(x)/2.54,4)), str(round(float(y)/2.54,4)), str(round(float(z)/2.54,4))]))
-            vertices_counter += 1
-        elif len(line) > 0 and line[0] == "f":
-            _, x, y, z = line.split(" ")
-            faces.append(', '.join([str(int(x[:-2])-1), str(int(y[:-2])-1), str(int(z[:-2])-1), "-1"]))
-        elif len(line) > 0 and line[0:2] == "Kd":
-            _, r, g, b = line.split(" ")
-            color_change.append([vertices_counter - last_change,  str(1-float(r)), str(1-float(g)), str(1-float(b))])
-            last_change = vertices_counter
-        elif len(line) > 0 and line[0:2] == "Ka":
-            pass
-        elif len(line) > 0 and line[0:2] == "Ks":
-            pass
-        elif len(line) > 0 and line[0:1] == "d":
-            pass
-        elif (
-            len(line) > 0
-            and line[0:6] == "newmtl"
-            or line[0:6] == "endmtl"
-            or line[0:6] == "usemtl"
-        ):
-            pass
-        elif len(line) == 0:
-            pass
-        else:
-            logger.warning("3DModel: 3D model handler not supported")
-            logger.debug("3DModel: %s", line)
+# in-memory buffer size of each WRL section before it spills to disk
+SPOOL_SIZE = 1024 * 1024
+# color lines written per chunk when a material spans many faces
+COLOR_CHUNK = 4096
+# number of vertex / face lines converted together
+VECTOR_BATCH = 65536
+# bytes read from the response at a time
+DOWNLOAD_CHUNK = 256 * 1024
 
-    wrl_header = f"""#VRML V2.0 utf8
+WRL_HEADER = """#VRML V2.0 utf8
 # This file is automatically generated.
 
 Group {{
@@ -77,55 +49,523 @@ Group {{
                     point [
                         """
 
-    wrl_vertices2faces = """,
+WRL_VERTICES2FACES = """,
                     ]
                 }
                 coordIndex [
                     """
 
-    wrl_faces2colors = """
+WRL_FACES2COLORS = """
                 ]
-                colorPerVertex TRUE
+                colorPerVertex FALSE
                 color Color {
                     color [
 """
 
-    wrl_footer = """                ]
+WRL_FOOTER = """                ]
                 }
             }
         }
     ]
 }"""
 
-    wrl_color_change = ""
-    for change in color_change:
-        wrl_color_change += ('' + ' '.join(change[1:]) + ",\n") * change[0]
-
-    # if not os.path.exists(f"{footprint_info.output_dir}/{footprint_info.footprint_lib}"):
-    #     os.makedirs(f"{footprint_info.output_dir}/{footprint_info.footprint_lib}")
-    # if not os.path.exists(f"{footprint_info.output_dir}/{footprint_info.footprint_lib}/packages3d"):
-    #     os.makedirs(f"{footprint_info.output_dir}/{footprint_info.footprint_lib}/packages3d")
-
-    # filename = f"{footprint_info.output_dir}/{footprint_info.footprint_lib}/packages3d/{footprint_info.footprint_name}.wrl"
-    # with open(filename, "w") as f:
-        # f.write(wrl_header)
-        # f.write(',\n'.join(vertices))
-        # f.write(wrl_vertices2faces)
-        # f.write(',\n'.join(faces))
-        # f.write(wrl_faces2colors)
-        # f.write(wrl_color_change)
-        # f.write(wrl_footer)
-    wrl_ctx = wrl_header
-    wrl_ctx += ',\n'.join(vertices)
-    wrl_ctx += wrl_vertices2faces
-    wrl_ctx += ',\n'.join(faces)
-    wrl_ctx += wrl_faces2colors
-    wrl_ctx += wrl_color_change
-    wrl_ctx += wrl_footer
-
-    rotate = [-float(axis_rotation) for axis_rotation in rotation.split(',')]
-
-    # kicad_mod.append(Model(filename = f"{os.path.dirname(__file__)}\{filename}", rotate = [-float(axis_rotation) for axis_rotation in rotation.split(',')]))
-    logger.info("3DModal: 3DModel Generated. Size: %s", len(wrl_ctx))
-
-    return wrl_ctx, rotate
\ No newline at end of file
+
+# one Shape per OBJ material, every shape shares the coordinates of the first
+WRL_GROUP_HEADER = """#VRML V2.0 utf8
+# This file is automatically generated.
+
+Group {{
+    translation {translationX} {translationY} {translationZ}
+    children [
+"""
+
+WRL_SHAPE_HEADER = """        Shape {{
+            appearance Appearance {{
+                material Material {{
+                    diffuseColor {color}
+                    ambientIntensity 0.2
+                    specularColor 0.8 0.8 0.8
+                    shininess 0.4
+                    transparency 0
+                }}
+            }}
+            geometry IndexedFaceSet {{
+                ccw TRUE
+                solid FALSE
+"""
+
+WRL_SHAPE_COORD_DEF = """                coord DEF co Coordinate {
+                    point [
+                        """
+
+WRL_SHAPE_COORD_USE = """                coord USE co
+"""
+
+WRL_SHAPE_COORD2FACES = """,
+                    ]
+                }
+"""
+
+WRL_SHAPE_FACES = """                coordIndex [
+                    """
+
+WRL_SHAPE_FOOTER = """
+                ]
+            }
+        }
+"""
+
+WRL_GROUP_FOOTER = """    ]
+}"""
+
+# color of the faces drawn before any usemtl
+DEFAULT_COLOR = "1.0 1.0 1.0"
+
+# "material": one Shape per material, "vertex": a single Shape with the
+# material color of every face
+WRL_MODE_MATERIAL = "material"
+WRL_MODE_VERTEX = "vertex"
+WRL_MODES = (WRL_MODE_MATERIAL, WRL_MODE_VERTEX)
+WRL_MODE = WRL_MODE_MATERIAL
+
+
+FACE_RE = re.compile(r"f \d+// \d+// \d+//(?: f \d+// \d+// \d+//)*")
+
+
+class WRLModel:
+    """
+    Converted WRL model kept in a temporary file until it is saved, or a
+    model already in the ModelStore when `stored` is set.
+    """
+
+    def __init__(self, path, size, key=None, stored=False):
+        self.path = path
+        self.size = size
+        self.key = key
+        self.stored = stored
+
+    def save(self, dest):
+        if self.stored:
+            shutil.copyfile(self.path, dest)
+        else:
+            shutil.move(self.path, dest)
+            # mkstemp creates the file readable by the owner only
+            os.chmod(dest, 0o644)
+
+    def discard(self):
+        if self.stored:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _Section:
+    # one ",\n" separated WRL list, spooled to disk once it grows large.
+
+    def __init__(self, sep=",\n"):
+        self.sep = sep
+        self.buffer = tempfile.SpooledTemporaryFile(
+            max_size=SPOOL_SIZE, mode='w+', encoding='utf-8'
+        )
+        self.count = 0
+
+    def append(self, item):
+        if self.count:
+            self.buffer.write(self.sep)
+        self.buffer.write(item)
+        self.count += 1
+
+    def extend(self, items):
+        if not items:
+            return
+        if self.count:
+            self.buffer.write(self.sep)
+        self.buffer.write(self.sep.join(items))
+        self.count += len(items)
+
+    def copy_to(self, fp):
+        self.buffer.seek(0)
+        shutil.copyfileobj(self.buffer, fp)
+        self.buffer.close()
+
+
+def _wrl_diffuse(r, g, b):
+    # the OBJ diffuse color is the VRML one
+    return ' '.join([str(float(r)), str(float(g)), str(float(b))])
+
+
+def _py_vertices(lines):
+    ret = []
+    for line in lines:
+        _,  x, y, z = line.split(" ")
+        ret.append(' '.join([str(round(float(x)/2.54,4)), str(round(float(y)/2.54,4)), str(round(float(z)/2.54,4))]))
+    return ret
+
+
+def _py_faces(lines):
+    ret = []
+    for line in lines:
+        _, x, y, z = line.split(" ")
+        ret.append(', '.join([str(int(x[:-2])-1), str(int(y[:-2])-1), str(int(z[:-2])-1), "-1"]))
+    return ret
+
+
+def _np_vertices(lines):
+    tokens = " ".join(lines).split(" ")
+    if len(tokens) != len(lines) * 4 or tokens[::4].count("v") != len(lines):
+        # malformed line, let the line by line parser report it
+        return _py_vertices(lines)
+
+    del tokens[::4]
+    coords = np.fromiter(
+        map(float, tokens), dtype=np.float64, count=len(tokens)
+    )
+    values = iter(py_round(coords / 2.54, 4).tolist())
+
+    return list(map('{} {} {}'.format, values, values, values))
+
+
+def _np_faces(lines):
+    text = " ".join(lines)
+    if FACE_RE.fullmatch(text):
+        # the usual "f 1// 2// 3//" form, every int(x[:-2]) is a plain int
+        index = np.fromstring(
+            text.replace("f ", "").replace("//", ""), dtype=np.int64, sep=" "
+        ) - 1
+        values = iter(index.tolist())
+        return list(map('{}, {}, {}, -1'.format, values, values, values))
+
+    tokens = text.split(" ")
+    if len(tokens) != len(lines) * 4 or tokens[::4].count("f") != len(lines):
+        return _py_faces(lines)
+
+    del tokens[::4]
+    # "12//" -> 12, same as int(x[:-2]) on every token
+    index = np.fromiter(
+        map(int, map(operator.itemgetter(slice(None, -2)), tokens)),
+        dtype=np.int64,
+        count=len(tokens)
+    ) - 1
+    values = iter(index.tolist())
+
+    return list(map('{}, {}, {}, -1'.format, values, values, values))
+
+
+class OBJConverter:
+    """
+    Convert EasyEDA OBJ text to a WRL model.
+
+    Vertices, faces and colors go to their own spooled section while the
+    OBJ is fed in, so memory use does not depend on the model size. Every
+    face gets the diffuse color of its `usemtl` material. Runs
+    of plain `v` / `f` lines are cut out of each text chunk with a single
+    regex and converted in batches, with numpy when it is available. Any
+    other line goes through the line by line parser; both paths give the
+    same output.
+    """
+
+    RUN_RE = re.compile(
+        r"(?:^v [^ \n]+ [^ \n]+ [^ \n]+\n)+|(?:^f [^ \n]+ [^ \n]+ [^ \n]+\n)+",
+        re.M
+    )
+
+    def __init__(self, translationZ, vectorized=None):
+        if vectorized is None:
+            vectorized = np is not None
+        self.format_vertices = _np_vertices if vectorized else _py_vertices
+        self.format_faces = _np_faces if vectorized else _py_faces
+
+        self.vertices = _Section()
+        self.faces = _Section()
+        self.colors = _Section(sep="")
+        self.pending_vertices = []
+        self.pending_faces = []
+        self.vertices_counter = 0
+        # material name -> color
+        self.material_colors = {}
+        self.defining = None
+        self.material = None
+        self.translationZ = float(translationZ)/3.048 # foot to mm
+        self.tail = ""
+
+    def feed(self, chunk):
+        text = self.tail + chunk
+        cut = text.rfind("\n") + 1
+        self.tail = text[cut:]
+        text = text[:cut].replace("\r\n", "\n")
+
+        pos = 0
+        for m in self.RUN_RE.finditer(text):
+            if m.start() > pos:
+                self.feed_lines(text[pos:m.start() - 1].split("\n"))
+            pos = m.end()
+
+            lines = text[m.start():pos - 1].split("\n")
+            if lines[0][0] == "v":
+                self.add_vertices(lines)
+            else:
+                self.add_faces(lines)
+
+        if pos < len(text):
+            self.feed_lines(text[pos:-1].split("\n"))
+
+    def add_vertices(self, lines):
+        self.pending_vertices.extend(lines)
+        self.vertices_counter += len(lines)
+        if len(self.pending_vertices) >= VECTOR_BATCH:
+            self.vertices.extend(self.format_vertices(self.pending_vertices))
+            self.pending_vertices = []
+
+    def add_faces(self, lines):
+        self.pending_faces.extend(lines)
+        self.add_face_colors(len(lines))
+        if len(self.pending_faces) >= VECTOR_BATCH:
+            self.flush_faces()
+
+    def add_face_colors(self, count):
+        color = self.material_colors.get(self.material, DEFAULT_COLOR)
+        color += ",\n"
+        while count > 0:
+            self.colors.append(color * min(count, COLOR_CHUNK))
+            count -= COLOR_CHUNK
+
+    def flush_faces(self):
+        self.faces.extend(self.format_faces(self.pending_faces))
+        self.pending_faces = []
+
+    def new_material(self, name):
+        self.defining = name
+
+    def use_material(self, name):
+        self.material = name
+
+    def set_diffuse(self, r, g, b):
+        if self.defining is not None:
+            self.material_colors[self.defining] = _wrl_diffuse(r, g, b)
+
+    def feed_lines(self, lines):
+        for line in lines:
+            if len(line) > 0 and line[0] == "v":
+                self.add_vertices([line])
+            elif len(line) > 0 and line[0] == "f":
+                self.add_faces([line])
+            elif len(line) > 0 and line[0:2] == "Kd":
+                _, r, g, b = line.split(" ")
+                self.set_diffuse(r, g, b)
+            elif len(line) > 0 and line[0:2] == "Ka":
+                pass
+            elif len(line) > 0 and line[0:2] == "Ks":
+                pass
+            elif len(line) > 0 and line[0:1] == "d":
+                pass
+            elif line[0:7] == "newmtl ":
+                self.new_material(line[7:])
+            elif line[0:7] == "usemtl ":
+                self.use_material(line[7:])
+            elif line[0:6] == "endmtl":
+                self.new_material(None)
+            elif len(line) == 0:
+                pass
+            else:
+                logger.warning("3DModel: 3D model handler not supported")
+                logger.debug("3DModel: %s", line)
+
+    def flush(self):
+        if self.tail:
+            self.feed("\n")
+
+        self.vertices.extend(self.format_vertices(self.pending_vertices))
+        self.pending_vertices = []
+        self.flush_faces()
+
+    def finish(self, fp):
+        self.flush()
+
+        fp.write(WRL_HEADER.format(
+            translationX=0,
+            translationY=0,
+            translationZ=self.translationZ
+        ))
+        self.vertices.copy_to(fp)
+        fp.write(WRL_VERTICES2FACES)
+        self.faces.copy_to(fp)
+        fp.write(WRL_FACES2COLORS)
+        self.colors.copy_to(fp)
+        fp.write(WRL_FOOTER)
+
+
+class MaterialOBJConverter(OBJConverter):
+    """
+    Convert EasyEDA OBJ text to a WRL model with one Shape per material.
+
+    Faces are grouped by their `usemtl` material and every Shape gets the
+    material diffuse color instead of a color per vertex, the coordinates
+    are written once and shared with `USE`.
+    """
+
+    def __init__(self, translationZ, vectorized=None):
+        super().__init__(translationZ, vectorized)
+        self.faces = None
+        self.colors = None
+        # material name -> faces, kept in first use order
+        self.shapes = {}
+
+    def flush_faces(self):
+        if not self.pending_faces:
+            return
+
+        if self.material not in self.shapes:
+            self.shapes[self.material] = _Section()
+        self.shapes[self.material].extend(
+            self.format_faces(self.pending_faces)
+        )
+        self.pending_faces = []
+
+    def add_face_colors(self, count):
+        pass
+
+    def use_material(self, name):
+        self.flush_faces()
+        self.material = name
+
+    def finish(self, fp):
+        self.flush()
+
+        if not self.shapes:
+            self.shapes[None] = _Section()
+
+        fp.write(WRL_GROUP_HEADER.format(
+            translationX=0,
+            translationY=0,
+            translationZ=self.translationZ
+        ))
+        for i, (material, faces) in enumerate(self.shapes.items()):
+            fp.write(WRL_SHAPE_HEADER.format(
+                color=self.material_colors.get(material, DEFAULT_COLOR)
+            ))
+            if i == 0:
+                fp.write(WRL_SHAPE_COORD_DEF)
+                self.vertices.copy_to(fp)
+                fp.write(WRL_SHAPE_COORD2FACES)
+            else:
+                fp.write(WRL_SHAPE_COORD_USE)
+            fp.write(WRL_SHAPE_FACES)
+            faces.copy_to(fp)
+            fp.write(WRL_SHAPE_FOOTER)
+        fp.write(WRL_GROUP_FOOTER)
+
+
+WRL_CONVERTERS = {
+    WRL_MODE_MATERIAL: MaterialOBJConverter,
+    WRL_MODE_VERTEX: OBJConverter,
+}
+
+
+def obj2wrl(chunks, fp, translationZ, vectorized=None, mode=WRL_MODE):
+    converter = WRL_CONVERTERS[mode](translationZ, vectorized)
+    for chunk in chunks:
+        converter.feed(chunk)
+    converter.finish(fp)
+
+
+def iter_3Dmodel_chunks(component_uuid):
+    url = f"https://easyeda.com/analyzer/api/3dmodel/{component_uuid}"
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with net.get(url, stream=True) as req:
+        for chunk in req.iter_content(chunk_size=DOWNLOAD_CHUNK):
+            yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def get_3Dmodel(
+    component_uuid,
+    translationZ,
+    wrl_mode=WRL_MODE,
+    model_store=None,
+    update_time=None
+):
+    key = model_key(component_uuid, translationZ, wrl_mode, update_time)
+
+    stored_path = model_store.lookup(key) if model_store else None
+    if stored_path is not None:
+        logger.info("3DModel: found %s in model store.", stored_path.name)
+        return WRLModel(
+            str(stored_path), stored_path.stat().st_size, key, stored=True
+        )
+
+    logger.info("3DModel: creating 3D model ...")
+
+    # the response is converted while it downloads into a temporary file,
+    # FootprintManager.add_3d_model moves it into the library.
+    fd, wrl_path = tempfile.mkstemp(suffix=".wrl", prefix="easyeda-")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            obj2wrl(
+                iter_3Dmodel_chunks(component_uuid),
+                fp,
+                translationZ,
+                mode=wrl_mode
+            )
+    except BaseException:
+        os.unlink(wrl_path)
+        raise
+
+    wrl_model = WRLModel(wrl_path, os.path.getsize(wrl_path), key)
+
+    logger.info("3DModal: 3DModel Generated. Size: %s", wrl_model.size)
+
+    return wrl_model
+
+
+class Model3DRef:
+    """
+    3D model of a footprint as recorded by h_SVGNODE.
+
+    Nothing is downloaded while the footprint is parsed, `fetch()` gets
+    the converted WRLModel when the model is actually exported.
+    """
+
+    def __init__(
+        self,
+        component_uuid,
+        translationZ,
+        rotation,
+        wrl_mode=WRL_MODE,
+        update_time=None
+    ):
+        self.component_uuid = component_uuid
+        self.translationZ = translationZ
+        self.rotation = rotation
+        self.wrl_mode = wrl_mode
+        # updateTime of the footprint, the model has none of its own
+        self.update_time = update_time
+
+    @classmethod
+    def from_svgnode(cls, data, wrl_mode=WRL_MODE, update_time=None):
+        attrs = json.loads(join_fields(data))["attrs"]
+        return cls(
+            attrs["uuid"], attrs["z"], attrs["c_rotation"], wrl_mode,
+            update_time
+        )
+
+    @property
+    def key(self):
+        return model_key(
+            self.component_uuid, self.translationZ, self.wrl_mode,
+            self.update_time
+        )
+
+    @property
+    def rotate(self):
+        return [-float(axis_rotation) for axis_rotation in self.rotation.split(',')]
+
+    def fetch(self, model_store=None):
+        return get_3Dmodel(
+            self.component_uuid,
+            self.translationZ,
+            self.wrl_mode,
+            model_store,
+            self.update_time
+        )
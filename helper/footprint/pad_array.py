@@ -0,0 +1,136 @@
+import re
+
+
+# pad numbers that are a prefix and a counter, "12", "A12"
+NUMBER_RE = re.compile(r"(\D*)(0|[1-9]\d*)")
+
+
+def split_number(number):
+    m = NUMBER_RE.fullmatch(number)
+    if m is None:
+        return None
+
+    return m.group(1), int(m.group(2))
+
+
+class PadArray:
+    """
+    Row or grid of pads of one kind, built from consecutive pads.
+
+    Pad c of row r is at origin + r * row_pitch + c * pitch and numbered
+    prefix + (first + c), with the prefix and first number of its row. A
+    pad is only taken in when its position and number are exactly the
+    generated ones, so `pads()` gives back the pads as they were added.
+    Every row but the last has `columns` pads.
+    """
+
+    __slots__ = (
+        "kind", "origin", "pitch", "row_pitch", "columns", "rows", "base",
+        "rounded"
+    )
+
+    def __init__(self, kind, origin, prefix, first):
+        self.kind = kind
+        self.origin = origin
+        self.pitch = None
+        self.row_pitch = None
+        self.columns = None
+        # [prefix, first number, pad count] of every row
+        self.rows = [[prefix, first, 1]]
+        # start of the last row, not rounded
+        self.base = origin
+        self.rounded = {}
+
+    @classmethod
+    def start(cls, kind, number, at):
+        # None when the pad number has no counter to continue
+        parsed = split_number(number)
+        if parsed is None:
+            return None
+
+        return cls(kind, (at[0], at[1]), *parsed)
+
+    def __len__(self):
+        return sum(row[2] for row in self.rows)
+
+    def round(self, value):
+        # pads of a column share x and pads of a row share y
+        rounded = self.rounded.get(value)
+        if rounded is None:
+            rounded = self.rounded[value] = round(value, 2)
+
+        return rounded
+
+    def add(self, kind, number, at):
+        """
+        Take in the next pad, False when it does not continue the array.
+        """
+        if kind is not self.kind:
+            return False
+
+        x, y = at
+        row = self.rows[-1]
+        c = row[2]
+
+        if c != self.columns and number == f"{row[0]}{row[1] + c}":
+            pitch = self.pitch
+            if pitch is None:
+                pitch = (x - self.origin[0], y - self.origin[1])
+            bx, by = self.base
+            if pitch != (0, 0) and self.round(bx + c * pitch[0]) == x and \
+                    self.round(by + c * pitch[1]) == y:
+                self.pitch = pitch
+                row[2] += 1
+                return True
+
+        # first pad of the next row, the rows have as many pads as the first
+        if self.pitch is None or c != (self.columns or c):
+            return False
+
+        parsed = split_number(number)
+        if parsed is None:
+            return False
+
+        x0, y0 = self.origin
+        row_pitch = self.row_pitch
+        if row_pitch is None:
+            row_pitch = (x - x0, y - y0)
+            # rows side by side, not further along the same line
+            dx, dy = self.pitch
+            if dx * row_pitch[1] - dy * row_pitch[0] == 0:
+                return False
+
+        r = len(self.rows)
+        base = (x0 + r * row_pitch[0], y0 + r * row_pitch[1])
+        if self.round(base[0]) != x or self.round(base[1]) != y:
+            return False
+
+        self.row_pitch = row_pitch
+        self.columns = c
+        self.base = base
+        self.rows.append([parsed[0], parsed[1], 1])
+        return True
+
+    def coordinates(self, axis):
+        # x or y of the pads of every row, shared by the rows it is the same
+        v0 = self.origin[axis]
+        d = self.pitch[axis] if self.pitch else 0
+        rd = self.row_pitch[axis] if self.row_pitch else 0
+        width = self.columns or self.rows[0][2]
+
+        values = None
+        for r in range(len(self.rows)):
+            if values is None or rd:
+                base = v0 + r * rd
+                if d:
+                    values = [round(base + c * d, 2) for c in range(width)]
+                else:
+                    values = [round(base, 2)] * width
+            yield values
+
+    def pads(self):
+        # (number, (x, y)) of every pad, in the order they were added
+        rows = zip(self.rows, self.coordinates(0), self.coordinates(1))
+        for (prefix, first, count), xs, ys in rows:
+            for c in range(count):
+                yield f"{prefix}{first + c}", (xs[c], ys[c])
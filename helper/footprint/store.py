@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+from pathlib import Path
+
+from ..listing import DirListing
+from ..lock import FileLock
+
+
+logger = logging.getLogger("KICONV")
+
+
+INDEX_NAME = ".models.json"
+LOCK_NAME = ".models.lock"
+HASH_CHUNK = 1024 * 1024
+HASH_LENGTH = 16
+
+NAME_RE = re.compile(r"[^\w.-]+")
+
+
+# bumped when the converter output changes, older stored models are
+# converted again
+MODEL_VERSION = 3
+
+
+def model_key(component_uuid, translationZ, wrl_mode, update_time=None):
+    # the converted WRL depends on the z offset and the output mode too,
+    # the model is converted again once its footprint is updated
+    return (
+        f"{component_uuid}:{translationZ}:{wrl_mode}:{update_time}:"
+        f"{MODEL_VERSION}"
+    )
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class ModelStore:
+    """
+    Content addressed store of converted 3D models.
+
+    Every model is saved once as `{uuid}_{hash}.wrl` in the 3dshapes
+    directory. The index maps the model key (EasyEDA model uuid, z offset,
+    WRL mode and footprint updateTime) and every library model name to a
+    stored file, the named `{name}.wrl` files are hardlinks to it. Changes
+    are made under a file lock on a freshly loaded index, so several
+    processes can share a store.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.index_path = self.root.joinpath(INDEX_NAME)
+        self.lock = FileLock(self.root.joinpath(LOCK_NAME))
+        self.listing = DirListing.get(self.root)
+        self.index = self.load_index()
+
+    def load_index(self):
+        index = {'models': {}, 'names': {}}
+        try:
+            with self.index_path.open('r', encoding='utf-8') as fp:
+                index.update(json.load(fp))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            logger.warning("Model Store: broken index, rebuild it.")
+
+        return index
+
+    def save_index(self):
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open('w', encoding='utf-8') as fp:
+            json.dump(self.index, fp, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def lookup(self, key):
+        filename = self.index['models'].get(key)
+        if filename is None:
+            # may have been added by another process
+            self.index = self.load_index()
+            filename = self.index['models'].get(key)
+        if filename is None:
+            return None
+
+        if filename not in self.listing:
+            return None
+
+        return self.root.joinpath(filename)
+
+    def put(self, model):
+        """
+        Add a converted WRLModel, an identical model already in the store
+        is reused and the temporary file dropped.
+        """
+        with self.lock:
+            self.index = self.load_index()
+            before = self.listing.stat()
+            names = []
+
+            if model.stored:
+                path = Path(model.path)
+            else:
+                component_uuid = model.key.split(":", 1)[0]
+                filename = (
+                    f"{NAME_RE.sub('_', component_uuid)}_"
+                    f"{file_digest(model.path)}.wrl"
+                )
+                path = self.root.joinpath(filename)
+                if path.exists():
+                    logger.info("Model Store: %s already stored.", filename)
+                    model.discard()
+                else:
+                    model.save(path)
+                    names.append(path.name)
+
+            if self.index['models'].get(model.key) != path.name:
+                self.index['models'][model.key] = path.name
+                self.save_index()
+                names.append(INDEX_NAME)
+
+            self.listing.add(*names, before=before)
+
+        return path
+
+    def link(self, name, path):
+        named_path = self.root.joinpath(f"{name}.wrl")
+        with self.lock:
+            self.index = self.load_index()
+            before = self.listing.stat()
+            names = []
+
+            if not (named_path.exists() and named_path.samefile(path)):
+                tmp_path = named_path.with_suffix(f".{os.getpid()}.tmp")
+                try:
+                    os.link(path, tmp_path)
+                except OSError:
+                    # no hardlink on this file system
+                    shutil.copyfile(path, tmp_path)
+                os.replace(tmp_path, named_path)
+                names.append(named_path.name)
+
+            if self.index['names'].get(name) != path.name:
+                self.index['names'][name] = path.name
+                self.save_index()
+                names.append(INDEX_NAME)
+
+            self.listing.add(*names, before=before)
+
+    def resolve(self, name):
+        filename = self.index['names'].get(name)
+        if filename is None or filename not in self.listing:
+            return None
+
+        return filename
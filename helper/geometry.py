@@ -0,0 +1,148 @@
+from .numeric import VECTORIZE_MIN_POINTS, np
+
+
+# relative cross product under which three points are taken as collinear,
+# only float noise of the rounded coordinates is below it
+COLLINEAR_EPS = 1e-9
+
+
+def merge_collinear(points):
+    """
+    Polyline without its repeated points and the points lying straight
+    between their neighbours, [(x, y), ...] -> [(x, y), ...].
+
+    The drawn path is the same with fewer segments. A polyline reduced to
+    one point is kept as one zero length segment, a dot.
+    """
+    merged = []
+    for point in points:
+        if merged and point == merged[-1]:
+            continue
+
+        if len(merged) >= 2:
+            ax, ay = merged[-2]
+            bx, by = merged[-1]
+            abx = bx - ax
+            aby = by - ay
+            bcx = point[0] - bx
+            bcy = point[1] - by
+            cross = abx * bcy - aby * bcx
+            # going on in the same direction, not back over the segment
+            if abx * bcx + aby * bcy > 0 and abs(cross) <= COLLINEAR_EPS * (
+                    (abs(abx) + abs(aby)) * (abs(bcx) + abs(bcy))):
+                merged[-1] = point
+                continue
+
+        merged.append(point)
+
+    if len(merged) == 1 and len(points) > 1:
+        merged.append(merged[0])
+
+    return merged
+
+
+def farthest_point(points, xy, first, last):
+    """
+    Index and squared distance of the point between first and last that is
+    farthest from the segment joining them. xy is points as a numpy array,
+    or None.
+    """
+    ax, ay = points[first]
+    dx = points[last][0] - ax
+    dy = points[last][1] - ay
+    length_sq = dx * dx + dy * dy
+
+    if xy is not None and last - first > VECTORIZE_MIN_POINTS:
+        # same operations as below, on the whole range at once
+        p = xy[first + 1:last] - (ax, ay)
+        e = p
+        if length_sq:
+            t = np.clip((p[:, 0] * dx + p[:, 1] * dy) / length_sq, 0, 1)
+            e = p - t[:, None] * (dx, dy)
+        distances_sq = e[:, 0] * e[:, 0] + e[:, 1] * e[:, 1]
+        i = int(np.argmax(distances_sq))
+        return first + 1 + i, float(distances_sq[i])
+
+    farthest = None
+    farthest_sq = -1
+    for i in range(first + 1, last):
+        px = points[i][0] - ax
+        py = points[i][1] - ay
+        # distance to the segment, not to the whole line
+        t = 0
+        if length_sq:
+            t = min(max((px * dx + py * dy) / length_sq, 0), 1)
+        ex = px - t * dx
+        ey = py - t * dy
+        distance_sq = ex * ex + ey * ey
+        if distance_sq > farthest_sq:
+            farthest = i
+            farthest_sq = distance_sq
+
+    return farthest, farthest_sq
+
+
+def simplify(points, tolerance):
+    """
+    Douglas-Peucker simplification of a polyline, [(x, y), ...].
+
+    The ends are kept, every dropped point is within tolerance of the
+    simplified line.
+    """
+    count = len(points)
+    if tolerance <= 0 or count < 3:
+        return list(points)
+
+    tolerance_sq = tolerance * tolerance
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+
+    xy = None
+    if np is not None and count >= VECTORIZE_MIN_POINTS:
+        xy = np.array(points, dtype=np.float64)
+
+    # no recursion, outlines can have thousands of points
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        farthest, distance_sq = farthest_point(points, xy, first, last)
+        if distance_sq > tolerance_sq:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_polygon(points, tolerance):
+    """
+    simplify() for a closed outline, the last point may repeat the first.
+
+    The ring is cut at its first point and the point farthest from it,
+    both halves are simplified. Outlines that would fall under three
+    vertices are returned as they are.
+    """
+    closed = len(points) > 1 and points[0] == points[-1]
+    ring = list(points[:-1] if closed else points)
+    if tolerance <= 0 or len(ring) < 4:
+        return list(points)
+
+    x0, y0 = ring[0]
+    anchor = max(
+        range(len(ring)),
+        key=lambda i: (ring[i][0] - x0) ** 2 + (ring[i][1] - y0) ** 2
+    )
+    simplified = (
+        simplify(ring[:anchor + 1], tolerance)[:-1]
+        + simplify(ring[anchor:] + ring[:1], tolerance)[:-1]
+    )
+    if len(simplified) < 3:
+        return list(points)
+
+    if closed:
+        simplified.append(simplified[0])
+
+    return simplified
@@ -0,0 +1,95 @@
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger("KICONV")
+
+
+# seconds between two mtime checks of a directory
+REFRESH_INTERVAL = 2.0
+
+
+class DirListing:
+    """
+    File names of a directory from a single scandir.
+
+    The directory mtime is checked at most every `refresh_interval`
+    seconds and the names are only listed again when it changed. Files
+    added by this process are recorded with `add()`. Listings are shared
+    per path, so recreating a manager on the same library costs nothing.
+    """
+
+    _listings = {}
+    _listings_lock = threading.Lock()
+
+    def __init__(self, path, refresh_interval=REFRESH_INTERVAL):
+        self.path = os.fspath(path)
+        self.refresh_interval = refresh_interval
+        self.names = set()
+        self.mtime = None
+        self.checked = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path):
+        key = os.path.abspath(path)
+        with cls._listings_lock:
+            if key not in cls._listings:
+                cls._listings[key] = cls(key)
+            return cls._listings[key]
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if (
+                not force
+                and self.checked is not None
+                and now - self.checked < self.refresh_interval
+            ):
+                return
+            self.checked = now
+
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                self.names = set()
+                self.mtime = None
+                return
+
+            if mtime == self.mtime:
+                return
+
+            with os.scandir(self.path) as it:
+                self.names = {entry.name for entry in it}
+            self.mtime = mtime
+            logger.debug("Listing: %s entries in %s", len(self.names), self.path)
+
+    def exists(self):
+        self.refresh()
+        return self.mtime is not None
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def add(self, *names, before=None):
+        """
+        Record files written by this process.
+
+        `before` is the directory mtime read before writing them, under a
+        lock every writer of the directory holds. A listing current then
+        is still current, it takes the new mtime instead of being listed
+        again on the next refresh.
+        """
+        with self._lock:
+            self.names.update(names)
+            if before is not None and before == self.mtime:
+                self.mtime = self.stat()
+
+    def __contains__(self, name):
+        self.refresh()
+        return name in self.names
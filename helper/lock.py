@@ -0,0 +1,83 @@
+import logging
+import threading
+
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:     # windows
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger("KICONV")
+
+
+def lock_file(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+        return
+
+    fp.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fp.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after 10 seconds, keep waiting
+            logger.debug("Lock: waiting for %s", fp.name)
+
+
+def unlock_file(fp):
+    if fcntl is not None:
+        fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+        return
+
+    fp.seek(0)
+    msvcrt.locking(fp.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    Advisory lock on `path`, shared with every process writing the library.
+
+    The lock is re-entrant inside a process, other threads wait on a local
+    lock before the file lock is taken.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fp = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fp = self.path.open('a+b')
+                lock_file(self._fp)
+            except BaseException:
+                if self._fp is not None:
+                    self._fp.close()
+                    self._fp = None
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                unlock_file(self._fp)
+            finally:
+                self._fp.close()
+                self._fp = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
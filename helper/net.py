@@ -0,0 +1,95 @@
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger("KICONV")
+
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5, 30)
+# number of hosts kept in the pool and keep-alive connections per host
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 8
+
+
+class EDASession(requests.Session):
+    """
+    Keep-alive session shared by every EasyEDA / LCSC request.
+
+    Connections are pooled per host (at most `pool_maxsize` each), gzip
+    is negotiated and every request gets `timeout` unless the caller
+    passes its own.
+    """
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE
+    ):
+        super().__init__()
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+        self.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = EDASession()
+
+    return _session
+
+
+def configure(
+    timeout=DEFAULT_TIMEOUT,
+    pool_connections=POOL_CONNECTIONS,
+    pool_maxsize=POOL_MAXSIZE
+):
+    global _session
+
+    logger.debug(
+        "HTTP: timeout %s, pools %s, pool size %s",
+        timeout,
+        pool_connections,
+        pool_maxsize
+    )
+    with _session_lock:
+        old_session = _session
+        _session = EDASession(timeout, pool_connections, pool_maxsize)
+
+    if old_session is not None:
+        old_session.close()
+
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_session().post(url, **kwargs)
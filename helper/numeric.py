@@ -0,0 +1,41 @@
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, callers fall back to pure python
+    np = None
+
+
+# distance to a .5 tie under which the multiply in py_round may be off
+TIE_EPS = 1e-6
+
+
+def py_round(values, ndigits):
+    """
+    Round a float array exactly like python's round(value, ndigits).
+
+    rint(x * 10**n) / 10**n only differs from round() when the inexact
+    multiply pushes a value across a .5 tie, those few values are rounded
+    again with round().
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+
+    ties = np.flatnonzero(
+        np.abs(scaled - np.floor(scaled) - 0.5) < TIE_EPS
+    )
+    if len(ties):
+        flat_values = values.reshape(-1)
+        flat_rounded = rounded.reshape(-1)
+        for i in ties.tolist():
+            flat_rounded[i] = round(float(flat_values[i]), ndigits)
+
+    return rounded
+
+
+# point lists shorter than this convert faster in pure python
+VECTORIZE_MIN_POINTS = 8
+
+
+def float_array(values, count):
+    # parsed with float() so every value is exactly the python one
+    return np.fromiter(map(float, values), dtype=np.float64, count=count)
@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+
+from pathlib import Path
+
+from .lock import FileLock
+
+
+logger = logging.getLogger("KICONV")
+
+
+SYMBOLS = 'symbols'
+FOOTPRINTS = 'footprints'
+MODELS = 'models'
+KINDS = (SYMBOLS, FOOTPRINTS, MODELS)
+
+# EasyEDA document type each artifact is converted from
+DOC_SYMBOL = 2
+DOC_FOOTPRINT = 4
+KIND_DOC_TYPES = {
+    SYMBOLS: DOC_SYMBOL,
+    FOOTPRINTS: DOC_FOOTPRINT,
+    MODELS: DOC_FOOTPRINT,
+}
+
+
+def make_record(lcid, component_uuid, update_time):
+    return {
+        'lcid': lcid,
+        'uuid': component_uuid,
+        'update_time': update_time,
+    }
+
+
+def record_lcids(record):
+    # parts sharing an artifact are all listed in `lcids`
+    return record.get('lcids') or [record.get('lcid')]
+
+
+def merge_record(current, record):
+    """
+    `record` with the parts of `current` too, when both come from the same
+    EasyEDA document.
+    """
+    if current is None or (
+            current.get('uuid'), current.get('update_time')) != (
+            record.get('uuid'), record.get('update_time')):
+        return record
+
+    lcids = list(dict.fromkeys(record_lcids(current) + record_lcids(record)))
+    if len(lcids) > 1:
+        record = dict(record, lcids=lcids)
+
+    return record
+
+
+def is_stale(kind, record, upstream):
+    """
+    `upstream` maps an EasyEDA document type to its (uuid, updateTime).
+    A model record holds the uuid of the 3D model, only the updateTime of
+    its footprint is compared.
+    """
+    doc = upstream.get(KIND_DOC_TYPES[kind])
+    if doc is None:
+        return False
+
+    component_uuid, update_time = doc
+    if kind != MODELS and record.get('uuid') != component_uuid:
+        return True
+
+    return record.get('update_time') != update_time
+
+
+class Provenance:
+    """
+    Where every symbol, footprint and 3D model of a library comes from.
+
+    `.{lib_name}.provenance.json` in the library root maps each artifact
+    name to the LCSC id, EasyEDA uuid and updateTime it was converted
+    from. A footprint shared by several parts lists them all in `lcids`.
+    Records are kept in memory until `save()`, which merges them into a
+    freshly loaded file under a file lock.
+    """
+
+    def __init__(self, lib_root, lib_name='lcsc'):
+        self.path = Path(lib_root).joinpath(f".{lib_name}.provenance.json")
+        self.lock = FileLock(
+            Path(lib_root).joinpath(f".{lib_name}.provenance.lock")
+        )
+        self.pending = {kind: {} for kind in KINDS}
+        self.records = self.load()
+
+    def load(self):
+        records = {kind: {} for kind in KINDS}
+        try:
+            with self.path.open('r', encoding='utf-8') as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return records
+        except (OSError, ValueError):
+            logger.warning("Provenance: broken file %s, ignore it.", self.path)
+            return records
+
+        for kind in KINDS:
+            records[kind].update(data.get(kind, {}))
+
+        return records
+
+    def get(self, kind, name):
+        record = self.pending[kind].get(name)
+        if record is None:
+            record = self.records[kind].get(name)
+
+        return record
+
+    def record(self, kind, name, record):
+        if record is None:
+            return
+
+        self.pending[kind][name] = merge_record(self.get(kind, name), record)
+
+    def save(self):
+        if not any(self.pending.values()):
+            return
+
+        with self.lock:
+            self.records = self.load()
+            changed = False
+            for kind, records in self.pending.items():
+                for name, record in records.items():
+                    # another process may have added parts of the artifact
+                    record = merge_record(self.records[kind].get(name), record)
+                    if self.records[kind].get(name) != record:
+                        self.records[kind][name] = record
+                        changed = True
+
+            if changed:
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with tmp_path.open('w', encoding='utf-8') as fp:
+                    fp.write(json.dumps(
+                        self.records, ensure_ascii=False, indent=1
+                    ))
+                os.replace(tmp_path, self.path)
+
+        self.pending = {kind: {} for kind in KINDS}
+
+    def parts(self):
+        """
+        Artifacts grouped by LCSC id, {lcid: [(kind, name, record)]}.
+        """
+        parts = {}
+        for kind in KINDS:
+            for name, record in self.records[kind].items():
+                for lcid in record_lcids(record):
+                    if lcid:
+                        parts.setdefault(lcid, []).append((kind, name, record))
+
+        return parts
@@ -6,6 +6,7 @@ import logging
 from dataclasses import dataclass
 
 # from KicadModTree import *
+from ..shape import iter_shapes
 from .schematic_handlers import SCHEMATIC_HANDLER
 
 
@@ -60,19 +61,17 @@ def create_schematic(
 
     logger.info(f"Schematic: creating schematic...")
 
-    for line in schematic_shape:
-        # split and remove empty string in list
-        args = [i for i in line.split("~") if i]
-        model = args[0]
-        logger.debug(f"Schematic: [{model}] args->{args}")
+    get_handler = SCHEMATIC_HANDLER.get
+    for model, fields in iter_shapes(schematic_shape):
+        logger.debug("Schematic: [%s] args->%s", model, fields)
 
-        if model not in SCHEMATIC_HANDLER:
+        build_func = get_handler(model)
+        if build_func is None:
             logger.warning(
-                f"Schematic: parsing model not in handler -> {model}")
+                "Schematic: parsing model not in handler -> %s", model)
             continue
 
-        build_func = SCHEMATIC_HANDLER.get(model)
-        build_func(args[1:], kicad_schematic)   # type: ignore
+        build_func(fields, kicad_schematic)   # type: ignore
 
     refname_x = -int(x_size / 2 * scale) + 60 + kicad_schematic.wire_l * 120
     refname_y = int(y_size / 2 * scale) + 60 - kicad_schematic.wire_t * 120
@@ -1,5 +1,7 @@
 import logging
-from svg.path import parse_path, Move, Line, Close, CubicBezier, Arc
+
+from ..numeric import VECTORIZE_MIN_POINTS, float_array, np, py_round
+from ..svgpath import parse_path, Move, Line, Close, CubicBezier, Arc
 
 logger = logging.getLogger("KICONV")
 
@@ -9,23 +11,44 @@ def mil2mm(x):
     return x
 
 
+def xy_points(xs, ys, kicad_schematic):
+    """
+    "(xy X Y)" lines of a point list, the same values as converting every
+    point with int(... * scale) and mil2mm().
+    """
+    count = min(len(xs), len(ys))
+    c_x = kicad_schematic.c_x
+    c_y = kicad_schematic.c_y
+    scale = kicad_schematic.scale
+
+    if np is not None and count >= VECTORIZE_MIN_POINTS:
+        x = np.trunc((float_array(xs[:count], count) - c_x) * scale)
+        y = -np.trunc((float_array(ys[:count], count) - c_y) * scale)
+        # + 0.0 turns the -0.0 of truncated negatives into int()'s 0
+        x = (py_round(x * 0.0254, 4) + 0.0).tolist()
+        y = (py_round(y * 0.0254, 4) + 0.0).tolist()
+        return [f"          (xy {px} {py})" for px, py in zip(x, y)]
+
+    return [
+        f"          (xy {mil2mm(int((float(px) - c_x) * scale))}"
+        f" {mil2mm(-int((float(py) - c_y) * scale))})"
+        for px, py in zip(xs, ys)
+    ]
+
+
 def h_R(data, kicad_schematic):
     """
     S X1 Y1 X2 Y2 part dmg pen fill
 
     Rectangle, from X1,Y1 to X2,Y2.
+
+    R~x~y~rx~ry~width~height~strokeColor~strokeWidth~...
     """
 
-    if len(data) == 12:
-        X1 = int((float(data[0]) - kicad_schematic.c_x) * kicad_schematic.scale)
-        Y1 = int((float(data[1]) - kicad_schematic.c_y) * kicad_schematic.scale)
-        X2 = int((float(data[0]) + float(data[4]) - kicad_schematic.c_x) * kicad_schematic.scale)
-        Y2 = int((float(data[1]) + float(data[5]) - kicad_schematic.c_y) * kicad_schematic.scale)
-    else:
-        X1 = int((float(data[0]) - kicad_schematic.c_x) * kicad_schematic.scale)
-        Y1 = int((float(data[1]) - kicad_schematic.c_y) * kicad_schematic.scale)
-        X2 = int((float(data[0]) + float(data[2]) - kicad_schematic.c_x) * kicad_schematic.scale)
-        Y2 = int((float(data[1]) + float(data[3]) - kicad_schematic.c_y) * kicad_schematic.scale)
+    X1 = int((float(data[0]) - kicad_schematic.c_x) * kicad_schematic.scale)
+    Y1 = int((float(data[1]) - kicad_schematic.c_y) * kicad_schematic.scale)
+    X2 = int((float(data[0]) + float(data[4]) - kicad_schematic.c_x) * kicad_schematic.scale)
+    Y2 = int((float(data[1]) + float(data[5]) - kicad_schematic.c_y) * kicad_schematic.scale)
 
     part = kicad_schematic.part
     dmg = "0"
@@ -93,28 +116,30 @@ def h_P(data, kicad_schematic):
     pin_number = data[2]
     X = int((float(data[3]) - kicad_schematic.c_x) * kicad_schematic.scale)
     Y = -int((float(data[4]) - kicad_schematic.c_y) * kicad_schematic.scale)
+    # an empty rotation is a pin pointing left
+    rotation = data[5] or '0'
 
     length_raw = data[8].split("^^")[-1]
     svgs = parse_path(length_raw)
 
     length = int(svgs[-1].length() * 10)
     # length = 200
-    if data[5] == '0':
+    if rotation == '0':
         orientation = '180'   # L
         # X += int(length/2)
         # X += length
         kicad_schematic.wire_r = 1
-    elif data[5] == '180':
+    elif rotation == '180':
         orientation = '0'   # R
         kicad_schematic.wire_l = 1
         # X -= int(length/2)
         # X -= length
-    elif data[5] == '90':
+    elif rotation == '90':
         orientation = '270'   # D
         kicad_schematic.wire_t = 1
         # Y += int(length/2)
         # Y += length
-    elif data[5] == '270':
+    elif rotation == '270':
         orientation = '90'  # U
         kicad_schematic.wire_b = 1
         # Y -= int(length/2)
@@ -206,14 +231,8 @@ def h_PL(data, kicad_schematic):
         count = int(len(data[0].split(" "))/2)
         dmg = 0
         pen = 0
-        points = []
         ori_points = data[0].split(' ')
-        for px, py in zip(*[iter(ori_points)] * 2):
-            x = int((float(px) - kicad_schematic.c_x) * kicad_schematic.scale)
-            y = -int((float(py) - kicad_schematic.c_y) * kicad_schematic.scale)
-            # points.append(str(mil2mm(x)))
-            # points.append(str(mil2mm(y)))
-            points.append(f"          (xy {mil2mm(x)} {mil2mm(y)})")
+        points = xy_points(ori_points[0::2], ori_points[1::2], kicad_schematic)
 
         cmd = [
             "      (polyline",
@@ -240,13 +259,9 @@ def h_PG(data, kicad_schematic):
         dmg = 0
         pen = 0
         fill = 'f'
-        points = []
 
         ori_points = data[0].split(' ') + data[0].split(' ')[:2]
-        for px, py in zip(*[iter(ori_points)] * 2):
-            x = int((float(px) - kicad_schematic.c_x) * kicad_schematic.scale)
-            y = -int((float(py) - kicad_schematic.c_y) * kicad_schematic.scale)
-            points.append(f"          (xy {mil2mm(x)} {mil2mm(y)})")
+        points = xy_points(ori_points[0::2], ori_points[1::2], kicad_schematic)
 
         cmd = [
             "      (polyline",
@@ -273,7 +288,7 @@ def h_PT(data, kicad_schematic):
         count = 0
         dmg = 0
         pen = 0
-        points = []
+        path_points = []
         pt_type = "polyline"
         for element in path:
             if isinstance(element, Move):
@@ -294,16 +309,14 @@ def h_PT(data, kicad_schematic):
             else:
                 logger.warning("Schematic: unknown type of element. %s", element)
 
-            for point in process_points:
-                count += 1
-                px = point.real
-                py = point.imag
+            count += len(process_points)
+            path_points.extend(process_points)
 
-                x = int((float(px) - kicad_schematic.c_x) * kicad_schematic.scale)
-                y = -int((float(py) - kicad_schematic.c_y) * kicad_schematic.scale)
-                # points.append(str(x))
-                # points.append(str(y))
-                points.append(f"          (xy {mil2mm(x)} {mil2mm(y)})")
+        points = xy_points(
+            [point.real for point in path_points],
+            [point.imag for point in path_points],
+            kicad_schematic
+        )
 
         cmd = [
             f"      ({pt_type}",
@@ -1,12 +1,28 @@
+import bisect
+import json
 import logging
+import os
 import re
+import shutil
 from pathlib import Path
 
+from ..lock import FileLock
+
 
 logger = logging.getLogger("KICONV")
 
 
 SYMBOL_RE = re.compile(r'^\s*\(symbol \"(?P<SYMBOL_NAME>.+)\" \(pin')
+SYMBOL_BYTES_RE = re.compile(SYMBOL_RE.pattern.encode())
+# closing paren of the library, it ends the last symbol
+LIB_END_RE = re.compile(rb'^\)\s*$')
+
+INDEX_VERSION = 2
+# bytes moved at a time when a symbol grows
+COPY_CHUNK = 1024 * 1024
+# share of the library that may be padding of shrunk symbols before it
+# is compacted
+COMPACT_RATIO = 0.1
 
 
 TEMPLATE_LIB_HEADER = b"""\
@@ -15,6 +31,21 @@ TEMPLATE_LIB_HEADER = b"""\
 TEMPLATE_LIB_FOOTER = b")\n"
 
 
+def fsync_dir(path):
+    # make a rename durable, directories can not be opened on windows
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 class SchematicExist(Exception):
     pass
 
@@ -24,48 +55,92 @@ class SchematicNotFound(Exception):
 
 
 class SchematicManager:
+    """
+    Symbols of one `.kicad_sym` library.
+
+    `db` maps every symbol name to its byte offset and length in the
+    library, `padding` the symbols padded with spaces after they shrunk to
+    the number of padding bytes. Both are kept in a sidecar index next to
+    the library and only rebuilt by a full scan when the library mtime or
+    size no longer match the index, i.e. the library was changed outside
+    of this tool.
+    """
 
     def __init__(self, path, name="lcsc"):
         self.lib_name = name
         self.lib_root = Path(path)
         self.path = self.lib_root.joinpath(f"{name}.kicad_sym")
-        self.db = []
+        self.index_path = self.lib_root.joinpath(f".{name}.kicad_sym.idx")
+        self.lock_path = self.lib_root.joinpath(f".{name}.kicad_sym.lock")
+        self.db = {}
+        self.padding = {}
         self.alias = {}
         self._db_builded = False
+        self._db_stat = None
 
         self.post_init_check()
+        # held by every process while it reads or writes the library
+        self.lock = FileLock(self.lock_path)
 
     def post_init_check(self):
         if not self.lib_root.exists():
             logger.warning("Schematic Manager: Schematic Path not exists, create it.")
             self.lib_root.mkdir()
 
-    def check_db(self):
-        if not self._db_builded:
-            self.build_schematic_db()
-
-    def build_schematic_db(self, rebuild=False):
-        if self._db_builded and not rebuild:
-            logger.info(
-                "Schematic Manager: [DB_BUILD] Schematic DB already build, skip."
-            )
-            return
+    def lib_stat(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
 
-        self._db_builded = True
-        last_def = None
+        return [st.st_mtime_ns, st.st_size]
 
-        if not self.path.exists():
-            return
+    def check_db(self):
+        with self.lock:
+            if not self._db_builded:
+                self.build_schematic_db()
+            elif self._db_stat != self.lib_stat():
+                logger.info("Schematic Manager: [DB_BUILD] Library changed, reload.")
+                self.build_schematic_db(rebuild=True)
 
-        with self.path.open('r',encoding='utf-8') as fp:
+    def build_schematic_db(self, rebuild=False):
+        with self.lock:
+            if self._db_builded and not rebuild:
+                logger.info(
+                    "Schematic Manager: [DB_BUILD] Schematic DB already build, skip."
+                )
+                return
+
+            self._db_builded = True
+            self._db_stat = self.lib_stat()
+            self.db = {}
+            self.padding = {}
+
+            if self._db_stat is None:
+                return
+
+            if self.load_index():
+                return
+
+            logger.info("Schematic Manager: [DB_BUILD] Scan %s.", self.path)
+            self.scan_schematic_db()
+            self.save_index()
+
+    def scan_schematic_db(self):
+        name = None
+        start = 0
+        pos = 0
+        last_line = b""
+
+        with self.path.open('rb') as fp:
             for line in fp:
-                # line = line.strip()
-                # if line == "" or line[0] == "#":
-                #     continue
-                m = SYMBOL_RE.match(line)
+                m = SYMBOL_BYTES_RE.match(line)
 
-                if m:
-                    self.db.append(m.group('SYMBOL_NAME'))
+                if m or LIB_END_RE.match(line):
+                    if name is not None:
+                        self.add_scanned(name, start, pos - start, last_line)
+                    name = m.group('SYMBOL_NAME').decode() if m else None
+                    start = pos
 
                 # # find def name
                 # if line[:3] == 'DEF':
@@ -77,6 +152,62 @@ class SchematicManager:
                 #     for ali in als:
                 #         self.alias[ali] = last_def
 
+                pos += len(line)
+                last_line = line
+
+        if name is not None:
+            self.add_scanned(name, start, pos - start, last_line)
+
+    def add_scanned(self, name, start, length, last_line):
+        self.db[name] = (start, length)
+        # spaces a shrunk symbol was padded with
+        padding = len(last_line.rstrip(b'\r\n')) - len(last_line.rstrip())
+        if padding:
+            self.padding[name] = padding
+
+    def load_index(self):
+        try:
+            with self.index_path.open('r', encoding='utf-8') as fp:
+                index = json.load(fp)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            logger.warning("Schematic Manager: [DB_BUILD] Broken index, rebuild it.")
+            return False
+
+        if index.get('version') != INDEX_VERSION:
+            return False
+        if index.get('stat') != self._db_stat:
+            logger.info(
+                "Schematic Manager: [DB_BUILD] Library changed outside, rebuild index."
+            )
+            return False
+
+        self.db = {
+            name: tuple(entry) for name, entry in index['symbols'].items()
+        }
+        self.padding = index['padding']
+        return True
+
+    def save_index(self):
+        self._db_stat = self.lib_stat()
+        index = {
+            'version': INDEX_VERSION,
+            'stat': self._db_stat,
+            'symbols': self.db,
+            'padding': self.padding,
+        }
+
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            # dumps() uses the C encoder, dump() to a file does not
+            tmp_path.write_text(
+                json.dumps(index, ensure_ascii=False), encoding='utf-8'
+            )
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            logger.warning("Schematic Manager: Unable to save index %s.", self.index_path)
+
     def get_schematic(self, schematic_title):
         self.check_db()
 
@@ -88,52 +219,189 @@ class SchematicManager:
 
         return False
 
+    def read_schematic(self, schematic_title):
+        with self.lock:
+            self.check_db()
+
+            if schematic_title not in self.db:
+                raise SchematicNotFound()
+
+            start, length = self.db[schematic_title]
+            with self.path.open('rb') as fp:
+                fp.seek(start)
+                return fp.read(length).decode()
+
     def update_schematic(self, schematic_title, schematic_data):
-        sch_find = False
-        start_pos = 0
-        # sch_magic = f"  (symbol \"{schematic_title}\" (pin_names".encode()
-
-        with self.path.open('rb+') as fp:
-            while True:
-                line = fp.readline()
-                m = SYMBOL_RE.match(line.decode())
-                if m and m.group('SYMBOL_NAME') == schematic_title:
-                    sch_find = True
-                    logger.debug(
-                        "Schematic Manager: Find Sch at C-pos %s. Line Size: %s",
-                        fp.tell(),
-                        len(line)
-                    )
+        self.update_schematics({schematic_title: schematic_data})
 
-                    fp.seek(-len(line), 1)
-                    start_pos = fp.tell()
-                    logger.debug(
-                        f"Schematic Manager: Sch S-pos at %s.",
-                        start_pos
-                    )
-                    fp.readline()
-                    break
+    def update_schematics(self, schematics):
+        """
+        Replace several symbols ({title: data}) in one pass.
 
-            # buffer remind ctx
-            if not sch_find:
-                logger.critical("Schematic Manager: Unable to update schematic, schematic not find.")
-                raise SchematicNotFound()
+        A symbol no longer than the one it replaces is written in place,
+        padded with spaces at the end of its last line. The library is only
+        moved after the first symbol that grows, once for all the symbols,
+        so nothing before it is rewritten. Once the padding grows over
+        COMPACT_RATIO of the library, it is compacted.
+        """
+        with self.lock:
+            self.check_db()
+
+            schematics = self.drop_unchanged(schematics)
+            if not schematics:
+                return
+
+            with self.path.open('rb+') as fp:
+                self.replace_schematics(fp, schematics)
+
+            self.save_index()
+
+    def drop_unchanged(self, schematics):
+        changed = {}
+        with self.path.open('rb') as fp:
+            for schematic_title, schematic_data in schematics.items():
+                if schematic_title not in self.db:
+                    changed[schematic_title] = schematic_data
+                    continue
 
-            buffer = None
+                start, length = self.db[schematic_title]
+                fp.seek(start)
+                # a symbol that got shorter was padded with spaces
+                if fp.read(length).rstrip() != schematic_data.encode().rstrip():
+                    changed[schematic_title] = schematic_data
 
-            while True:
-                line = fp.readline()
-                m = SYMBOL_RE.match(line.decode())
-                if m:
-                    print(line)
-                    buffer = line + fp.read()
-                    break
+        if len(changed) < len(schematics):
+            logger.info(
+                "Schematic Manager: %s Schematics unchanged, skip.",
+                len(schematics) - len(changed)
+            )
 
-            fp.seek(start_pos, 0)
-            fp.truncate()
-            fp.write(schematic_data.encode())
-            fp.write(b'\n')
-            fp.write(buffer)
+        return changed
+
+    def replace_schematics(self, fp, schematics):
+        targets = []
+        for schematic_title, schematic_data in schematics.items():
+            if schematic_title not in self.db:
+                logger.critical("Schematic Manager: Unable to update schematic, schematic not find.")
+                raise SchematicNotFound()
+            start, length = self.db[schematic_title]
+            targets.append(
+                (start, length, schematic_title, schematic_data.encode() + b'\n')
+            )
+        targets.sort()
+
+        # unchanged ranges to move right, and the symbols at their new place
+        moves = []
+        writes = []
+        starts = []
+        shifts = []
+        shift = 0
+        last_end = None
+        for start, length, schematic_title, data in targets:
+            if shift and start > last_end:
+                moves.append((last_end, start, shift))
+
+            if len(data) < length:
+                self.padding[schematic_title] = length - len(data)
+                data = data[:-1] + b' ' * (length - len(data)) + b'\n'
+            else:
+                self.padding.pop(schematic_title, None)
+            logger.debug(
+                "Schematic Manager: Sch %s S-pos at %s. Size: %s -> %s",
+                schematic_title,
+                start,
+                length,
+                len(data)
+            )
+            writes.append((start + shift, schematic_title, data))
+
+            shift += len(data) - length
+            last_end = start + length
+            starts.append(start)
+            shifts.append(shift)
+
+        lib_size = fp.seek(0, 2)
+        if shift and lib_size > last_end:
+            moves.append((last_end, lib_size, shift))
+
+        # the shift only grows along the file, moving the ranges from the
+        # last one never overwrites bytes that are still to be moved.
+        for start, end, offset in reversed(moves):
+            self.move_range(fp, start, end, offset)
+
+        for pos, _, data in writes:
+            fp.seek(pos)
+            fp.write(data)
+
+        if shift:
+            for name, (offset, size) in self.db.items():
+                i = bisect.bisect_left(starts, offset)
+                if i:
+                    self.db[name] = (offset + shifts[i - 1], size)
+        for pos, schematic_title, data in writes:
+            self.db[schematic_title] = (pos, len(data))
+
+        if sum(self.padding.values()) > COMPACT_RATIO * (lib_size + shift):
+            self.compact(fp)
+
+    def compact(self, fp):
+        """
+        Drop the padding of every shrunk symbol. The symbols only move
+        towards the start of the library, they are copied from the first.
+        """
+        logger.info(
+            "Schematic Manager: Compact %s, %s bytes of padding.",
+            self.path.name,
+            sum(self.padding.values())
+        )
+
+        symbols = sorted(
+            (start, length, name) for name, (start, length) in self.db.items()
+        )
+        removed = 0
+        pos = 0
+        for start, length, name in symbols:
+            padding = self.padding.pop(name, 0)
+            # the padding sits before the newline ending the symbol
+            end = start + length - padding - 1
+            if removed:
+                self.move_range_left(fp, pos, end, removed)
+            if padding or removed:
+                fp.seek(end - removed)
+                fp.write(b'\n')
+
+            self.db[name] = (start - removed, length - padding)
+            removed += padding
+            pos = start + length
+
+        lib_size = fp.seek(0, 2)
+        if removed:
+            self.move_range_left(fp, pos, lib_size, removed)
+            fp.truncate(lib_size - removed)
+
+    @staticmethod
+    def move_range(fp, start, end, offset):
+        # copy [start, end) to start + offset, offset > 0, from the end backwards
+        pos = end
+        while pos > start:
+            size = min(COPY_CHUNK, pos - start)
+            pos -= size
+            fp.seek(pos)
+            chunk = fp.read(size)
+            fp.seek(pos + offset)
+            fp.write(chunk)
+
+    @staticmethod
+    def move_range_left(fp, start, end, offset):
+        # copy [start, end) to start - offset, from the start forwards
+        pos = start
+        while pos < end:
+            size = min(COPY_CHUNK, end - pos)
+            fp.seek(pos)
+            chunk = fp.read(size)
+            fp.seek(pos - offset)
+            fp.write(chunk)
+            pos += size
 
     def add_schematic(
         self,
@@ -143,51 +411,125 @@ class SchematicManager:
         auto_alias_rename=True
     ):
         logger.info("Schematic Manager: Add Schematic %s.", schematic_title)
-        db_sch = self.get_schematic(schematic_title)
+        with self.lock:
+            db_sch = self.get_schematic(schematic_title)
+
+            if db_sch:
+                if isinstance(db_sch, bool):
+                    if not update:
+                        logger.warning(
+                            "Schematic Manager: [ADD_SCH] %s already in DB.",
+                            schematic_title
+                        )
+                        raise SchematicExist()
+                    return self.update_schematic(schematic_title, schematic_data)
+                # else:
+                #     logger.warning(
+                #         "Schematic Manager: [ADD_SCH] %s has alias with %s.",
+                #         schematic_title,
+                #         db_sch
+                #     )
+
+                #     new_schematic_title = schematic_title + "-LC"
+                #     logger.warning(
+                #         "Schematic Manager: [ADD_SCH] Auto Rename Schematic to %s.",
+                #         new_schematic_title
+                #     )
+                #     schematic_data = schematic_data.replace(
+                #         f'DEF "{schematic_title}"',
+                #         f'DEF "{new_schematic_title}"'
+                #     )
+                #     schematic_data = schematic_data.replace(
+                #         f'# {schematic_title}',
+                #         f'# {new_schematic_title}'
+                #     )
+                #     schematic_title = new_schematic_title
+
+            # create file if not exist
+            if not self.path.exists():
+                self.path.write_bytes(TEMPLATE_LIB_HEADER + TEMPLATE_LIB_FOOTER)
 
-        if db_sch:
-            if isinstance(db_sch, bool):
-                if not update:
+            with self.path.open('rb+') as fp:
+                self.append_schematics(fp, {schematic_title: schematic_data})
+
+            self.save_index()
+            logger.info("Schematic Manager: Schematic %s Added.", schematic_title)
+
+    def append_schematics(self, fp, schematics):
+        fp.seek(-len(TEMPLATE_LIB_FOOTER), 2)
+        offset = fp.tell()
+        fp.truncate()
+
+        for schematic_title, schematic_data in schematics.items():
+            data = schematic_data.encode() + b"\n"
+            fp.write(data)
+            self.db[schematic_title] = (offset, len(data))
+            offset += len(data)
+
+        fp.write(TEMPLATE_LIB_FOOTER)
+
+    def add_schematics(self, schematics, update=False):
+        """
+        Add several symbols ({title: data}) to the library in one transaction.
+
+        New symbols are appended together, existing ones are replaced when
+        `update` is set. All the changes go to a copy of the library which
+        is synced and renamed over it, so the library either has all of
+        them or none.
+        """
+        with self.lock:
+            self.check_db()
+            if not schematics:
+                return
+
+            updates = {}
+            appends = {}
+            for schematic_title, schematic_data in schematics.items():
+                if schematic_title not in self.db:
+                    appends[schematic_title] = schematic_data
+                elif update:
+                    updates[schematic_title] = schematic_data
+                else:
                     logger.warning(
                         "Schematic Manager: [ADD_SCH] %s already in DB.",
                         schematic_title
                     )
                     raise SchematicExist()
-                return self.update_schematic(schematic_title, schematic_data)
-            # else:
-            #     logger.warning(
-            #         "Schematic Manager: [ADD_SCH] %s has alias with %s.",
-            #         schematic_title,
-            #         db_sch
-            #     )
-
-            #     new_schematic_title = schematic_title + "-LC"
-            #     logger.warning(
-            #         "Schematic Manager: [ADD_SCH] Auto Rename Schematic to %s.",
-            #         new_schematic_title
-            #     )
-            #     schematic_data = schematic_data.replace(
-            #         f'DEF "{schematic_title}"',
-            #         f'DEF "{new_schematic_title}"'
-            #     )
-            #     schematic_data = schematic_data.replace(
-            #         f'# {schematic_title}',
-            #         f'# {new_schematic_title}'
-            #     )
-            #     schematic_title = new_schematic_title
-
-        # create file if not exist
-        if not self.path.exists():
-            ctx = TEMPLATE_LIB_HEADER + schematic_data.encode() + b"\n"
-            ctx += TEMPLATE_LIB_FOOTER
-            self.path.write_bytes(ctx)
-        else:
-            with self.path.open('rb+') as fp:
-                fp.seek(-len(TEMPLATE_LIB_FOOTER), 2)
-                fp.truncate()
-                fp.write(schematic_data.encode())
-                fp.write(b'\n')
-                fp.write(TEMPLATE_LIB_FOOTER)
 
-        self.db.append(schematic_title)
-        logger.info("Schematic Manager: Schematic %s Added.", schematic_title)
+            if updates:
+                updates = self.drop_unchanged(updates)
+            if not updates and not appends:
+                return
+
+            logger.info(
+                "Schematic Manager: Add %s Schematics, Update %s.",
+                len(appends),
+                len(updates)
+            )
+
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                if self.path.exists():
+                    shutil.copy(self.path, tmp_path)
+                else:
+                    tmp_path.write_bytes(TEMPLATE_LIB_HEADER + TEMPLATE_LIB_FOOTER)
+
+                with tmp_path.open('rb+') as fp:
+                    if updates:
+                        self.replace_schematics(fp, updates)
+                    if appends:
+                        self.append_schematics(fp, appends)
+                    fp.flush()
+                    os.fsync(fp.fileno())
+
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+                # the offsets were already moved for the copy
+                self.build_schematic_db(rebuild=True)
+                raise
+
+            fsync_dir(self.lib_root)
+            self.save_index()
+
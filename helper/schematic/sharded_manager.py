@@ -0,0 +1,201 @@
+import logging
+import re
+from pathlib import Path
+
+from .schematic_manager import SchematicManager
+from .schematic_manager import SchematicExist, SchematicNotFound
+
+
+logger = logging.getLogger("KICONV")
+
+
+CATEGORY_RE = re.compile(r'\(property "Category" "(?P<CATEGORY>[^"]*)"')
+REFERENCE_RE = re.compile(r'\(property "Reference" "(?P<REFERENCE>[^"]*)"')
+SHARD_RE = re.compile(r"[^\w]+")
+
+DEFAULT_SHARD = "misc"
+
+
+def shard_slug(value):
+    return SHARD_RE.sub("_", value).strip("_") or DEFAULT_SHARD
+
+
+def category_shard(schematic_title, schematic_data):
+    # "Resistors - Chip Resistor - Surface Mount" -> "Resistors_Chip_Resistor_Surface_Mount"
+    m = CATEGORY_RE.search(schematic_data)
+    if m is None:
+        return DEFAULT_SHARD
+
+    return shard_slug(m.group('CATEGORY'))
+
+
+def prefix_shard(schematic_title, schematic_data):
+    # reference prefix, "R?" -> "R"
+    m = REFERENCE_RE.search(schematic_data)
+    if m is None:
+        return DEFAULT_SHARD
+
+    return shard_slug(m.group('REFERENCE').rstrip("?"))
+
+
+SHARD_KEYS = {
+    'category': category_shard,
+    'prefix': prefix_shard,
+}
+
+
+class ShardedSchematicManager:
+    """
+    Symbol library split in several `{name}-{shard}.kicad_sym` files.
+
+    `key(title, data)` picks the shard of a new symbol, by default its
+    Category property. Every shard is a SchematicManager with its own
+    offset index, `db` maps each symbol to the shard holding it, so
+    lookups and updates work across all the shards.
+    """
+
+    def __init__(self, path, name="lcsc", key=category_shard):
+        self.lib_name = name
+        self.lib_root = Path(path)
+        self.key = key
+        self.shards = {}
+        self.db = {}
+        self._db_builded = False
+        self._db_version = None
+
+        self.post_init_check()
+
+    def post_init_check(self):
+        if not self.lib_root.exists():
+            logger.warning("Schematic Manager: Schematic Path not exists, create it.")
+            self.lib_root.mkdir()
+
+    def get_shard(self, shard):
+        if shard not in self.shards:
+            self.shards[shard] = SchematicManager(
+                self.lib_root, f"{self.lib_name}-{shard}"
+            )
+
+        return self.shards[shard]
+
+    def shard_paths(self):
+        return [manager.path for manager in self.shards.values()]
+
+    def db_version(self):
+        # the directory mtime changes when another process adds a shard
+        return (
+            self.lib_root.stat().st_mtime_ns,
+            [manager._db_stat for manager in self.shards.values()]
+        )
+
+    def check_db(self):
+        if not self._db_builded:
+            self.build_schematic_db()
+            return
+
+        for manager in self.shards.values():
+            manager.check_db()
+
+        if self._db_version != self.db_version():
+            logger.info("Schematic Manager: [DB_BUILD] Shards changed, reload.")
+            self.load_shards()
+
+    def build_schematic_db(self, rebuild=False):
+        if self._db_builded and not rebuild:
+            logger.info(
+                "Schematic Manager: [DB_BUILD] Schematic DB already build, skip."
+            )
+            return
+
+        self._db_builded = True
+        for manager in self.shards.values():
+            manager.build_schematic_db(rebuild=rebuild)
+
+        self.load_shards()
+        logger.info(
+            "Schematic Manager: [DB_BUILD] %s Schematics in %s Shards.",
+            len(self.db),
+            len(self.shards)
+        )
+
+    def load_shards(self):
+        prefix = f"{self.lib_name}-"
+        for path in self.lib_root.glob(f"{prefix}*.kicad_sym"):
+            self.get_shard(path.stem[len(prefix):]).check_db()
+
+        self.db = {}
+        for shard, manager in self.shards.items():
+            for schematic_title in manager.db:
+                self.db.setdefault(schematic_title, shard)
+
+        self._db_version = self.db_version()
+
+    def get_schematic(self, schematic_title):
+        self.check_db()
+
+        return schematic_title in self.db
+
+    def read_schematic(self, schematic_title):
+        self.check_db()
+
+        if schematic_title not in self.db:
+            raise SchematicNotFound()
+
+        return self.get_shard(self.db[schematic_title]).read_schematic(
+            schematic_title
+        )
+
+    def update_schematic(self, schematic_title, schematic_data):
+        self.update_schematics({schematic_title: schematic_data})
+
+    def update_schematics(self, schematics):
+        self.check_db()
+
+        for shard, shard_schematics in self.group(schematics).items():
+            self.get_shard(shard).update_schematics(shard_schematics)
+
+        self._db_version = self.db_version()
+
+    def add_schematic(
+        self,
+        schematic_title,
+        schematic_data,
+        update=False,
+        auto_alias_rename=True
+    ):
+        self.add_schematics({schematic_title: schematic_data}, update)
+
+    def add_schematics(self, schematics, update=False):
+        self.check_db()
+
+        if not update:
+            for schematic_title in schematics:
+                if schematic_title in self.db:
+                    logger.warning(
+                        "Schematic Manager: [ADD_SCH] %s already in DB.",
+                        schematic_title
+                    )
+                    raise SchematicExist()
+
+        for shard, shard_schematics in self.group(schematics).items():
+            logger.info(
+                "Schematic Manager: Shard %s, %s Schematics.",
+                shard,
+                len(shard_schematics)
+            )
+            self.get_shard(shard).add_schematics(shard_schematics, update)
+            for schematic_title in shard_schematics:
+                self.db[schematic_title] = shard
+
+        self._db_version = self.db_version()
+
+    def group(self, schematics):
+        # a symbol already in the library stays in its shard
+        groups = {}
+        for schematic_title, schematic_data in schematics.items():
+            shard = self.db.get(schematic_title)
+            if shard is None:
+                shard = self.key(schematic_title, schematic_data)
+            groups.setdefault(shard, {})[schematic_title] = schematic_data
+
+        return groups
@@ -0,0 +1,29 @@
+SEPARATOR = "~"
+
+
+def iter_shapes(shapes):
+    """
+    Split every shape line in its model and fields,
+    "PAD~RECT~3990~3000~..." -> ("PAD", ["RECT", "3990", "3000", ...]).
+
+    Empty fields are kept, so a field is always at the position given by
+    the EasyEDA format whatever the optional fields before it.
+    """
+    for line in shapes:
+        if not line:
+            continue
+        model, _, rest = line.partition(SEPARATOR)
+        yield model, rest.split(SEPARATOR)
+
+
+def field(fields, index, default=""):
+    # trailing optional fields may be missing
+    if index < len(fields) and fields[index] != "":
+        return fields[index]
+
+    return default
+
+
+def join_fields(fields):
+    # a field holding JSON may itself contain the separator
+    return SEPARATOR.join(fields)
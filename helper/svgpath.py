@@ -0,0 +1,327 @@
+import re
+
+from math import cos, radians, sin, sqrt
+
+from svg import path as svg_path
+from svg.path import parse_path as svg_parse_path
+
+
+# segments a curve is flattened into by path_points()
+CURVE_STEPS = 8
+
+# EasyEDA only writes these, anything else is left to svg.path
+ARGUMENT_COUNT = {
+    "M": 2,
+    "L": 2,
+    "H": 1,
+    "V": 1,
+    "C": 6,
+    "A": 7,
+    "Z": 0,
+}
+
+COMMAND_RE = re.compile(r"([MmLlHhVvCcAaZz])")
+# numbers float() reads the same way as svg.path, anything else falls back
+NATIVE_RE = re.compile(r"[MmLlHhVvCcAaZz0-9eE.,+\- \t\r\n]*")
+
+
+class UnsupportedPath(Exception):
+    pass
+
+
+class Segment:
+    """
+    Path segment with the attributes of its svg.path counterpart, which
+    `to_svg_path()` of the concrete segments returns.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(start={self.start}, end={self.end})"
+
+
+class Move(Segment):
+    __slots__ = ()
+
+    def __init__(self, to):
+        super().__init__(to, to)
+
+    def to_svg_path(self):
+        return svg_path.Move(self.start)
+
+    def length(self):
+        return 0
+
+
+class Linear(Segment):
+    __slots__ = ()
+
+    def length(self):
+        # same expression as svg.path
+        distance = self.end - self.start
+        return sqrt(distance.real**2 + distance.imag**2)
+
+
+class Line(Linear):
+    __slots__ = ()
+
+    def to_svg_path(self):
+        return svg_path.Line(self.start, self.end)
+
+
+class Close(Linear):
+    # not a Line, like in svg.path
+    __slots__ = ()
+
+    def to_svg_path(self):
+        return svg_path.Close(self.start, self.end)
+
+
+class CubicBezier(Segment):
+    __slots__ = ("control1", "control2")
+
+    def __init__(self, start, control1, control2, end):
+        super().__init__(start, end)
+        self.control1 = control1
+        self.control2 = control2
+
+    def to_svg_path(self):
+        return svg_path.CubicBezier(
+            self.start, self.control1, self.control2, self.end
+        )
+
+    def length(self):
+        return self.to_svg_path().length()
+
+
+class Arc(Segment):
+    __slots__ = ("radius", "rotation", "arc", "sweep", "center")
+
+    def __init__(self, start, radius, rotation, arc, sweep, end):
+        super().__init__(start, end)
+        self.radius = radius
+        self.rotation = rotation
+        self.arc = bool(arc)
+        self.sweep = bool(sweep)
+        self.center = arc_center(start, radius, rotation, arc, sweep, end)
+
+    def to_svg_path(self):
+        return svg_path.Arc(
+            self.start, self.radius, self.rotation, self.arc, self.sweep,
+            self.end
+        )
+
+    def length(self):
+        return self.to_svg_path().length()
+
+
+def arc_center(start, radius, rotation, arc, sweep, end):
+    """
+    Center of an endpoint parameterized arc, see the SVG implementation
+    notes. Computed in the order of svg.path Arc._parameterize() so both
+    give the same value. None when the arc is a point or a straight line.
+    """
+    if start == end or radius.real == 0 or radius.imag == 0:
+        return None
+
+    cosr = cos(radians(rotation))
+    sinr = sin(radians(rotation))
+    dx = (start.real - end.real) / 2
+    dy = (start.imag - end.imag) / 2
+    x1prim = cosr * dx + sinr * dy
+    x1prim_sq = x1prim * x1prim
+    y1prim = -sinr * dx + cosr * dy
+    y1prim_sq = y1prim * y1prim
+
+    rx = radius.real
+    rx_sq = rx * rx
+    ry = radius.imag
+    ry_sq = ry * ry
+
+    # radii too small to join both ends are scaled up
+    radius_scale = (x1prim_sq / rx_sq) + (y1prim_sq / ry_sq)
+    if radius_scale > 1:
+        radius_scale = sqrt(radius_scale)
+        rx *= radius_scale
+        ry *= radius_scale
+        rx_sq = rx * rx
+        ry_sq = ry * ry
+
+    t1 = rx_sq * y1prim_sq
+    t2 = ry_sq * x1prim_sq
+    c = sqrt(abs((rx_sq * ry_sq - t1 - t2) / (t1 + t2)))
+
+    if bool(arc) == bool(sweep):
+        c = -c
+    cxprim = c * rx * y1prim / ry
+    cyprim = -c * ry * x1prim / rx
+
+    return complex(
+        (cosr * cxprim - sinr * cyprim) + ((start.real + end.real) / 2),
+        (sinr * cxprim + cosr * cyprim) + ((start.imag + end.imag) / 2),
+    )
+
+
+def tokenize(pathdef):
+    # [(command, [arguments]), ...]
+    if NATIVE_RE.fullmatch(pathdef) is None:
+        raise UnsupportedPath(pathdef)
+
+    parts = COMMAND_RE.split(pathdef)
+    if parts[0].strip():
+        raise UnsupportedPath(pathdef)
+
+    try:
+        return [
+            (parts[i], [float(v) for v in parts[i + 1].replace(",", " ").split()])
+            for i in range(1, len(parts), 2)
+        ]
+    except ValueError:
+        raise UnsupportedPath(pathdef)
+
+
+def parse_native(pathdef):
+    segments = []
+    start_pos = None
+    current_pos = 0j
+
+    for command, arguments in tokenize(pathdef):
+        relative = command.islower()
+        command = command.upper()
+        count = ARGUMENT_COUNT[command]
+
+        if command == "Z":
+            if arguments or start_pos is None:
+                raise UnsupportedPath(pathdef)
+            segments.append(Close(current_pos, start_pos))
+            current_pos = start_pos
+            continue
+
+        if not arguments or len(arguments) % count:
+            raise UnsupportedPath(pathdef)
+
+        for i in range(0, len(arguments), count):
+            args = arguments[i:i + count]
+
+            if command == "M":
+                pos = complex(args[0], args[1])
+                if relative:
+                    current_pos += pos
+                else:
+                    current_pos = pos
+                segments.append(Move(current_pos))
+                start_pos = current_pos
+                # coordinates after a moveto are linetos
+                command = "L"
+                continue
+
+            if command == "L":
+                pos = complex(args[0], args[1])
+                if relative:
+                    pos += current_pos
+                segments.append(Line(current_pos, pos))
+
+            elif command == "H":
+                hpos = args[0]
+                if relative:
+                    hpos += current_pos.real
+                pos = complex(hpos, current_pos.imag)
+                segments.append(Line(current_pos, pos))
+
+            elif command == "V":
+                vpos = args[0]
+                if relative:
+                    vpos += current_pos.imag
+                pos = complex(current_pos.real, vpos)
+                segments.append(Line(current_pos, pos))
+
+            elif command == "C":
+                control1 = complex(args[0], args[1])
+                control2 = complex(args[2], args[3])
+                pos = complex(args[4], args[5])
+                if relative:
+                    control1 += current_pos
+                    control2 += current_pos
+                    pos += current_pos
+                segments.append(
+                    CubicBezier(current_pos, control1, control2, pos)
+                )
+
+            else:
+                rx, ry, rotation, arc, sweep = args[:5]
+                if rx < 0 or ry < 0 or arc not in (0, 1) or sweep not in (0, 1):
+                    raise UnsupportedPath(pathdef)
+                pos = complex(args[5], args[6])
+                if relative:
+                    pos += current_pos
+                segments.append(
+                    Arc(
+                        current_pos, complex(rx, ry), rotation, arc, sweep,
+                        pos
+                    )
+                )
+
+            current_pos = pos
+
+    return segments
+
+
+FROM_SVG_PATH = {
+    svg_path.Move: lambda s: Move(s.start),
+    svg_path.Line: lambda s: Line(s.start, s.end),
+    svg_path.Close: lambda s: Close(s.start, s.end),
+    svg_path.CubicBezier: lambda s: CubicBezier(
+        s.start, s.control1, s.control2, s.end
+    ),
+    svg_path.Arc: lambda s: Arc(
+        s.start, s.radius, s.rotation, s.arc, s.sweep, s.end
+    ),
+}
+
+
+def parse_path(pathdef):
+    """
+    Parse SVG path data into a list of segments.
+
+    The M/L/H/V/C/A/Z commands EasyEDA writes are parsed here. Other path
+    data goes through svg.path, its segments are converted, ones with no
+    counterpart here (quadratic beziers) are returned as they are.
+    """
+    try:
+        return parse_native(pathdef)
+    except UnsupportedPath:
+        pass
+
+    return [
+        FROM_SVG_PATH.get(type(segment), lambda s: s)(segment)
+        for segment in svg_parse_path(pathdef)
+    ]
+
+
+def path_points(pathdef, curve_steps=CURVE_STEPS):
+    """
+    Vertices of the first subpath of pathdef, as complex numbers. Curves
+    are flattened into curve_steps straight segments.
+    """
+    points = []
+    for segment in parse_path(pathdef):
+        if isinstance(segment, Move):
+            if points:
+                break
+            points.append(segment.end)
+        elif isinstance(segment, Linear):
+            points.append(segment.end)
+        else:
+            if isinstance(segment, Segment):
+                segment = segment.to_svg_path()
+            points.extend(
+                segment.point(i / curve_steps)
+                for i in range(1, curve_steps + 1)
+            )
+
+    return points
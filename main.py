@@ -2,7 +2,6 @@ import wx
 import wx.svg
 import wx.lib.agw.hyperlink as hl
 
-import requests
 import webbrowser
 # import threading
 import io
@@ -10,6 +9,7 @@ import re
 import time
 import logging
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from logging import Handler, Formatter
@@ -18,6 +18,8 @@ from cairosvg.surface import SVGSurface, PNGSurface
 
 from gui_lib_manager import LibManagerControl
 from gui_adv_search import AdvSearchControl
+from helper import net
+from helper.component import fetch_part_detail, fetch_svgs
 
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,9 @@ LCID_RE = re.compile(r"C\d+", re.I)
 PDF_ICON = "assets/pdf.svg"
 LC_ICON = "assets/lc.png"
 
+# symbol/footprint SVGs and part detail + product image are fetched in parallel
+FETCH_WORKERS = 3
+
 
 PART_INFO_CONF = {
     'brand': {
@@ -158,11 +163,16 @@ class SVGMixin:
         self.svg = data
         self.bbox = bbox
 
-    def get_bitmap(self, scale=1):
+    def get_png(self):
         bscale = min(600 / self.bbox['width'], 600 / self.bbox['height'])
         png_scale = 1 if bscale < 0 else bscale
 
-        png = svgpng_conv(self.svg.encode(), png_scale)
+        return svgpng_conv(self.svg.encode(), png_scale)
+
+    def get_bitmap(self, scale=1, png=None):
+        # rendering the png does not touch wx, so it may run in a worker.
+        if png is None:
+            png = self.get_png()
         # png.seek(0)
 
         # wx_png = wx.Bitmap(wx.Image(png))
@@ -230,7 +240,7 @@ class LCPART:
         print(self.part_detail.get("title", "N / A"))
         return self.part_detail.get("title", "N / A")
 
-    def get_part_img(self):
+    def get_part_img_data(self):
         if not self.part_loaded:
             self.get_part_detail_from_easyeda()
         img_urls = self.part_detail.get("images", None)  # type: ignore
@@ -240,11 +250,19 @@ class LCPART:
 
         url = img_urls[0]
 
-        req = requests.get(url)
+        req = net.get(url)
         if req.status_code != 200:
             return None
 
-        img = wx.Image(io.BytesIO(req.content))
+        return req.content
+
+    def get_part_img(self, img_data=None):
+        if img_data is None:
+            img_data = self.get_part_img_data()
+        if img_data is None:
+            return None
+
+        img = wx.Image(io.BytesIO(img_data))
         img = img_resize(img, 200, 200)
 
         return img
@@ -253,44 +271,20 @@ class LCPART:
         logger.info("获取器件信息")#翻译：获取部件信息
         # req = requests.get(f'https://wwwapi.lcsc.com/v1/products/detail?product_code={self.lcid}')
         # req = requests.get(f'https://wmsc.lcsc.com/wmsc/product/detail?productCode={self.lcid}')
-        payload = {
-            'pageSize': 50,
-            'page': 1,
-            'returnListStyle': 'classifyarr',
-            'wd': self.lcid
-        }
-        r = requests.post(
-            "https://pro.lceda.cn/api/devices/search",
-            data=payload
-        )
-        data = r.json()
-
-        if isinstance(data, dict):
-            self.part_detail = data['result']['lists']['lcsc'][0]
+        part_detail = fetch_part_detail(self.lcid)
+        if part_detail is not None:
+            self.part_detail = part_detail
 
         self.part_loaded = True
 
     def get_svg_from_easyeda(self):
         self.svg_loaded = True
         logger.info("获取符号和封装")#翻译：获取部件符号和封装
-        req = requests.get(
-            f'https://easyeda.com/api/products/{self.lcid}/svgs'
-        )
-
-        data = req.json()
-
-        if data['code'] != 0:
-            # warn_dialog(
-            #     f"Cannot get SVG from EasyEDA.\nCode: {data['message']}"
-            # )
-            msg = [
-                "Unable to get SVG from EasyEDA.",
-                f"Code: {data['message']}"
-            ]
-            logger.warning(" ".join(msg))
+        result = fetch_svgs(self.lcid)
+        if result is None:
             return
 
-        for component in data['result']:
+        for component in result:
             if component['docType'] == 2:
                 self.symbol = EDASymbol(component['component_uuid'],
                                         component['updateTime'])
@@ -539,7 +533,11 @@ class Main(wx.Frame):
 
     def status_write(self, msg):
         # ts = datetime.now().strftime('%H:%M:%S')
-        self.status.WriteText(msg)
+        if not wx.IsMainThread():
+            wx.CallAfter(self.status_write, msg)
+            return
+        if self.status:
+            self.status.WriteText(msg)
         # self.status.Update()
 
     def log_init(self):
@@ -551,6 +549,10 @@ class Main(wx.Frame):
         self.lcpart = None
         self.lib_manager = None
         self.advsearch_manager = None
+        self.fetch_pool = ThreadPoolExecutor(
+            max_workers=FETCH_WORKERS,
+            thread_name_prefix="lcpart-fetch"
+        )
 
         self.log_init()
         self.status.WriteText("Init Done.\nVersion: Alpha.\n")
@@ -673,25 +675,76 @@ class Main(wx.Frame):
 
         self.lcpart = LCPART(lcid)
         print(self.lcpart)
+        self.btn_ds.Disable()
+        self.btn_ref.Disable()
+
+        # every panel is filled in as soon as its own request returns,
+        # results of an older search are dropped by the panel callbacks.
+        self.fetch_pool.submit(self.fetch_eda_images, self.lcpart)
+        self.fetch_pool.submit(self.fetch_part_detail, self.lcpart)
+
+    def fetch_eda_images(self, lcpart):
+        try:
+            lcpart.get_svg_from_easyeda()
+            symbol_png = lcpart.symbol.get_png() if lcpart.symbol else None
+            footprint_png = None
+            if lcpart.footprint:
+                footprint_png = lcpart.footprint.get_png()
+        except Exception:
+            logger.exception("获取符号和封装失败: %s", lcpart.lcid)
+            return
+
+        wx.CallAfter(self.show_eda_images, lcpart, symbol_png, footprint_png)
+
+    def fetch_part_detail(self, lcpart):
+        try:
+            lcpart.get_part_detail_from_easyeda()
+        except Exception:
+            logger.exception("获取器件信息失败: %s", lcpart.lcid)
+            return
+
+        wx.CallAfter(self.show_part_info, lcpart)
+
+        # product image url is only known once the detail is loaded
+        try:
+            img_data = lcpart.get_part_img_data()
+        except Exception:
+            logger.exception("获取元件图片失败: %s", lcpart.lcid)
+            return
+
+        if img_data:
+            wx.CallAfter(self.show_part_img, lcpart, img_data)
+
+    def show_eda_images(self, lcpart, symbol_png, footprint_png):
+        if not self or lcpart is not self.lcpart:
+            return
+
         self.img_EDASymbol.SetBitmap(
-            self.lcpart.get_symbol_img()
+            lcpart.get_symbol_img(png=symbol_png)
         )
         self.img_EDAFootprint.SetBitmap(
-            self.lcpart.get_footprint_img()
+            lcpart.get_footprint_img(png=footprint_png)
         )
 
-        # product Info
-        product_img = self.lcpart.get_part_img()
+    def show_part_img(self, lcpart, img_data):
+        if not self or lcpart is not self.lcpart:
+            return
+
+        product_img = lcpart.get_part_img(img_data)
         if product_img:
             self.prodcut_picture.SetBitmap(
                 wx.Bitmap(product_img)
             )
 
+    def show_part_info(self, lcpart):
+        if not self or lcpart is not self.lcpart:
+            return
+
         # product name
-        self.part_name.SetLabelText(self.lcpart.get_part_name())
+        self.part_name.SetLabelText(lcpart.get_part_name())
 
         # update part info
-        part_info = self.lcpart.get_part_info()
+        part_info = lcpart.get_part_info()
         # for attr in PART_INFO_CONF.values():
         #     lc_value = part_info.get(attr['lc_key'], '-')  self.part_attrs[PART_INFO_CONF['name']].SetValue(str(lc_value))
         print("厂商:", part_info["attributes"].get('Manufacturer', '-'))
@@ -745,7 +798,7 @@ class Main(wx.Frame):
             self.lib_manager = LibManagerControl(self)
 
         self.lib_manager.load_part(
-            self.lcpart.lcid, self.lcpart.part_detail)    # type: ignore
+            self.lcpart.lcid, self.lcpart.get_part_info())    # type: ignore
         # self.lib_manager.load_part("C9872")
 
 
@@ -0,0 +1,93 @@
+"""
+EasyEDA payloads of small parts, the shapes are in the format of the
+EasyEDA API.
+"""
+import json
+
+
+SYMBOL_SHAPES = [
+    "R~390~290~2~2~20~20~#880000~1~0~none~gge1~0~",
+    "P~show~0~1~380~300~180~gge2~0^^380~300^^M 380 300 h 10~#880000^^1~393~304~0~IN~start~~~#0000FF^^1~388~299~0~1~end~~~#0000FF^^0~383~300^^0~M 386 303 L 389 300 L 386 297",
+    "P~show~1~2~420~300~0~gge3~0^^420~300^^M 420 300 h -10~#880000^^1~407~304~0~OUT~end~~~#0000FF^^1~412~299~0~2~start~~~#0000FF^^0~417~300^^0~M 414 303 L 411 300 L 414 297",
+    "PL~400 290 410 300 400 310~#880000~1~0~none~gge4~0",
+    "PG~395 295 405 295 405 305~#880000~1~0~none~gge5~0",
+    "PT~M 400 290 L 410 300 Z~#880000~1~0~none~gge6~0",
+    "PT~M 400 290 C 402 292 404 294 410 300~#880000~1~0~none~gge6b~0",
+    "E~400~300~5~5~#880000~1~0~none~gge7~0",
+]
+
+SVGNODE = "SVGNODE~" + json.dumps({
+    "gId": "g1",
+    "nodeName": "g",
+    "nodeType": 1,
+    "layerid": "19",
+    "attrs": {
+        "c_width": "10",
+        "c_height": "10",
+        "c_rotation": "0,0,90",
+        "z": "3.5",
+        "uuid": "abc123model",
+        "c_etype": "outline3D",
+        "title": "R0603",
+        "layerid": "19",
+        "transform": "scale(1) translate(0, 0)",
+    },
+    "childNodes": [],
+})
+
+FOOTPRINT_SHAPES = [
+    "TRACK~1~3~~3990 2990 4010 2990 4010 3010 3990 3010~gge10~0",
+    "TRACK~0.8~3~~3980 2980 3985 2980 3990 2980 3995 2980~gge10b~0",
+    "PAD~RECT~3990~3000~6~8~1~~1~0~3987 2996 3993 2996 3993 3004 3987 3004~0~gge11~0~~Y~0~~~3990,3000",
+    "PAD~OVAL~4010~3000~6~8~1~~2~0~4007 2996 4013 2996 4013 3004 4007 3004~90~gge12~0~~Y~0~~~4010,3000",
+    "PAD~POLYGON~4000~3010~4~4~1~~3~0~3998 3008 4002 3008 4002 3012 3998 3012~0~gge13~0~~Y~0~~~4000,3010",
+    "PAD~ELLIPSE~4000~3030~6~6~11~~4~1.5~~0~gge14~0~~Y~0~~~4000,3030",
+    "ARC~1~3~~M 3990 2980 A 10 10 0 0 1 4010 2980~~gge15~0",
+    "CIRCLE~4000~3000~5~1~3~gge16~0",
+    "RECT~3980~2980~40~40~3~gge17~0~1",
+    "HOLE~4000~3020~2~gge18~0",
+    "SOLIDREGION~3~~M 3970 2970 L 3975 2970 L 3980 2970 L 3980 2975 L 3980 2980 L 3970 2980 Z~solid~gge19~~~~0",
+    SVGNODE,
+]
+
+
+def raw_data(lcid="C1234", title="R0603", uuid="pkguuid1", update=1600000000):
+    # /api/products/{lcid}/components result
+    return {
+        "uuid": "symuuid-" + lcid,
+        "updateTime": update,
+        "description": "test resistor",
+        "SMT": True,
+        "dataStr": {
+            "head": {"c_para": {
+                "pre": "R?", "name": "RES-" + lcid, "Manufacturer": "ACME",
+                "link": "",
+            }},
+            "canvas": "CA~1000~1000~#FFFFFF~yes~#CCCCCC~10~1000~1000~line~10~pixel~5~400~300",
+            "BBox": {"x": 380, "y": 290, "width": 40, "height": 20},
+            "shape": list(SYMBOL_SHAPES),
+        },
+        "packageDetail": {
+            "uuid": uuid,
+            "title": title,
+            "updateTime": update,
+            "dataStr": {
+                "head": {"c_para": {"3DModel": title + "_3D", "link": ""}},
+                "canvas": "CA~1000~1000~#000000~yes~#FFFFFF~10~1000~1000~line~0.5~mil~1~45~visible~0.5~4000~3000~0~yes",
+                "BBox": {"x": 3970, "y": 2970, "width": 50, "height": 60},
+                "shape": list(FOOTPRINT_SHAPES),
+            },
+        },
+    }
+
+
+def lc_data(lcid="C1234"):
+    # LCSC part detail, the lcsc entry of the pro.lceda.cn device search
+    return {
+        "description": "",
+        "attributes": {"Datasheet": f"https://lcsc.com/datasheet/{lcid}.pdf"},
+        "tags": {
+            "parent_tag": {"name": "Resistors"},
+            "child_tag": {"name": "Chip Resistor - Surface Mount"},
+        },
+    }
@@ -0,0 +1,62 @@
+"""
+Footprints and symbols of tests/data/baseline/shapes.json must convert to
+the files next to it, written by the converter before the shapes were
+read by the shared tokenizer. Only shapes that converter read right are
+in there.
+"""
+import json
+
+from pathlib import Path
+
+import pytest
+
+from helper.footprint import create_footprint
+from helper.footprint.emitter import EMITTERS, serialize_footprint
+from helper.schematic import create_schematic
+
+
+DATA = Path(__file__).parent.joinpath("data", "baseline")
+SHAPES = json.loads(DATA.joinpath("shapes.json").read_text(encoding='utf-8'))
+
+
+def expected(name):
+    return DATA.joinpath(name).read_text(encoding='utf-8')
+
+
+@pytest.mark.parametrize("emitter", EMITTERS)
+@pytest.mark.parametrize(
+    "footprint", SHAPES['footprints'], ids=lambda fp: fp['case']
+)
+def test_footprint_matches_baseline(footprint, emitter):
+    data = create_footprint(
+        footprint['name'],
+        footprint['shapes'],
+        footprint['smt'],
+        c_x=footprint['c_x'],
+        c_y=footprint['c_y'],
+        size_x=footprint['size_x'],
+        size_y=footprint['size_y'],
+        emitter=emitter
+    )
+
+    assert serialize_footprint(data, timestamp=0) == expected(
+        f"{footprint['case']}.kicad_mod"
+    )
+
+
+@pytest.mark.parametrize("symbol", SHAPES['symbols'], ids=lambda s: s['case'])
+def test_symbol_matches_baseline(symbol):
+    data = create_schematic(
+        lcid=symbol['lcid'],
+        schematic_title=symbol['title'],
+        schematic_shape=symbol['shapes'],
+        symmbolic_prefix=symbol['prefix'],
+        footprint_name=symbol['footprint'],
+        datasheet_link='',
+        x_offset=symbol['x_offset'],
+        y_offset=symbol['y_offset'],
+        x_size=symbol['x_size'],
+        y_size=symbol['y_size']
+    )
+
+    assert data == expected(f"{symbol['case']}.kicad_sym")
@@ -0,0 +1,157 @@
+import argparse
+from concurrent.futures import Future
+
+import pytest
+
+import batch
+
+from helper import component
+from helper.cache import ComponentCache
+from helper.footprint import FootprintManager
+from helper.provenance import SYMBOLS, Provenance
+
+import parts
+
+
+PARTS = [("C1", "R0603"), ("C2", "R0603"), ("C3", "R0603"), ("C4", "R0805")]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ComponentCache(tmp_path / "cache")
+    for lcid, title in PARTS:
+        cache.put(
+            f"products-{lcid}", parts.raw_data(lcid, title, "pkg-" + title)
+        )
+    monkeypatch.setattr(component, 'component_cache', cache)
+    monkeypatch.setattr(batch, 'fetch_part_detail', parts.lc_data)
+    return cache
+
+
+def exporter(lib_root, shard=None):
+    return batch.BatchExporter(lib_root, model3d=False, shard=shard)
+
+
+def failing_conversion(monkeypatch, fails):
+    # the first parts converting the R0603 footprint fail
+    submit_part = batch.BatchExporter.submit_part
+    owners = []
+
+    def fail_submit(self, pool, lcid, raw_data, lc_data, symbol, footprint):
+        if footprint and len(owners) < fails \
+                and raw_data['packageDetail']['title'] == "R0603":
+            owners.append(lcid)
+            future = Future()
+            future.set_exception(RuntimeError("conversion failed"))
+            return future
+        return submit_part(
+            self, pool, lcid, raw_data, lc_data, symbol, footprint
+        )
+
+    monkeypatch.setattr(batch.BatchExporter, 'submit_part', fail_submit)
+    return owners
+
+
+def test_shared_footprint_converted_once(cache, tmp_path):
+    lib = exporter(tmp_path / "lib")
+
+    assert lib.run([lcid for lcid, _ in PARTS], jobs=2) == []
+    assert lib.footprint_manager.check_footprint("R0603")
+    assert lib.footprint_manager.check_footprint("R0805")
+    # the other R0603 parts only wait for the first one
+    assert sum(len(w) for w in lib.footprint_waiters.values()) == 2
+
+
+def test_failed_footprint_owner_is_replaced(cache, tmp_path, monkeypatch):
+    owners = failing_conversion(monkeypatch, 2)
+    lib = exporter(tmp_path / "lib")
+
+    failed = lib.run([lcid for lcid, _ in PARTS], jobs=2)
+
+    assert len(owners) == 2
+    assert sorted(failed) == sorted(owners)
+    assert lib.footprint_manager.check_footprint("R0603")
+    assert lib.footprint_manager.check_footprint("R0805")
+    for lcid, _ in PARTS:
+        symbol = lib.schematic_manager.get_schematic(f"RES-{lcid}")
+        assert (lcid in failed) == (not symbol)
+
+
+def test_failed_footprint_write_drops_the_part(cache, tmp_path, monkeypatch):
+    manager = FootprintManager
+    add_footprint = manager.add_footprint
+    writes = []
+
+    def fail_add(self, name, data, update=False):
+        writes.append(name)
+        if name == "R0603":
+            raise OSError("disk full")
+        return add_footprint(self, name, data, update)
+
+    monkeypatch.setattr(manager, 'add_footprint', fail_add)
+    lib_root = tmp_path / "lib"
+    lib = exporter(lib_root)
+
+    failed = lib.run([lcid for lcid, _ in PARTS], jobs=2)
+
+    # written once, not again for every part of the package
+    assert sorted(writes) == ["R0603", "R0805"]
+    assert len(failed) == 1
+    assert not lib.footprint_manager.check_footprint("R0603")
+    # the symbol of the failed part was queued before the footprint write
+    assert not lib.schematic_manager.get_schematic(f"RES-{failed[0]}")
+    assert Provenance(lib_root, "lcsc").get(
+        SYMBOLS, f"RES-{failed[0]}") is None
+    for lcid in {"C1", "C2", "C3", "C4"} - set(failed):
+        assert lib.schematic_manager.get_schematic(f"RES-{lcid}")
+
+
+def test_category_shards(cache, tmp_path):
+    lib = exporter(tmp_path / "lib", shard='category')
+
+    assert lib.run([lcid for lcid, _ in PARTS], jobs=2) == []
+    assert sorted(p.name for p in (tmp_path / "lib").glob("*.kicad_sym")) == [
+        "lcsc-Resistors_Chip_Resistor_Surface_Mount.kicad_sym"
+    ]
+
+
+def test_shared_footprint_provenance(cache, tmp_path, monkeypatch):
+    owners = failing_conversion(monkeypatch, 1)
+    lib_root = tmp_path / "lib"
+    exporter(lib_root).run([lcid for lcid, _ in PARTS], jobs=2)
+
+    packages = dict(PARTS)
+
+    def update_times(lcid):
+        # only the R0603 package changed upstream
+        footprint_time = 1600000000
+        if packages[lcid] == "R0603":
+            footprint_time += 1
+        return {
+            2: ("symuuid-" + lcid, 1600000000),
+            4: ("pkg-" + packages[lcid], footprint_time),
+        }
+
+    monkeypatch.setattr(batch, 'fetch_update_times', update_times)
+
+    stale = batch.find_stale_parts(Provenance(lib_root, "lcsc"))
+    # the part that failed has no footprint record
+    assert sorted(stale) == sorted(
+        {"C1", "C2", "C3"} - set(owners)
+    )
+
+
+def test_timeout_option(tmp_path, monkeypatch):
+    sessions = []
+    monkeypatch.setattr(
+        batch.net, 'configure', lambda **kwargs: sessions.append(kwargs)
+    )
+    bom = tmp_path / "bom.csv"
+    bom.write_text("no part\n")
+
+    assert batch.main([str(bom), "-o", str(tmp_path), "--timeout", "2,10"])
+    assert sessions[0]['timeout'] == (2, 10)
+    assert batch.parse_timeout("7") == (7, 7)
+    for text in ("", "1,2,3", "0,5", "a,b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            batch.parse_timeout(text)
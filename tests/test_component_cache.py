@@ -0,0 +1,105 @@
+import json
+import time
+
+import pytest
+
+from helper import component
+from helper.cache import ComponentCache
+
+
+PAYLOAD = {
+    'uuid': "sym-uuid",
+    'updateTime': 100,
+    'dataStr': {},
+    'packageDetail': {'uuid': "fp-uuid", 'updateTime': 200, 'dataStr': {}},
+}
+
+
+class Response:
+    def __init__(self, result):
+        self.result = result
+
+    def json(self):
+        return {'code': 0, 'result': self.result}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ComponentCache(tmp_path, max_age=60)
+    monkeypatch.setattr(component, 'component_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    calls = []
+
+    def get(url):
+        calls.append(url)
+        return Response(dict(PAYLOAD, updateTime=101))
+
+    monkeypatch.setattr(component.net, 'get', get)
+    return calls
+
+
+def upstream(monkeypatch, symbol_time, footprint_time):
+    times = {2: ("sym-uuid", symbol_time), 4: ("fp-uuid", footprint_time)}
+    monkeypatch.setattr(component, 'fetch_update_times', lambda lcid: times)
+
+
+def age(cache, key, seconds):
+    entry = cache.get(key)
+    entry['checked'] -= seconds
+    return entry
+
+
+def test_fresh_entry_is_used(cache, downloads, monkeypatch):
+    cache.put("products-C1", PAYLOAD, 100)
+    upstream(monkeypatch, 999, 999)
+
+    part = component.LCComponent("C1")
+    assert part.load_componnt()
+    assert part.raw_data['updateTime'] == 100
+    assert downloads == []
+
+
+def test_old_unchanged_entry_is_kept(cache, downloads, monkeypatch):
+    cache.put("products-C1", PAYLOAD, 100)
+    entry = age(cache, "products-C1", 120)
+    upstream(monkeypatch, 100, 200)
+
+    part = component.LCComponent("C1")
+    assert part.is_current(entry)
+    assert downloads == []
+    assert cache.is_fresh(cache.get("products-C1"))
+
+
+@pytest.mark.parametrize("symbol_time, footprint_time", [(101, 200), (100, 201)])
+def test_old_changed_entry_is_downloaded(
+    cache, downloads, monkeypatch, symbol_time, footprint_time
+):
+    cache.put("products-C1", PAYLOAD, 100)
+    entry = age(cache, "products-C1", 120)
+    upstream(monkeypatch, symbol_time, footprint_time)
+    monkeypatch.setattr(cache, 'get', lambda key: entry)
+
+    part = component.LCComponent("C1")
+    assert part.load_componnt()
+    assert part.raw_data['updateTime'] == 101
+    assert len(downloads) == 1
+    with cache.entry_path("products-C1").open(encoding='utf-8') as fp:
+        assert json.load(fp)['data']['updateTime'] == 101
+
+
+def test_reload_skips_cache(cache, downloads, monkeypatch):
+    cache.put("products-C1", PAYLOAD, 100)
+
+    part = component.LCComponent("C1")
+    assert part.load_componnt(use_cache=False)
+    assert part.raw_data['updateTime'] == 101
+    assert len(downloads) == 1
+
+
+def test_entry_without_check_time_is_old(cache):
+    assert not cache.is_fresh({'data': PAYLOAD})
+    assert cache.is_fresh({'data': PAYLOAD, 'checked': time.time()})
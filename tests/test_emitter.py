@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from KicadModTree import Model
+
+from helper.footprint import create_footprint
+from helper.footprint.emitter import EMITTER_SEXPR, EMITTER_TREE
+from helper.footprint.emitter import serialize_footprint
+
+import parts
+
+
+LAYERS = ["1", "2", "3", "4", "5", "7", "10", "12", "13", "100", "101"]
+
+
+def random_shapes(rnd, count):
+    def num(a, b):
+        v = rnd.uniform(a, b)
+        return rnd.choice([f"{v:.3f}", f"{v:.0f}", f"{v:.6f}", str(round(v, 1))])
+
+    def points(n):
+        return " ".join(f"{num(3900, 4100)} {num(2900, 3100)}" for _ in range(n))
+
+    shapes = []
+    for _ in range(count):
+        kind = rnd.choice("TPACRHS")
+        if kind == "T":
+            shapes.append(
+                f"TRACK~{num(0.1, 3)}~{rnd.choice(LAYERS)}~~"
+                f"{points(rnd.randint(2, 6))}~gge1~0"
+            )
+        elif kind == "P":
+            w = num(1, 20)
+            shapes.append(
+                f"PAD~{rnd.choice(['RECT', 'OVAL', 'ELLIPSE', 'POLYGON'])}"
+                f"~{num(3900, 4100)}~{num(2900, 3100)}~{w}"
+                f"~{rnd.choice([w, num(1, 20)])}~{rnd.choice(['1', '2', '11'])}"
+                f"~~{rnd.choice(['1', 'A2', '', 'pad 3'])}"
+                f"~{rnd.choice(['0', '1.5', num(0.5, 3)])}"
+                f"~{points(rnd.randint(3, 9))}"
+                f"~{rnd.choice(['0', '90', '45.5', '', '270.25'])}~gge2~0"
+            )
+        elif kind == "A":
+            x, y = rnd.uniform(3900, 4100), rnd.uniform(2900, 3100)
+            r = rnd.uniform(2, 20)
+            shapes.append(
+                f"ARC~{num(0.1, 2)}~{rnd.choice(LAYERS)}~~M {x:.2f} {y:.2f} "
+                f"A {r:.2f} {r:.2f} 0 {rnd.randint(0, 1)} {rnd.randint(0, 1)} "
+                f"{x + r * 2:.2f} {y:.2f}~~gge3~0"
+            )
+        elif kind == "C":
+            shapes.append(
+                f"CIRCLE~{num(3900, 4100)}~{num(2900, 3100)}~{num(1, 30)}"
+                f"~{num(0.1, 2)}~{rnd.choice(LAYERS)}~gge4~0"
+            )
+        elif kind == "R":
+            shapes.append(
+                f"RECT~{num(3900, 4100)}~{num(2900, 3100)}~{num(1, 50)}"
+                f"~{num(1, 50)}~{rnd.choice(LAYERS)}~gge5~0~1"
+            )
+        elif kind == "H":
+            shapes.append(
+                f"HOLE~{num(3900, 4100)}~{num(2900, 3100)}~{num(1, 5)}~gge6~0"
+            )
+        else:
+            path = " L ".join(
+                f"{num(3900, 4100)} {num(2900, 3100)}"
+                for _ in range(rnd.randint(3, 12))
+            )
+            shapes.append(
+                f"SOLIDREGION~{rnd.choice(LAYERS)}~~M {path} Z~solid~gge7~~~~0"
+            )
+
+    return shapes
+
+
+def grid_shapes(rows=6, cols=6, pitch=3.937):
+    shapes = []
+    for r in range(rows):
+        for c in range(cols):
+            x = 4000 + c * pitch
+            y = 3000 + r * pitch
+            shapes.append(
+                f"PAD~ELLIPSE~{x:.3f}~{y:.3f}~1.969~1.969~1~~{chr(65 + r)}{c + 1}"
+                f"~0~~0~gge{r}_{c}~0~~Y~0~~~{x:.3f},{y:.3f}"
+            )
+    return shapes
+
+
+def cases():
+    rnd = random.Random(1)
+    yield "fixture", parts.FOOTPRINT_SHAPES, "R0603", True
+    yield "grid", grid_shapes(), "BGA-36", False
+    for i in range(40):
+        yield (
+            f"random-{i}",
+            random_shapes(rnd, rnd.randint(1, 40)),
+            rnd.choice(["R0603", "SOIC 8", 'X"Y']),
+            i % 2 == 0
+        )
+
+
+def serialize(shapes, name, emitter, model, **options):
+    fp = create_footprint(
+        name, shapes, True, c_x=4000.0, c_y=3000.0, size_x=50.0, size_y=60.0,
+        emitter=emitter, **options
+    )
+    fp.setDescription(f"{name} footprint")
+    if model:
+        fp.append(Model(
+            filename="${KIPRJMOD}/libs/x y.wrl", rotate=[-0.0, -0.0, -90.0]
+        ))
+    return serialize_footprint(fp, timestamp=0).encode()
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {'merge_tracks': True, 'simplify_tolerance': 0.05},
+])
+@pytest.mark.parametrize("case, shapes, name, model", list(cases()))
+def test_emitters_write_the_same_bytes(case, shapes, name, model, options):
+    tree = serialize(shapes, name, EMITTER_TREE, model, **options)
+    sexpr = serialize(shapes, name, EMITTER_SEXPR, model, **options)
+
+    assert sexpr == tree
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from helper import listing
+from helper.footprint import create_footprint
+from helper.footprint.manager import FootprintExist, FootprintManager
+from helper.listing import DirListing
+
+import parts
+
+
+@pytest.fixture
+def scans(monkeypatch):
+    paths = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        paths.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(listing.os, 'scandir', counting_scandir)
+    return paths
+
+
+def footprint(name):
+    return create_footprint(
+        name, parts.FOOTPRINT_SHAPES, True, c_x=4000.0, c_y=3000.0,
+        size_x=50.0, size_y=60.0
+    )
+
+
+def test_written_footprints_keep_the_listing(tmp_path, scans):
+    manager = FootprintManager(tmp_path, "lib")
+    assert not manager.check_footprint("R0")
+    scans.clear()
+
+    for i in range(20):
+        assert manager.add_footprint(f"R{i}", footprint(f"R{i}"))
+        manager.footprints.refresh(force=True)
+        assert manager.check_footprint(f"R{i}")
+
+    assert scans == []
+
+
+def test_file_added_by_another_writer(tmp_path, scans):
+    manager = FootprintManager(tmp_path, "lib")
+    assert not manager.check_footprint("R1")
+
+    # written by another process, the listing is refreshed for it
+    manager.lib_path.joinpath("R1.kicad_mod").write_text("")
+    with pytest.raises(FootprintExist):
+        manager.add_footprint("R1", footprint("R1"))
+    manager.add_footprint("R2", footprint("R2"))
+    manager.lib_path.joinpath("R3.kicad_mod").write_text("")
+
+    manager.footprints.refresh(force=True)
+    assert {"R1.kicad_mod", "R2.kicad_mod", "R3.kicad_mod"} <= (
+        manager.footprints.names
+    )
+
+
+def test_add_without_before_lists_again(tmp_path, scans):
+    names = DirListing(tmp_path)
+    names.refresh(force=True)
+    tmp_path.joinpath("a").write_text("")
+    names.add("a")
+    names.refresh(force=True)
+
+    assert len(scans) == 2
@@ -0,0 +1,106 @@
+import io
+import re
+
+import pytest
+
+from helper.footprint import model3d
+from helper.footprint.model3d import WRL_MODE_MATERIAL, WRL_MODE_VERTEX
+from helper.footprint.model3d import obj2wrl
+from helper.footprint.store import ModelStore
+from helper.numeric import np
+
+
+# red and blue resistor body, as the EasyEDA 3D model API sends it
+OBJ = """newmtl body
+Ka 0.2 0.2 0.2
+Kd 0.8 0.1 0.1
+Ks 0.3 0.3 0.3
+d 1
+endmtl
+newmtl lead
+Ka 0.2 0.2 0.2
+Kd 0.1 0.1 0.8
+Ks 0.3 0.3 0.3
+d 1
+endmtl
+v 1.0 2.0 3.0
+v 0.00005 -1.27 2.54
+v 3.3 4.4 5.5
+v 7.112 -0.0001 0.123456
+usemtl body
+f 1// 2// 3//
+usemtl lead
+f 2// 3// 4//
+"""
+
+
+@pytest.mark.parametrize("vectorized", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        np is None, reason="numpy not installed"
+    )),
+])
+def test_material_diffuse_color(vectorized):
+    fp = io.StringIO()
+    obj2wrl([OBJ], fp, 0, vectorized, WRL_MODE_MATERIAL)
+    wrl = fp.getvalue()
+
+    assert "diffuseColor 0.8 0.1 0.1\n" in wrl
+    assert "diffuseColor 0.1 0.1 0.8\n" in wrl
+    assert wrl.count("Shape {") == 2
+
+
+def face_colors(wrl):
+    # "x, y, z" of every face -> "r g b", from either WRL mode
+    colors = {}
+    for shape in wrl.split("Shape {")[1:]:
+        faces = re.findall(r"(\d+, \d+, \d+), -1", shape)
+        per_face = re.search(r"color \[\s*(.*?)\s*\]", shape, re.S)
+        if per_face:
+            rgb = re.findall(r"([\d.]+ [\d.]+ [\d.]+),", per_face.group(1))
+        else:
+            color = re.search(r"diffuseColor (.*)\n", shape).group(1)
+            rgb = [color] * len(faces)
+        assert len(rgb) == len(faces)
+        colors.update(zip(faces, rgb))
+    return colors
+
+
+@pytest.mark.parametrize("vectorized", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        np is None, reason="numpy not installed"
+    )),
+])
+def test_modes_give_the_same_colors(vectorized):
+    colors = []
+    for mode in (WRL_MODE_MATERIAL, WRL_MODE_VERTEX):
+        fp = io.StringIO()
+        obj2wrl([OBJ], fp, 0, vectorized, mode)
+        colors.append(face_colors(fp.getvalue()))
+
+    assert colors[0] == colors[1] == {
+        "0, 1, 2": "0.8 0.1 0.1",
+        "1, 2, 3": "0.1 0.1 0.8",
+    }
+
+
+def test_updated_footprint_model_converted_again(tmp_path, monkeypatch):
+    downloads = []
+
+    def chunks(component_uuid):
+        downloads.append(component_uuid)
+        return iter([OBJ])
+
+    monkeypatch.setattr(model3d, 'iter_3Dmodel_chunks', chunks)
+    store = ModelStore(tmp_path)
+
+    for update_time in (100, 100, 200):
+        ref = model3d.Model3DRef(
+            "model-uuid", "3.5", "0,0,0", WRL_MODE_MATERIAL, update_time
+        )
+        model = ref.fetch(store)
+        if not model.stored:
+            store.put(model)
+
+    assert downloads == ["model-uuid", "model-uuid"]
@@ -0,0 +1,122 @@
+from helper.footprint import create_footprint
+from helper.footprint.emitter import EMITTER_SEXPR, EMITTER_TREE
+from helper.footprint.emitter import serialize_footprint
+from helper.footprint.pad_array import PadArray, split_number
+
+
+KIND = ("smd rect", "", "(size 1 1) (layers F.Cu))")
+
+
+def pad(x, y, number, shape="RECT", w="3.15", rotation=0):
+    return (
+        f"PAD~{shape}~{x}~{y}~{w}~0.984~1~~{number}~0~~{rotation}"
+        f"~gge{number}~0"
+    )
+
+
+def build(shapes, emitter=EMITTER_SEXPR):
+    return create_footprint(
+        "X", shapes, True, c_x=4000.0, c_y=3000.0, size_x=50.0, size_y=60.0,
+        emitter=emitter
+    )
+
+
+def arrays(fp):
+    return [
+        (len(p), len(p.rows)) if isinstance(p, PadArray) else None
+        for p in fp.groups['Pad']
+    ]
+
+
+def same_bytes(shapes):
+    tree = serialize_footprint(build(shapes, EMITTER_TREE), timestamp=0)
+    sexpr = serialize_footprint(build(shapes), timestamp=0)
+    return sexpr == tree
+
+
+def test_split_number():
+    assert split_number("12") == ("", 12)
+    assert split_number("AB3") == ("AB", 3)
+    assert split_number("0") == ("", 0)
+    # not given back the same by prefix + counter
+    assert split_number("01") is None
+    assert split_number("") is None
+    assert split_number("1A") is None
+
+
+def test_row_and_grid():
+    array = PadArray.start(KIND, "1", (0.0, 0.0))
+    assert array.add(KIND, "2", (1.27, 0.0))
+    assert array.add(KIND, "3", (2.54, 0.0))
+    # next row, as many pads as the first
+    assert array.add(KIND, "4", (0.0, -0.5))
+    assert not array.add(KIND, "6", (1.27, -0.5))
+    assert array.add(KIND, "5", (1.27, -0.5))
+    assert list(array.pads()) == [
+        ("1", (0.0, 0.0)), ("2", (1.27, 0.0)), ("3", (2.54, 0.0)),
+        ("4", (0.0, -0.5)), ("5", (1.27, -0.5)),
+    ]
+    assert len(array) == 5
+
+
+def test_breaks_on_kind_pitch_and_number():
+    array = PadArray.start(KIND, "A1", (0.0, 0.0))
+    assert array.add(KIND, "A2", (1.0, 0.0))
+    assert not array.add(("smd rect",), "A3", (2.0, 0.0))
+    assert not array.add(KIND, "A3", (2.5, 0.0))
+    assert not array.add(KIND, "A03", (2.0, 0.0))
+    # a row further along the same line is not a new row
+    assert not array.add(KIND, "B1", (3.0, 0.0))
+    assert array.add(KIND, "B1", (0.0, 1.0))
+    assert array.add(KIND, "B2", (1.0, 1.0))
+    # rows are as long as the first one
+    assert not array.add(KIND, "B3", (2.0, 1.0))
+    assert not array.add(KIND, "C1", (0.0, 2.5))
+    assert array.add(KIND, "C1", (0.0, 2.0))
+    assert PadArray.start(KIND, "", (0.0, 0.0)) is None
+
+
+def test_grid_is_one_array():
+    shapes = [
+        pad(f"{4000 + c * 3.937:.3f}", f"{3000 + r * 3.937:.3f}",
+            f"{chr(65 + r)}{c + 1}", "ELLIPSE", "1.969")
+        for r in range(8) for c in range(8)
+    ]
+    assert arrays(build(shapes)) == [(64, 8)]
+    assert same_bytes(shapes)
+
+
+def test_quad_package_sides_are_rows():
+    shapes = []
+    for i in range(32):
+        side, j = divmod(i, 8)
+        offset = j * 1.969
+        x, y = [
+            (3900, 3000 + offset), (4000 + offset, 3100),
+            (4100, 3000 - offset), (4000 - offset, 2900),
+        ][side]
+        shapes.append(pad(f"{x:.3f}", f"{y:.3f}", i + 1, rotation=side * 90))
+    shapes.append(pad("4000", "3000", 33, w="60"))
+
+    assert arrays(build(shapes)) == [(8, 1)] * 4 + [(1, 1)]
+    assert same_bytes(shapes)
+
+
+def test_irregular_pads_are_kept_in_order():
+    shapes = [
+        pad("3990", "3000", 1), pad("4000", "3000", 2),
+        pad("4010", "3000", "GND"), pad("4020", "3000", 3),
+        pad("4033", "3000", 4), "HOLE~4000~3010~2~gge7~0",
+        pad("4040", "3000", 5),
+    ]
+
+    assert arrays(build(shapes)) == [(2, 1), None, (2, 1), None, (1, 1)]
+    assert same_bytes(shapes)
+
+
+def test_quoted_numbers():
+    shapes = [pad(f"{4000 + i * 5}", "3000", f"P {i + 1}") for i in range(4)]
+
+    assert arrays(build(shapes)) == [(4, 1)]
+    assert '(pad "P 4" smd rect' in serialize_footprint(build(shapes))
+    assert same_bytes(shapes)
@@ -0,0 +1,85 @@
+import pytest
+
+from helper.schematic.schematic_manager import COMPACT_RATIO
+from helper.schematic.schematic_manager import SchematicManager
+
+
+def symbol(name, pins):
+    lines = [
+        f'  (symbol "{name}" (pin_names (offset 1.016)) (in_bom yes) (on_board yes)',
+        f'    (property "Reference" "R" (id 0) (at 0 0 0))',
+    ]
+    lines.extend(
+        f'    (pin passive line (at 0 {i} 0) (length 2.54) (name "{i}") (number "{i}"))'
+        for i in range(pins)
+    )
+    lines.append('  )')
+    return "\n".join(lines)
+
+
+@pytest.fixture
+def library(tmp_path):
+    manager = SchematicManager(tmp_path / "lib", "test")
+    manager.build_schematic_db()
+    manager.add_schematics({
+        "A": symbol("A", 60),
+        "B": symbol("B", 5),
+        "C": symbol("C", 5),
+    })
+    return manager
+
+
+def fresh_size(tmp_path, symbols):
+    manager = SchematicManager(tmp_path / "fresh", "test")
+    manager.build_schematic_db()
+    manager.add_schematics(symbols)
+    return manager.path.stat().st_size
+
+
+def check_symbols(manager, symbols):
+    for name, data in symbols.items():
+        assert manager.read_schematic(name).rstrip() == data
+
+    # a scan of the library finds the same symbols and padding
+    db, padding = dict(manager.db), dict(manager.padding)
+    manager.index_path.unlink()
+    manager.build_schematic_db(rebuild=True)
+    assert manager.db == db
+    assert manager.padding == padding
+
+
+def test_shrunk_symbol_padding_is_reclaimed(library, tmp_path):
+    sizes = []
+    for pins in (50, 40, 30, 20, 10, 5):
+        library.update_schematic("A", symbol("A", pins))
+        sizes.append(library.path.stat().st_size)
+
+    symbols = {"A": symbol("A", 5), "B": symbol("B", 5), "C": symbol("C", 5)}
+    check_symbols(library, symbols)
+    assert sizes[-1] < sizes[0]
+    assert sizes[-1] <= fresh_size(tmp_path, symbols) * (1 + COMPACT_RATIO)
+
+
+def test_shrink_and_grow_keep_size_bounded(library, tmp_path):
+    for _ in range(5):
+        library.add_schematics(
+            {"B": symbol("B", 30), "C": symbol("C", 1)}, update=True
+        )
+        library.add_schematics(
+            {"B": symbol("B", 1), "C": symbol("C", 30)}, update=True
+        )
+
+    symbols = {"A": symbol("A", 60), "B": symbol("B", 1), "C": symbol("C", 30)}
+    check_symbols(library, symbols)
+    assert library.path.stat().st_size <= (
+        fresh_size(tmp_path, symbols) * (1 + COMPACT_RATIO)
+    )
+
+
+def test_small_shrink_is_padded_in_place(library):
+    start, length = library.db["B"]
+    library.update_schematic("B", symbol("B", 4))
+
+    assert library.db["B"] == (start, length)
+    assert library.padding["B"] > 0
+    check_symbols(library, {"B": symbol("B", 4), "C": symbol("C", 5)})
@@ -0,0 +1,37 @@
+import pytest
+
+from svg import path as svg_path
+
+from helper import svgpath
+
+
+PATHS = [
+    "M 380 300 h 10",
+    "M 420 300 h -10",
+    "M 400 290 L 410 300 Z",
+    "M 400 290 C 402 292 404 294 410 300",
+    "M 3990 2980 A 10 10 0 0 1 4010 2980",
+    "M3990,2980a10,10,0,1,0,20,0v5H3990z",
+    "M 1e1 2E-1 l .5 -.5",
+]
+
+
+@pytest.mark.parametrize("pathdef", PATHS)
+def test_same_segments_as_svg_path(pathdef):
+    segments = svgpath.parse_path(pathdef)
+    expected = svg_path.parse_path(pathdef)
+
+    assert len(segments) == len(expected)
+    for segment, other in zip(segments, expected):
+        assert type(segment.to_svg_path()) is type(other)
+        assert segment.start == other.start
+        assert segment.end == other.end
+        assert segment.length() == pytest.approx(other.length())
+
+
+def test_unsupported_commands_fall_back():
+    # quadratic beziers are left to svg.path
+    segments = svgpath.parse_path("M 0 0 Q 5 5 10 0")
+
+    assert isinstance(segments[0], svgpath.Move)
+    assert isinstance(segments[1], svg_path.QuadraticBezier)